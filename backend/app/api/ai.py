@@ -1,100 +1,124 @@
 """
 Endpoints de IA — análise de campanhas e chat interativo com streaming.
 """
-from typing import List, Optional
+import json
+import time
+from typing import List
 from fastapi import APIRouter, Depends, HTTPException
+from fastapi.concurrency import run_in_threadpool
 from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
 from app.core.security import get_current_user
-from app.models.database import get_db
+from app.models.database import get_async_db, get_db
 from app.models.user import User
-from app.services.meta_service import MetaService
-from app.services.ai_service import analyze_campaigns, chat_with_ai
-from app.schemas.approval import AIAnalysisRequest, AIChatMessage
+from app.models.conversation import Conversation
+from app.services.ai_metrics import RunRecorder, save_run, summarize_runs
+from app.services.ai_service import chat_with_ai
+from app.services.analysis_jobs import get_job, job_to_dict, stream_events, submit_job
+from app.services.analysis_service import ANALYSIS_MODES, get_campaigns_data, run_analysis
+from app.services.context_encoder import encode_campaigns
+from app.services.conversation_service import (
+    append_turns, create_conversation, get_conversation, prompt_history, schedule_compaction,
+)
+from app.core.config import settings
+from app.schemas.approval import AIAnalysisRequest, AIChatMessage, ConversationOut, ConversationTurnOut
 
 router = APIRouter()
 
 
-def _get_campaigns_data(user: User, account_ids: Optional[List[str]], date_preset: str) -> List[dict]:
-    """Busca dados de campanhas de todas as contas ou das contas especificadas."""
-    if not user.meta_access_token:
-        raise HTTPException(400, "Conta Meta não conectada.")
-
-    meta = MetaService(access_token=user.meta_access_token)
+@router.post("/analyze", summary="Análise completa de campanhas com IA")
+async def analyze_with_ai(
+    request: AIAnalysisRequest,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    """
+    Solicita ao Claude uma análise completa das campanhas.
+    O Claude cria sugestões de otimização que aparecem na fila de aprovações.
 
-    if not account_ids:
-        accounts = meta.get_ad_accounts()
-        account_ids = [a["account_id"] for a in accounts[:5]]  # Limita a 5 contas por análise
+    Antes da IA, as regras automáticas criam as sugestões claras (ROAS < 0.5,
+    CPC > 3x a mediana, gasto alto sem conversões, ROAS > 2) e só as campanhas
+    com alerta ou limítrofes são enviadas ao modelo.
 
-    all_campaigns = []
-    for account_id in account_ids:
-        try:
-            insights = meta.get_campaign_insights(account_id=account_id, date_preset=date_preset)
-            campaigns = meta.get_campaigns(account_id=account_id)
+    - `mode=single`: uma análise com todas as campanhas (até 5 contas).
+    - `mode=map_reduce`: todas as contas, cada uma analisada em paralelo, mais
+      um resumo consolidado do portfólio.
+    - `mode=rules`: só as regras automáticas, sem IA (todas as contas).
 
-            # Enriquece insights com status da campanha
-            status_map = {c["campaign_id"]: c["status"] for c in campaigns}
-            for insight in insights:
-                insight["status"] = status_map.get(insight["campaign_id"], "UNKNOWN")
-                all_campaigns.append(insight)
-        except Exception:
-            continue
+    Se os dados das campanhas, a instrução e o período não mudaram desde a última
+    análise (dentro de AI_ANALYSIS_CACHE_TTL_MINUTES), devolve o resultado salvo
+    e as aprovações que ele criou (`cached: true`). Use `force: true` para refazer.
 
-    return all_campaigns
+    Para análises longas, prefira `POST /analyze/jobs` (não bloqueia a requisição).
+    """
+    _validate_mode(request)
+    try:
+        return await run_analysis(db, current_user, request)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(500, f"Erro na análise: {str(e)}")
 
 
-@router.post("/analyze", summary="Análise completa de campanhas com IA")
-def analyze_with_ai(
+@router.post("/analyze/jobs", status_code=202, summary="Análise com IA em segundo plano")
+async def create_analysis_job(
     request: AIAnalysisRequest,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
 ):
     """
-    Solicita ao Claude uma análise completa das campanhas.
-    O Claude cria sugestões de otimização que aparecem na fila de aprovações.
+    Mesma análise de `POST /analyze`, executada em segundo plano.
+    Retorna o `job_id` na hora; acompanhe em `GET /analyze/jobs/{job_id}/events`
+    (SSE) e consulte o resultado em `GET /analyze/jobs/{job_id}`.
     """
-    try:
-        campaigns_data = _get_campaigns_data(
-            user=current_user,
-            account_ids=request.account_ids,
-            date_preset=request.date_preset,
-        )
+    _validate_mode(request)
+    job = await submit_job(db, current_user.id, request)
+    return {"job_id": job.id, "status": job.status}
 
-        if not campaigns_data:
-            return {"analysis": "Nenhuma campanha encontrada para o período selecionado.", "suggestions_created": 0}
 
-        analysis_text = analyze_campaigns(
-            campaigns_data=campaigns_data,
-            db=db,
-            user_id=current_user.id,
-            custom_prompt=request.custom_prompt,
-        )
+@router.get("/analyze/jobs/{job_id}", summary="Status e resultado de um job de análise")
+async def get_analysis_job(
+    job_id: int,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db),
+):
+    return job_to_dict(await db.run_sync(get_job, current_user.id, job_id))
 
-        # Conta sugestões criadas
-        from app.models.approval import Approval, ApprovalStatus
-        from datetime import datetime, timedelta
-        recent_count = (
-            db.query(Approval)
-            .filter(
-                Approval.user_id == current_user.id,
-                Approval.status == ApprovalStatus.PENDING,
-                Approval.created_at >= datetime.utcnow() - timedelta(minutes=5),
-            )
-            .count()
-        )
 
-        return {
-            "analysis": analysis_text,
-            "suggestions_created": recent_count,
-        }
+@router.get("/analyze/jobs/{job_id}/events", summary="Progresso do job de análise (SSE)")
+async def analysis_job_events(
+    job_id: int,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Server-Sent Events do job: `accounts` (contas e campanhas buscadas), `rules`
+    (pré-triagem), `tool_call`, `approval` (sugestão criada) e, por fim,
+    `result` (análise completa) ou `error`. Eventos já emitidos são reenviados.
+    """
+    await db.run_sync(get_job, current_user.id, job_id)
 
-    except Exception as e:
-        raise HTTPException(500, f"Erro na análise: {str(e)}")
+    async def generate():
+        async for item in stream_events(job_id):
+            yield f"event: {item['event']}\ndata: {json.dumps(item['data'], ensure_ascii=False)}\n\n"
+
+    return StreamingResponse(
+        generate(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+def _validate_mode(request: AIAnalysisRequest) -> None:
+    if request.mode not in ANALYSIS_MODES:
+        raise HTTPException(400, "Modo inválido. Use 'single', 'map_reduce' ou 'rules'.")
 
 
 @router.post("/chat", summary="Chat com IA (streaming)")
-def chat_stream(
+async def chat_stream(
     request: AIChatMessage,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
@@ -102,23 +126,59 @@ def chat_stream(
     """
     Chat interativo com a IA via Server-Sent Events (streaming).
     O Claude pode sugerir otimizações durante o chat.
+    O streaming é assíncrono: só a busca no Meta (SDK síncrono) passa pelo threadpool.
+
+    A conversa fica salva no servidor: envie `conversation_id` (retornado no header
+    `X-Conversation-Id`) para continuar. As campanhas só são buscadas ao iniciar a conversa.
+
+    O texto chega em eventos `data:`; o progresso das ferramentas em eventos
+    `event: tool` com JSON ({status: started|done, tool, approval_id, message}).
     """
+    # db (síncrona) é usada pelas ferramentas da IA a partir de threads — por isso não é a AsyncSession
+    recorder = RunRecorder("chat", current_user.id)
     try:
-        campaigns_data = _get_campaigns_data(
-            user=current_user,
-            account_ids=request.account_ids,
-            date_preset="last_7d",
-        )
+        if request.conversation_id:
+            conversation = await run_in_threadpool(
+                get_conversation, db, current_user.id, request.conversation_id,
+            )
+        else:
+            fetch_started = time.perf_counter()
+            campaigns_data = await run_in_threadpool(
+                get_campaigns_data,
+                user=current_user,
+                account_ids=request.account_ids,
+                date_preset="last_7d",
+            )
+            recorder.meta_fetch_ms = int((time.perf_counter() - fetch_started) * 1000)
+            context = encode_campaigns(campaigns_data, token_budget=settings.AI_CHAT_CONTEXT_TOKEN_BUDGET)
+            conversation = await run_in_threadpool(
+                create_conversation, db, current_user.id, context, request.message,
+            )
+
+        conversation_id = conversation.id
+        context = conversation.context
+        summary, history = await run_in_threadpool(prompt_history, db, conversation_id)
 
-        def generate():
+        async def generate():
+            parts = []
             try:
-                for chunk in chat_with_ai(
+                async for kind, payload in chat_with_ai(
                     message=request.message,
-                    campaigns_data=campaigns_data,
+                    context=context,
                     db=db,
                     user_id=current_user.id,
+                    conversation_history=history,
+                    summary=summary,
+                    recorder=recorder,
                 ):
-                    yield f"data: {chunk}\n\n"
+                    if kind == "tool":
+                        yield f"event: tool\ndata: {json.dumps(payload, ensure_ascii=False)}\n\n"
+                        continue
+                    parts.append(payload)
+                    yield f"data: {payload}\n\n"
+                await run_in_threadpool(append_turns, db, conversation_id, request.message, "".join(parts))
+                await run_in_threadpool(save_run, recorder)
+                schedule_compaction(conversation_id)
                 yield "data: [DONE]\n\n"
             except Exception as e:
                 yield f"data: Erro: {str(e)}\n\n"
@@ -130,8 +190,58 @@ def chat_stream(
             headers={
                 "Cache-Control": "no-cache",
                 "X-Accel-Buffering": "no",
+                "X-Conversation-Id": str(conversation_id),
             },
         )
 
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(500, f"Erro no chat: {str(e)}")
+
+
+@router.get("/conversations", response_model=List[ConversationOut], summary="Listar conversas")
+async def list_conversations(
+    limit: int = 20,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Conversas do usuário, da mais recente para a mais antiga."""
+    conversations = await db.scalars(
+        select(Conversation)
+        .where(Conversation.user_id == current_user.id)
+        .order_by(Conversation.updated_at.desc())
+        .limit(min(limit, 100))
+    )
+    return conversations.all()
+
+
+@router.get(
+    "/conversations/{conversation_id}",
+    response_model=List[ConversationTurnOut],
+    summary="Mensagens de uma conversa",
+)
+async def get_conversation_turns(
+    conversation_id: int,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Todas as mensagens da conversa (inclusive as já resumidas)."""
+    return await db.run_sync(
+        lambda session: get_conversation(session, current_user.id, conversation_id).turns
+    )
+
+
+@router.get("/metrics", summary="Métricas de uso e latência da IA")
+async def ai_metrics(
+    days: int = 7,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Métricas agregadas por tipo de execução (análise, chat, resumo...): tokens
+    (inclusive de cache), custo estimado, tempo até o primeiro token, duração,
+    iterações do loop, chamadas de ferramentas e tempo de busca no Meta.
+    """
+    days = max(1, min(days, 90))
+    return {"days": days, "runs": await db.run_sync(summarize_runs, current_user.id, days)}
@@ -1,15 +1,20 @@
 """
 Fila de aprovações — gerencia sugestões de otimização criadas pela IA.
 """
+import json
+from decimal import Decimal
 from typing import Optional, List
 from datetime import datetime
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from sqlalchemy import Numeric, func, literal_column, select, tuple_, type_coerce
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.pagination import decode_cursor, encode_cursor
 from app.core.security import get_current_user
-from app.models.database import get_db
+from app.models.database import get_async_db
 from app.models.user import User
-from app.models.approval import Approval, ApprovalStatus
+from app.models.approval import NEW_BUDGET_SQL, Approval, ApprovalStatus
 from app.schemas.approval import ApprovalOut, ApprovalDecision
 from app.services.optimization_service import execute_approved_action
 
@@ -17,60 +22,115 @@ router = APIRouter()
 
 
 @router.get("", response_model=List[ApprovalOut], summary="Listar aprovações")
-def list_approvals(
+async def list_approvals(
+    response: Response,
     status: Optional[str] = Query(None, description="Filtrar por status: pending, approved, rejected, executed"),
-    limit: int = Query(50, le=200),
+    account_id: Optional[str] = Query(None, description="Filtrar por conta de anúncios"),
+    campaign_id: Optional[str] = Query(None, description="Filtrar por campanha"),
+    action_type: Optional[str] = Query(None, description="Filtrar por tipo de ação"),
+    created_from: Optional[datetime] = Query(None, description="Criadas a partir de (inclusive)"),
+    created_to: Optional[datetime] = Query(None, description="Criadas antes de (exclusivo)"),
+    min_budget: Optional[Decimal] = Query(None, description="adjust_budget com novo orçamento ≥ valor (R$/dia)"),
+    max_budget: Optional[Decimal] = Query(None, description="adjust_budget com novo orçamento ≤ valor (R$/dia)"),
+    payload: Optional[str] = Query(None, description='JSON contido no payload, ex: {"adset_id": "123"}'),
+    cursor: Optional[str] = Query(None, description="Valor de X-Next-Cursor da página anterior"),
+    limit: int = Query(50, ge=1, le=200),
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
-    """Retorna a fila de sugestões de otimização da IA."""
-    query = db.query(Approval).filter(Approval.user_id == current_user.id)
+    """
+    Retorna a fila de sugestões de otimização da IA, das mais recentes para as
+    mais antigas. Se houver mais resultados, o header X-Next-Cursor traz o
+    cursor da próxima página.
+
+    Os filtros por payload rodam no banco: `min_budget`/`max_budget` (ex: todas as
+    mudanças de orçamento pendentes acima de R$ 500) e `payload` (contém o JSON).
+    """
+    query = select(Approval).where(Approval.user_id == current_user.id)
     if status:
-        query = query.filter(Approval.status == status)
-    return query.order_by(Approval.created_at.desc()).limit(limit).all()
+        query = query.where(Approval.status == status)
+    if account_id:
+        query = query.where(Approval.account_id == account_id)
+    if campaign_id:
+        query = query.where(Approval.campaign_id == campaign_id)
+    if action_type:
+        query = query.where(Approval.action_type == action_type)
+    if created_from:
+        query = query.where(Approval.created_at >= created_from)
+    if created_to:
+        query = query.where(Approval.created_at < created_to)
+    if min_budget is not None or max_budget is not None:
+        # Tipada como NUMERIC: os limites vão como $n::NUMERIC e a comparação usa a
+        # expressão do índice ix_approvals_user_action_budget (com float8, não usaria)
+        new_budget = literal_column(NEW_BUDGET_SQL, type_=Numeric)
+        query = query.where(Approval.action_type == "adjust_budget")
+        if min_budget is not None:
+            query = query.where(new_budget >= min_budget)
+        if max_budget is not None:
+            query = query.where(new_budget <= max_budget)
+    if payload:
+        try:
+            contained = json.loads(payload)
+        except ValueError:
+            raise HTTPException(400, "payload deve ser um objeto JSON")
+        if not isinstance(contained, dict):
+            raise HTTPException(400, "payload deve ser um objeto JSON")
+        # @> do JSONB (servido pelo índice GIN ix_approvals_payload)
+        query = query.where(type_coerce(Approval.payload, JSONB).contains(contained))
+    if cursor:
+        query = query.where(tuple_(Approval.created_at, Approval.id) < tuple_(*decode_cursor(cursor)))
+
+    # Busca um item a mais só para saber se existe próxima página
+    items = list(await db.scalars(
+        query.order_by(Approval.created_at.desc(), Approval.id.desc()).limit(limit + 1)
+    ))
+    if len(items) > limit:
+        items = items[:limit]
+        response.headers["X-Next-Cursor"] = encode_cursor(items[-1].created_at, items[-1].id)
+    return items
 
 
 @router.get("/pending/count", summary="Contador de aprovações pendentes")
-def count_pending(
+async def count_pending(
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """Retorna o número de sugestões aguardando aprovação (para badge no menu)."""
-    count = (
-        db.query(Approval)
-        .filter(Approval.user_id == current_user.id, Approval.status == ApprovalStatus.PENDING)
-        .count()
+    count = await db.scalar(
+        select(func.count())
+        .select_from(Approval)
+        .where(Approval.user_id == current_user.id, Approval.status == ApprovalStatus.PENDING)
     )
     return {"pending": count}
 
 
 @router.get("/{approval_id}", response_model=ApprovalOut, summary="Detalhe de uma aprovação")
-def get_approval(
+async def get_approval(
     approval_id: int,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
-    approval = db.query(Approval).filter(
-        Approval.id == approval_id, Approval.user_id == current_user.id
-    ).first()
+    approval = await db.scalar(
+        select(Approval).where(Approval.id == approval_id, Approval.user_id == current_user.id)
+    )
     if not approval:
         raise HTTPException(404, "Aprovação não encontrada")
     return approval
 
 
 @router.post("/{approval_id}/approve", summary="Aprovar e executar ação")
-def approve_action(
+async def approve_action(
     approval_id: int,
     decision: ApprovalDecision = ApprovalDecision(),
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """
     Aprova a sugestão da IA e executa a ação imediatamente via Meta API.
     """
-    approval = db.query(Approval).filter(
-        Approval.id == approval_id, Approval.user_id == current_user.id
-    ).first()
+    approval = await db.scalar(
+        select(Approval).where(Approval.id == approval_id, Approval.user_id == current_user.id)
+    )
     if not approval:
         raise HTTPException(404, "Aprovação não encontrada")
     if approval.status != ApprovalStatus.PENDING:
@@ -78,10 +138,10 @@ def approve_action(
 
     approval.status = ApprovalStatus.APPROVED
     approval.decided_at = datetime.utcnow()
-    db.commit()
+    await db.commit()
 
     # Executa a ação via Meta API
-    result = execute_approved_action(approval=approval, db=db)
+    result = await execute_approved_action(approval=approval, user=current_user, db=db)
 
     if result["success"]:
         return {"message": result["message"], "status": "executed"}
@@ -90,16 +150,16 @@ def approve_action(
 
 
 @router.post("/{approval_id}/reject", summary="Rejeitar sugestão")
-def reject_action(
+async def reject_action(
     approval_id: int,
     decision: ApprovalDecision = ApprovalDecision(),
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """Rejeita a sugestão da IA sem executar nenhuma ação."""
-    approval = db.query(Approval).filter(
-        Approval.id == approval_id, Approval.user_id == current_user.id
-    ).first()
+    approval = await db.scalar(
+        select(Approval).where(Approval.id == approval_id, Approval.user_id == current_user.id)
+    )
     if not approval:
         raise HTTPException(404, "Aprovação não encontrada")
     if approval.status != ApprovalStatus.PENDING:
@@ -109,34 +169,36 @@ def reject_action(
     approval.decided_at = datetime.utcnow()
     if decision.notes:
         approval.execution_result = f"Rejeitado: {decision.notes}"
-    db.commit()
+    await db.commit()
 
     return {"message": "Sugestão rejeitada com sucesso"}
 
 
 @router.post("/bulk/approve", summary="Aprovar múltiplas sugestões")
-def bulk_approve(
+async def bulk_approve(
     approval_ids: List[int],
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """Aprova e executa múltiplas sugestões de uma vez."""
     results = []
     for approval_id in approval_ids:
-        approval = db.query(Approval).filter(
-            Approval.id == approval_id,
-            Approval.user_id == current_user.id,
-            Approval.status == ApprovalStatus.PENDING,
-        ).first()
+        approval = await db.scalar(
+            select(Approval).where(
+                Approval.id == approval_id,
+                Approval.user_id == current_user.id,
+                Approval.status == ApprovalStatus.PENDING,
+            )
+        )
         if not approval:
             results.append({"id": approval_id, "status": "not_found"})
             continue
 
         approval.status = ApprovalStatus.APPROVED
         approval.decided_at = datetime.utcnow()
-        db.commit()
+        await db.commit()
 
-        result = execute_approved_action(approval=approval, db=db)
+        result = await execute_approved_action(approval=approval, user=current_user, db=db)
         results.append({
             "id": approval_id,
             "status": "executed" if result["success"] else "failed",
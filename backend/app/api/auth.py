@@ -5,13 +5,16 @@ Fluxo: /api/auth/meta → usuário autoriza no Meta → /api/auth/callback → J
 from datetime import datetime, timedelta
 from urllib.parse import urlencode
 from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
 from fastapi.responses import RedirectResponse, JSONResponse
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 import httpx
 
+from app.core.api_keys import invalidate_api_key
 from app.core.config import settings
-from app.core.security import create_access_token, get_current_user
-from app.models.database import get_db
+from app.core.security import create_access_token, get_current_user, invalidate_user
+from app.models.database import get_async_db
 from app.models.user import User, ApiKey
 from app.services.meta_service import MetaService
 
@@ -24,7 +27,7 @@ META_SCOPES = "business_management,ads_management,ads_read,email"
 
 
 @router.get("/meta", summary="Iniciar login com Meta")
-def start_meta_oauth():
+async def start_meta_oauth():
     """Redireciona o usuário para a tela de autorização do Meta."""
     if not settings.META_APP_ID:
         raise HTTPException(500, "META_APP_ID não configurado. Configure a variável de ambiente no servidor.")
@@ -39,19 +42,19 @@ def start_meta_oauth():
 
 
 @router.get("/callback", summary="Callback OAuth do Meta")
-def meta_oauth_callback(code: str, state: str = None, db: Session = Depends(get_db)):
+async def meta_oauth_callback(code: str, state: str = None, db: AsyncSession = Depends(get_async_db)):
     """Recebe o código do Meta, troca por token e cria/atualiza o usuário."""
     # Troca código por token curto
-    async_client = httpx.Client()
-    token_response = async_client.get(
-        META_TOKEN_URL,
-        params={
-            "client_id": settings.META_APP_ID,
-            "client_secret": settings.META_APP_SECRET,
-            "redirect_uri": settings.META_REDIRECT_URI,
-            "code": code,
-        },
-    )
+    async with httpx.AsyncClient() as client:
+        token_response = await client.get(
+            META_TOKEN_URL,
+            params={
+                "client_id": settings.META_APP_ID,
+                "client_secret": settings.META_APP_SECRET,
+                "redirect_uri": settings.META_REDIRECT_URI,
+                "code": code,
+            },
+        )
     token_data = token_response.json()
     if "error" in token_data:
         raise HTTPException(400, f"Erro OAuth: {token_data['error'].get('message')}")
@@ -60,16 +63,16 @@ def meta_oauth_callback(code: str, state: str = None, db: Session = Depends(get_
 
     # Troca por token longo (60 dias)
     meta = MetaService(access_token=short_token)
-    long_token_data = meta.exchange_long_lived_token(short_token)
+    long_token_data = await run_in_threadpool(meta.exchange_long_lived_token, short_token)
     long_token = long_token_data["access_token"]
     expires_in = long_token_data.get("expires_in", 5183944)
 
     # Busca info do usuário no Meta
     meta_long = MetaService(access_token=long_token)
-    user_info = meta_long.get_user_info()
+    user_info = await run_in_threadpool(meta_long.get_user_info)
 
     # Cria ou atualiza usuário no banco
-    user = db.query(User).filter(User.meta_user_id == user_info["id"]).first()
+    user = await db.scalar(select(User).where(User.meta_user_id == user_info["id"]))
     if not user:
         user = User(
             meta_user_id=user_info["id"],
@@ -82,8 +85,9 @@ def meta_oauth_callback(code: str, state: str = None, db: Session = Depends(get_
     user.meta_token_expires_at = datetime.utcnow() + timedelta(seconds=expires_in)
     user.name = user_info["name"]
     user.email = user_info.get("email")
-    db.commit()
-    db.refresh(user)
+    await db.commit()
+    # Usuário e API Keys em cache ainda têm o token Meta anterior
+    invalidate_user(user.id)
 
     # Gera JWT da aplicação
     jwt_token = create_access_token(data={"sub": str(user.id)})
@@ -93,7 +97,7 @@ def meta_oauth_callback(code: str, state: str = None, db: Session = Depends(get_
 
 
 @router.get("/me", summary="Dados do usuário autenticado")
-def get_me(current_user: User = Depends(get_current_user)):
+async def get_me(current_user: User = Depends(get_current_user)):
     """Retorna dados do usuário logado."""
     return {
         "id": current_user.id,
@@ -107,14 +111,14 @@ def get_me(current_user: User = Depends(get_current_user)):
 # === API KEYS (para N8N) ===
 
 @router.get("/api-keys", summary="Listar API Keys")
-def list_api_keys(current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+async def list_api_keys(current_user: User = Depends(get_current_user), db: AsyncSession = Depends(get_async_db)):
     """Lista as API Keys do usuário (para N8N e integrações)."""
-    keys = db.query(ApiKey).filter(ApiKey.user_id == current_user.id).all()
+    keys = await db.scalars(select(ApiKey).where(ApiKey.user_id == current_user.id))
     return [
         {
             "id": k.id,
             "name": k.name,
-            "key_preview": k.key[:8] + "...",
+            "key_preview": k.key_prefix + "...",
             "is_active": k.is_active,
             "created_at": k.created_at,
             "last_used_at": k.last_used_at,
@@ -124,16 +128,21 @@ def list_api_keys(current_user: User = Depends(get_current_user), db: Session =
 
 
 @router.post("/api-keys", summary="Criar API Key")
-def create_api_key(
+async def create_api_key(
     name: str,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """Cria uma nova API Key para uso com N8N ou outras integrações."""
     key_value = ApiKey.generate_key()
-    api_key = ApiKey(user_id=current_user.id, name=name, key=key_value)
+    api_key = ApiKey(
+        user_id=current_user.id,
+        name=name,
+        key_hash=ApiKey.hash_key(key_value),
+        key_prefix=key_value[:8],
+    )
     db.add(api_key)
-    db.commit()
+    await db.commit()
     return {
         "id": api_key.id,
         "name": name,
@@ -143,14 +152,15 @@ def create_api_key(
 
 
 @router.delete("/api-keys/{key_id}", summary="Revogar API Key")
-def revoke_api_key(
+async def revoke_api_key(
     key_id: int,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
-    key = db.query(ApiKey).filter(ApiKey.id == key_id, ApiKey.user_id == current_user.id).first()
+    key = await db.scalar(select(ApiKey).where(ApiKey.id == key_id, ApiKey.user_id == current_user.id))
     if not key:
         raise HTTPException(404, "API Key não encontrada")
     key.is_active = False
-    db.commit()
+    await db.commit()
+    invalidate_api_key(key.key_hash)
     return {"message": "API Key revogada com sucesso"}
@@ -4,12 +4,15 @@ Acessíveis via JWT (painel) ou API Key (N8N).
 """
 import logging
 from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.http_cache import compute_etag, insights_data_version, raise_if_not_modified
 from app.core.security import get_current_user, get_n8n_user
-from app.models.database import get_db
+from app.models.database import get_async_db
 from app.models.user import User
+from app.services.insights_cache import cache_key, cache_stats, get_cached, save_cached
 from app.services.meta_service import MetaService
 
 logger = logging.getLogger(__name__)
@@ -23,46 +26,85 @@ def _get_meta_service(user: User) -> MetaService:
     return MetaService(access_token=user.meta_access_token)
 
 
+async def _conditional_user(
+    request: Request,
+    response: Response,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db),
+) -> User:
+    """
+    Usuário autenticado + GET condicional: responde 304 antes de consultar o Meta
+    quando o If-None-Match corresponde à versão atual dos dados de insights.
+    """
+    etag = compute_etag(request, await insights_data_version(db, current_user))
+    raise_if_not_modified(request, etag)
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = "private, no-cache"
+    return current_user
+
+
 @router.get("/business-managers", summary="Listar Business Managers")
-def list_business_managers(current_user: User = Depends(get_current_user)):
+async def list_business_managers(current_user: User = Depends(_conditional_user)):
     """Retorna todos os Business Managers acessíveis."""
     meta = _get_meta_service(current_user)
     try:
-        return meta.get_business_managers()
+        return await run_in_threadpool(meta.get_business_managers)
     except ValueError as e:
         raise HTTPException(400, str(e))
 
 
 @router.get("/accounts", summary="Listar contas de anúncio")
-def list_ad_accounts(
+async def list_ad_accounts(
     business_id: Optional[str] = Query(None, description="Filtrar por Business Manager"),
-    current_user: User = Depends(get_current_user),
+    current_user: User = Depends(_conditional_user),
 ):
     """Retorna contas de anúncio. Filtra por BM se business_id fornecido."""
     meta = _get_meta_service(current_user)
     try:
-        return meta.get_ad_accounts(business_id=business_id)
+        return await run_in_threadpool(meta.get_ad_accounts, business_id=business_id)
     except ValueError as e:
         raise HTTPException(400, str(e))
 
 
-# IMPORTANTE: rota com sub-path deve vir ANTES de /{account_id}
+# IMPORTANTE: rotas com sub-path devem vir ANTES de /{account_id}
+@router.get("/cache/stats", summary="Estatísticas do cache de insights")
+async def get_insights_cache_stats(
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Entradas e tamanho (comprimido e original) do cache de insights do usuário,
+    tamanho da tabela e contadores do processo: acertos, falhas, descartes LRU
+    e expiradas apagadas.
+    """
+    return await cache_stats(db, current_user.id)
+
+
 @router.get("/{account_id}/insights", summary="Insights de campanhas")
-def get_campaign_insights(
+async def get_campaign_insights(
     account_id: str,
     date_preset: str = Query("last_7d", description="Período: last_7d, last_30d, this_month, last_month"),
     campaign_id: Optional[str] = Query(None, description="Filtrar por campanha específica"),
-    current_user: User = Depends(get_current_user),
+    current_user: User = Depends(_conditional_user),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """
     Retorna métricas de campanhas: impressões, cliques, gasto, ROAS, etc.
     Campanhas ATIVAS sem dados no período aparecem com métricas zeradas.
+    Servido do cache de insights por até INSIGHT_CACHE_TTL_MINUTES.
     """
     meta = _get_meta_service(current_user)
+    key = cache_key(kind="campaign_insights", account_id=account_id, date_preset=date_preset, campaign_id=campaign_id)
+    cached = await get_cached(db, current_user.id, key)
+    if cached is not None:
+        return cached
+    # Respostas parciais (falha em uma das buscas) não vão para o cache
+    complete = True
     try:
         # Busca insights do período (pode retornar vazio se não há atividade)
         try:
-            insights = meta.get_campaign_insights(
+            insights = await run_in_threadpool(
+                meta.get_campaign_insights,
                 account_id=account_id,
                 date_preset=date_preset,
                 campaign_id=campaign_id,
@@ -70,13 +112,15 @@ def get_campaign_insights(
         except Exception as e:
             logger.warning(f"Sem insights para {account_id} em {date_preset}: {e}")
             insights = []
+            complete = False
 
         # Busca todas as campanhas da conta
         try:
-            campaigns = meta.get_campaigns(account_id=account_id)
+            campaigns = await run_in_threadpool(meta.get_campaigns, account_id=account_id)
         except Exception as e:
             logger.error(f"Erro ao buscar campanhas de {account_id}: {e}")
             campaigns = []
+            complete = False
 
         # Garante que campanhas ATIVAS aparecem mesmo sem dados no período
         insight_ids = {i["campaign_id"] for i in insights}
@@ -93,23 +137,34 @@ def get_campaign_insights(
                     "account_id": account_id,
                     "date_start": None, "date_stop": None,
                 })
-
-        return insights
     except Exception as e:
         raise HTTPException(400, str(e))
 
+    if complete:
+        await save_cached(
+            db, current_user.id, key, insights,
+            account_id=account_id, date_preset=date_preset, campaign_id=campaign_id,
+        )
+    return insights
+
 
 @router.get("/{account_id}/{campaign_id}/adsets", summary="Insights de conjuntos de anúncios")
-def get_adset_insights(
+async def get_adset_insights(
     account_id: str,
     campaign_id: str,
     date_preset: str = Query("last_7d"),
-    current_user: User = Depends(get_current_user),
+    current_user: User = Depends(_conditional_user),
+    db: AsyncSession = Depends(get_async_db),
 ):
-    """Retorna métricas de conjuntos de anúncios de uma campanha."""
+    """Retorna métricas de conjuntos de anúncios de uma campanha (com cache de insights)."""
     meta = _get_meta_service(current_user)
+    key = cache_key(kind="adset_insights", account_id=account_id, date_preset=date_preset, campaign_id=campaign_id)
+    cached = await get_cached(db, current_user.id, key)
+    if cached is not None:
+        return cached
     try:
-        return meta.get_adset_insights(
+        adsets = await run_in_threadpool(
+            meta.get_adset_insights,
             account_id=account_id,
             campaign_id=campaign_id,
             date_preset=date_preset,
@@ -117,15 +172,21 @@ def get_adset_insights(
     except ValueError as e:
         raise HTTPException(400, str(e))
 
+    await save_cached(
+        db, current_user.id, key, adsets,
+        account_id=account_id, date_preset=date_preset, campaign_id=campaign_id,
+    )
+    return adsets
+
 
 @router.get("/{account_id}", summary="Listar campanhas de uma conta")
-def list_campaigns(
+async def list_campaigns(
     account_id: str,
-    current_user: User = Depends(get_current_user),
+    current_user: User = Depends(_conditional_user),
 ):
     """Retorna todas as campanhas de uma conta de anúncio."""
     meta = _get_meta_service(current_user)
     try:
-        return meta.get_campaigns(account_id)
+        return await run_in_threadpool(meta.get_campaigns, account_id)
     except ValueError as e:
         raise HTTPException(400, str(e))
@@ -2,56 +2,195 @@
 Relatórios — endpoints para N8N, exportação PDF e dados consolidados.
 Autenticação: JWT (painel) ou API Key (N8N).
 """
+import hashlib
+import io
+import json
 import logging
-from datetime import datetime
-from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, Query
-from fastapi.responses import Response
-from sqlalchemy.orm import Session
-
+import re
+import unicodedata
+import zipfile
+from datetime import datetime, date, timedelta
+from typing import Dict, Iterator, List, Optional, Tuple
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, StreamingResponse
+from sqlalchemy import case, delete, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.http_cache import compute_etag, raise_if_not_modified
 from app.core.security import get_current_user, get_n8n_user
-from app.models.database import get_db
+from app.models.database import get_async_db
 from app.models.user import User
+from app.models.report_snapshot import ReportPdf, ReportSnapshot
 from app.services.meta_service import MetaService
-from app.services.pdf_service import generate_campaign_report
+from app.services.metrics_store import GRANULARITIES, get_trend
+from app.services.pdf_service import generate_campaign_report, generate_campaign_reports
+from app.services.export_service import EXPORT_COLUMNS, iter_csv, iter_xlsx
 from app.schemas.report import ReportSummary, CampaignReportRow, N8NReportResponse
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
+PRESET_LABELS = {
+    "last_7d": "Últimos 7 Dias",
+    "last_30d": "Últimos 30 Dias",
+    "this_month": "Este Mês",
+    "last_month": "Mês Passado",
+}
+
+# Linha gravada no CSV/XLSX quando a leitura de uma conta falha no meio da exportação
+EXPORT_ERROR_MESSAGE = "ERRO: falha ao ler esta conta no Meta — dados da conta incompletos nesta exportação"
+
+
+async def _get_report_data(
+    db: AsyncSession,
+    user: User,
+    account_ids: Optional[List[str]],
+    date_preset: str,
+    request: Optional[Request] = None,
+    weak_etag: bool = False,
+) -> dict:
+    """
+    Retorna o relatório a partir do snapshot materializado em report_snapshots.
+    O snapshot só é recalculado (via _fetch_report_data) quando as entradas mudam,
+    quando foi invalidado por uma ação executada ou após REPORT_SNAPSHOT_TTL_MINUTES.
 
-def _fetch_report_data(user: User, account_ids: Optional[List[str]], date_preset: str) -> dict:
-    """Busca e consolida dados de relatório de múltiplas contas."""
+    Com `request`, responde 304 (sem consultar o Meta nem gerar PDF) se o
+    If-None-Match corresponde à versão do snapshot ainda válido; `weak_etag`
+    para as rotas que regeneram o arquivo (ver _report_etag).
+    """
     if not user.meta_access_token:
         raise HTTPException(400, "Conta Meta não conectada")
 
-    meta = MetaService(access_token=user.meta_access_token)
+    key = _snapshot_key(user, account_ids, date_preset)
+    snapshot = await db.scalar(
+        select(ReportSnapshot).where(
+            ReportSnapshot.user_id == user.id,
+            ReportSnapshot.accounts_key == key["accounts_key"],
+            ReportSnapshot.date_preset == date_preset,
+            ReportSnapshot.data_date == key["data_date"],
+        )
+    )
+    if snapshot and _snapshot_is_fresh(snapshot, key["inputs_hash"]):
+        if request is not None:
+            raise_if_not_modified(request, _report_etag(request, user, snapshot.version, weak=weak_etag))
+        return {
+            "campaigns": json.loads(snapshot.campaigns),
+            "summary": json.loads(snapshot.summary),
+            "account_names": json.loads(snapshot.account_names),
+            "snapshot_version": snapshot.version,
+        }
+
+    data = await run_in_threadpool(
+        _fetch_report_data, user=user, account_ids=account_ids, date_preset=date_preset, resolve_names=True,
+    )
+    data["snapshot_version"] = await _save_snapshot(db, user, date_preset, key, data)
+    return data
 
-    if not account_ids:
-        # 1. Busca contas diretas do usuário
-        accounts = meta.get_ad_accounts()
 
-        # 2. Se não encontrou contas diretas, busca via Business Managers
-        #    (caso mais comum para agências e empresas que usam BM)
-        if not accounts:
-            logger.info("Nenhuma conta direta — buscando via Business Managers...")
-            try:
-                businesses = meta.get_business_managers()
-                logger.info(f"Business Managers encontrados: {len(businesses)} — {[b['name'] for b in businesses]}")
-                for bm in businesses:
-                    try:
-                        bm_accounts = meta.get_ad_accounts(business_id=bm["id"])
-                        accounts.extend(bm_accounts)
-                    except Exception as e:
-                        logger.error(f"Erro ao buscar contas do BM {bm['id']}: {e}")
-            except Exception as e:
-                logger.error(f"Erro ao buscar Business Managers: {e}")
+def _report_etag(request: Request, user: User, version: Optional[int], weak: bool = False) -> Optional[str]:
+    """
+    ETag de um relatório: versão do snapshot + data + path/query da requisição.
+    `weak` para PDFs e ZIPs renderizados a cada requisição: o conteúdo é o mesmo,
+    mas os bytes mudam (data de geração, metadados do PDF).
+    """
+    if version is None:
+        return None
+    etag = compute_etag(request, user.id, datetime.utcnow().date().isoformat(), version)
+    return f"W/{etag}" if weak else etag
+
+
+def _etag_headers(etag: Optional[str]) -> Dict[str, str]:
+    return {"ETag": etag, "Cache-Control": "private, no-cache"} if etag else {}
+
+
+def _snapshot_key(user: User, account_ids: Optional[List[str]], date_preset: str) -> dict:
+    """Chave do snapshot e hash das entradas que determinam seu conteúdo."""
+    accounts_key = (
+        hashlib.sha256(",".join(sorted(set(account_ids))).encode()).hexdigest()
+        if account_ids else "all"
+    )
+    data_date = datetime.utcnow().date().isoformat()
+    token_hash = hashlib.sha256((user.meta_access_token or "").encode()).hexdigest()
+    inputs_hash = hashlib.sha256(f"{accounts_key}:{date_preset}:{data_date}:{token_hash}".encode()).hexdigest()
+    return {"accounts_key": accounts_key, "data_date": data_date, "inputs_hash": inputs_hash}
+
+
+def _snapshot_is_fresh(snapshot: ReportSnapshot, inputs_hash: str) -> bool:
+    max_age = timedelta(minutes=settings.REPORT_SNAPSHOT_TTL_MINUTES)
+    return (
+        not snapshot.is_stale
+        and snapshot.inputs_hash == inputs_hash
+        and snapshot.computed_at >= datetime.utcnow() - max_age
+    )
 
-        account_ids = [a["account_id"] for a in accounts]
-        account_names = {a["account_id"]: a["name"] for a in accounts}
-        logger.info(f"Total de contas para busca: {len(account_ids)} — {[a['name'] for a in accounts]}")
-    else:
-        account_names = {}
+
+async def _save_snapshot(db: AsyncSession, user: User, date_preset: str, key: dict, data: dict) -> Optional[int]:
+    """Grava o snapshot (upsert); a versão só incrementa se o conteúdo mudou. Retorna a versão."""
+    campaigns_json = json.dumps(data["campaigns"], ensure_ascii=False)
+    summary_json = json.dumps(data["summary"], ensure_ascii=False)
+    content = {k: v for k, v in data["summary"].items() if k != "generated_at"}
+    content_hash = hashlib.sha256(
+        (campaigns_json + json.dumps(content, sort_keys=True)).encode()
+    ).hexdigest()
+
+    stmt = pg_insert(ReportSnapshot).values(
+        user_id=user.id,
+        accounts_key=key["accounts_key"],
+        date_preset=date_preset,
+        data_date=key["data_date"],
+        inputs_hash=key["inputs_hash"],
+        content_hash=content_hash,
+        version=1,
+        is_stale=False,
+        campaigns=campaigns_json,
+        summary=summary_json,
+        account_names=json.dumps(data["account_names"], ensure_ascii=False),
+        computed_at=datetime.utcnow(),
+    )
+    stmt = stmt.on_conflict_do_update(
+        constraint="uq_report_snapshots_key",
+        set_={
+            "inputs_hash": stmt.excluded.inputs_hash,
+            "content_hash": stmt.excluded.content_hash,
+            "version": case(
+                (ReportSnapshot.content_hash == stmt.excluded.content_hash, ReportSnapshot.version),
+                else_=ReportSnapshot.version + 1,
+            ),
+            "is_stale": False,
+            "campaigns": stmt.excluded.campaigns,
+            "summary": stmt.excluded.summary,
+            "account_names": stmt.excluded.account_names,
+            "computed_at": stmt.excluded.computed_at,
+        },
+    ).returning(ReportSnapshot.version)
+    try:
+        version = (await db.execute(stmt)).scalar_one()
+        await db.commit()
+        return version
+    except Exception as e:
+        await db.rollback()
+        logger.error(f"Erro ao gravar snapshot de relatório: {e}")
+        return None
+
+
+def _fetch_report_data(
+    user: User,
+    account_ids: Optional[List[str]],
+    date_preset: str,
+    resolve_names: bool = False,
+) -> dict:
+    """
+    Busca e consolida dados de relatório de múltiplas contas.
+    Com resolve_names=True, busca o nome das contas mesmo quando account_ids é informado.
+    """
+    if not user.meta_access_token:
+        raise HTTPException(400, "Conta Meta não conectada")
+
+    meta = MetaService(access_token=user.meta_access_token)
+    account_ids, account_names = _resolve_accounts(meta, account_ids, resolve_names)
 
     all_insights = []
 
@@ -98,8 +237,55 @@ def _fetch_report_data(user: User, account_ids: Optional[List[str]], date_preset
             logger.error(f"Erro na conta {account_id}: {e}")
             continue
 
-    if not all_insights:
-        return {"campaigns": [], "summary": _empty_summary(date_preset)}
+    return {
+        "campaigns": all_insights,
+        "summary": _summarize(all_insights, date_preset),
+        "account_names": {a: account_names.get(a, a) for a in account_ids},
+    }
+
+
+def _resolve_accounts(
+    meta: MetaService,
+    account_ids: Optional[List[str]],
+    resolve_names: bool = False,
+) -> Tuple[List[str], Dict[str, str]]:
+    """Retorna os IDs das contas a consultar e o mapa {account_id: nome}."""
+    if not account_ids:
+        # 1. Busca contas diretas do usuário
+        accounts = meta.get_ad_accounts()
+
+        # 2. Se não encontrou contas diretas, busca via Business Managers
+        #    (caso mais comum para agências e empresas que usam BM)
+        if not accounts:
+            logger.info("Nenhuma conta direta — buscando via Business Managers...")
+            try:
+                businesses = meta.get_business_managers()
+                logger.info(f"Business Managers encontrados: {len(businesses)} — {[b['name'] for b in businesses]}")
+                for bm in businesses:
+                    try:
+                        bm_accounts = meta.get_ad_accounts(business_id=bm["id"])
+                        accounts.extend(bm_accounts)
+                    except Exception as e:
+                        logger.error(f"Erro ao buscar contas do BM {bm['id']}: {e}")
+            except Exception as e:
+                logger.error(f"Erro ao buscar Business Managers: {e}")
+
+        account_ids = [a["account_id"] for a in accounts]
+        account_names = {a["account_id"]: a["name"] for a in accounts}
+        logger.info(f"Total de contas para busca: {len(account_ids)} — {[a['name'] for a in accounts]}")
+    elif resolve_names:
+        account_names = meta.get_ad_account_names(account_ids)
+    else:
+        account_names = {}
+    return account_ids, account_names
+
+
+def _summarize(campaigns: List[dict], period: str) -> dict:
+    """Calcula os totais e médias de um conjunto de campanhas."""
+    if not campaigns:
+        return _empty_summary(period)
+
+    all_insights = campaigns
 
     # Calcula totais
     total_spend = sum(i.get("spend", 0) for i in all_insights)
@@ -113,18 +299,15 @@ def _fetch_report_data(user: User, account_ids: Optional[List[str]], date_preset
     avg_roas = sum(roas_values) / len(roas_values) if roas_values else 0
 
     return {
-        "campaigns": all_insights,
-        "summary": {
-            "period": date_preset,
-            "total_spend": round(total_spend, 2),
-            "total_impressions": total_impressions,
-            "total_clicks": total_clicks,
-            "total_conversions": total_conversions,
-            "average_cpc": round(avg_cpc, 2),
-            "average_roas": round(avg_roas, 2),
-            "average_ctr": round(avg_ctr, 2),
-            "generated_at": datetime.utcnow().isoformat(),
-        },
+        "period": period,
+        "total_spend": round(total_spend, 2),
+        "total_impressions": total_impressions,
+        "total_clicks": total_clicks,
+        "total_conversions": total_conversions,
+        "average_cpc": round(avg_cpc, 2),
+        "average_roas": round(avg_roas, 2),
+        "average_ctr": round(avg_ctr, 2),
+        "generated_at": datetime.utcnow().isoformat(),
     }
 
 
@@ -145,37 +328,37 @@ def _empty_summary(period: str) -> dict:
 # ===== ENDPOINTS PAINEL (JWT) =====
 
 @router.get("/summary", summary="Resumo consolidado (painel)")
-def get_summary(
+async def get_summary(
+    request: Request,
+    response: Response,
     date_preset: str = Query("last_7d"),
     account_ids: Optional[List[str]] = Query(None),
     current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """Retorna resumo consolidado de performance para o painel."""
-    data = _fetch_report_data(user=current_user, account_ids=account_ids, date_preset=date_preset)
+    data = await _get_report_data(db, user=current_user, account_ids=account_ids, date_preset=date_preset, request=request)
+    response.headers.update(_etag_headers(_report_etag(request, current_user, data["snapshot_version"])))
     return data
 
 
 @router.get("/pdf", summary="Exportar relatório em PDF (painel)")
-def export_pdf(
+async def export_pdf(
+    request: Request,
     date_preset: str = Query("last_7d"),
     account_ids: Optional[List[str]] = Query(None),
     current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """
     Gera e baixa o relatório em PDF.
     """
-    data = _fetch_report_data(user=current_user, account_ids=account_ids, date_preset=date_preset)
+    data = await _get_report_data(db, user=current_user, account_ids=account_ids, date_preset=date_preset, request=request, weak_etag=True)
 
-    preset_labels = {
-        "last_7d": "Últimos 7 Dias",
-        "last_30d": "Últimos 30 Dias",
-        "this_month": "Este Mês",
-        "last_month": "Mês Passado",
-    }
-
-    pdf_bytes = generate_campaign_report(
+    pdf_bytes = await run_in_threadpool(
+        generate_campaign_report,
         campaigns=data["campaigns"],
-        period=preset_labels.get(date_preset, date_preset),
+        period=PRESET_LABELS.get(date_preset, date_preset),
         summary=data["summary"],
     )
 
@@ -183,25 +366,153 @@ def export_pdf(
     return Response(
         content=pdf_bytes,
         media_type="application/pdf",
-        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+        headers={
+            "Content-Disposition": f'attachment; filename="{filename}"',
+            **_etag_headers(_report_etag(request, current_user, data["snapshot_version"], weak=True)),
+        },
     )
 
 
+@router.get("/export", summary="Exportar relatório em CSV ou XLSX (painel)")
+async def export_report(
+    request: Request,
+    format: str = Query("csv", description="csv ou xlsx"),
+    granularity: str = Query("campaign", description="campaign, adset ou daily"),
+    date_preset: str = Query("last_7d"),
+    account_ids: Optional[List[str]] = Query(None),
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Exporta as métricas em CSV ou XLSX por campanha, conjunto de anúncios ou dia.
+    Por campanha, as linhas vêm do snapshot do relatório; por conjunto ou dia,
+    são lidas da API do Meta página a página. Em ambos os casos, o arquivo é
+    enviado em streaming.
+
+    Por conjunto ou dia não há ETag: o conteúdo vem direto do Meta e não há
+    versão local que identifique quando ele muda.
+    """
+    if format not in ("csv", "xlsx"):
+        raise HTTPException(400, "format deve ser 'csv' ou 'xlsx'")
+    if granularity not in EXPORT_COLUMNS:
+        raise HTTPException(400, "granularity deve ser 'campaign', 'adset' ou 'daily'")
+    if not current_user.meta_access_token:
+        raise HTTPException(400, "Conta Meta não conectada")
+
+    if granularity == "campaign":
+        # Por campanha: lê direto do snapshot do relatório
+        # O XLSX é regenerado (metadados com a data de criação): ETag fraco
+        weak = format == "xlsx"
+        data = await _get_report_data(
+            db, user=current_user, account_ids=account_ids, date_preset=date_preset, request=request, weak_etag=weak,
+        )
+        rows = iter(data["campaigns"])
+        etag = _report_etag(request, current_user, data["snapshot_version"], weak=weak)
+    else:
+        etag = None
+        meta = MetaService(access_token=current_user.meta_access_token)
+        account_ids, account_names = await run_in_threadpool(_resolve_accounts, meta, account_ids, True)
+        rows = _iter_export_rows(meta, account_ids, account_names, date_preset, granularity)
+    columns = EXPORT_COLUMNS[granularity]
+
+    filename = f"relatorio-{granularity}-{date_preset}-{datetime.now().strftime('%Y%m%d')}.{format}"
+    if format == "csv":
+        content, media_type = iter_csv(rows, columns), "text/csv; charset=utf-8"
+    else:
+        content = iter_xlsx(rows, columns)
+        media_type = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+    return StreamingResponse(
+        content,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"', **_etag_headers(etag)},
+    )
+
+
+@router.get("/trends", summary="Série histórica por dia, semana ou mês (painel)")
+async def get_trends(
+    granularity: str = Query("week", description="day, week ou month"),
+    date_from: Optional[date] = Query(None, description="padrão: 90 dias (day) ou 1 ano antes de date_to"),
+    date_to: Optional[date] = Query(None, description="padrão: hoje"),
+    account_id: Optional[str] = Query(None),
+    campaign_id: Optional[str] = Query(None),
+    adset_id: Optional[str] = Query(None),
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Tendência de gasto, conversões, CTR, CPC, CPM e ROAS lida do histórico
+    gravado por app.jobs.ingest_metrics — não consulta o Meta.
+    Sem campaign_id/adset_id, soma a conta (ou todas as contas).
+    """
+    if granularity not in GRANULARITIES:
+        raise HTTPException(400, "granularity deve ser 'day', 'week' ou 'month'")
+    date_to = date_to or date.today()
+    date_from = date_from or date_to - timedelta(days=90 if granularity == "day" else 365)
+    if date_from > date_to:
+        raise HTTPException(400, "date_from deve ser anterior a date_to")
+
+    series = await get_trend(
+        db, current_user.id, granularity, date_from, date_to,
+        account_id=account_id, campaign_id=campaign_id, adset_id=adset_id,
+    )
+    return {"granularity": granularity, "date_from": date_from, "date_to": date_to, "series": series}
+
+
+def _iter_export_rows(
+    meta: MetaService,
+    account_ids: List[str],
+    account_names: Dict[str, str],
+    date_preset: str,
+    granularity: str,
+) -> Iterator[dict]:
+    """
+    Itera as linhas de todas as contas, uma página da Graph API por vez.
+
+    O status e os cabeçalhos já foram enviados quando uma conta falha no meio do
+    streaming; em vez de truncar o arquivo em silêncio, grava uma linha de erro
+    identificando a conta e segue para as próximas.
+    """
+    level = "adset" if granularity == "adset" else "campaign"
+    for account_id in account_ids:
+        try:
+            for row in meta.iter_insights(
+                account_id=account_id,
+                date_preset=date_preset,
+                level=level,
+                daily=granularity == "daily",
+            ):
+                row["account_name"] = account_names.get(account_id, account_id)
+                yield row
+        except Exception as e:
+            logger.error(f"Erro ao exportar a conta {account_id}: {e}")
+            yield {
+                "account_id": account_id,
+                "account_name": account_names.get(account_id, account_id),
+                "campaign_name": EXPORT_ERROR_MESSAGE,
+            }
+
+
 # ===== ENDPOINTS N8N (API Key) =====
 
 @router.get("/n8n/campaigns", summary="[N8N] Dados de campanhas via API Key")
-def n8n_get_campaigns(
+async def n8n_get_campaigns(
+    request: Request,
+    response: Response,
     date_preset: str = Query("last_7d", description="Período: last_7d, last_30d, this_month, last_month"),
     account_ids: Optional[List[str]] = Query(None),
     n8n_user: User = Depends(get_n8n_user),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """
     Endpoint para N8N buscar dados de campanhas.
     Autenticação: Header `X-API-Key: sua_chave`.
 
     Retorna dados JSON prontos para processar no N8N.
+    Suporta `If-None-Match`: responde 304 quando os dados não mudaram.
     """
-    data = _fetch_report_data(user=n8n_user, account_ids=account_ids, date_preset=date_preset)
+    data = await _get_report_data(db, user=n8n_user, account_ids=account_ids, date_preset=date_preset, request=request)
+    response.headers.update(_etag_headers(_report_etag(request, n8n_user, data["snapshot_version"])))
     return N8NReportResponse(
         success=True,
         data=ReportSummary(
@@ -244,40 +555,231 @@ def n8n_get_campaigns(
 
 
 @router.get("/n8n/pdf", summary="[N8N] Gerar e retornar PDF via API Key")
-def n8n_get_pdf(
+async def n8n_get_pdf(
+    request: Request,
     date_preset: str = Query("last_7d"),
     account_ids: Optional[List[str]] = Query(None),
     n8n_user: User = Depends(get_n8n_user),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """
     Gera PDF do relatório para uso no N8N (ex: enviar por email ao cliente).
     Autenticação: Header `X-API-Key: sua_chave`.
     """
-    data = _fetch_report_data(user=n8n_user, account_ids=account_ids, date_preset=date_preset)
-    preset_labels = {
-        "last_7d": "Últimos 7 Dias",
-        "last_30d": "Últimos 30 Dias",
-        "this_month": "Este Mês",
-        "last_month": "Mês Passado",
-    }
-    pdf_bytes = generate_campaign_report(
+    data = await _get_report_data(db, user=n8n_user, account_ids=account_ids, date_preset=date_preset, request=request, weak_etag=True)
+    pdf_bytes = await run_in_threadpool(
+        generate_campaign_report,
         campaigns=data["campaigns"],
-        period=preset_labels.get(date_preset, date_preset),
+        period=PRESET_LABELS.get(date_preset, date_preset),
         summary=data["summary"],
     )
     filename = f"relatorio-{date_preset}-{datetime.now().strftime('%Y%m%d')}.pdf"
     return Response(
         content=pdf_bytes,
         media_type="application/pdf",
-        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+        headers={
+            "Content-Disposition": f'attachment; filename="{filename}"',
+            **_etag_headers(_report_etag(request, n8n_user, data["snapshot_version"], weak=True)),
+        },
+    )
+
+
+@router.get("/n8n/pdf/bundle", summary="[N8N] Um PDF por conta (ZIP ou manifest)")
+async def n8n_get_pdf_bundle(
+    request: Request,
+    date_preset: str = Query("last_7d"),
+    account_ids: Optional[List[str]] = Query(None),
+    mode: str = Query("zip", description="zip: arquivo ZIP com um PDF por conta | manifest: JSON com URLs dos PDFs"),
+    n8n_user: User = Depends(get_n8n_user),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Gera um PDF por conta de anúncio a partir de uma única busca de dados.
+    Os PDFs são renderizados em paralelo.
+    - `mode=zip`: retorna um ZIP em streaming, à medida que os PDFs ficam prontos.
+    - `mode=manifest`: retorna a lista de URLs (válidas por PDF_CACHE_TTL_SECONDS)
+      para baixar cada PDF individualmente, ex: para enviar um e-mail por cliente.
+    Autenticação: Header `X-API-Key: sua_chave`.
+    """
+    if mode not in ("zip", "manifest"):
+        raise HTTPException(400, "mode deve ser 'zip' ou 'manifest'")
+
+    weak = mode == "zip"  # os PDFs do ZIP são renderizados de novo a cada requisição
+    data = await _get_report_data(
+        db, user=n8n_user, account_ids=account_ids, date_preset=date_preset, request=request, weak_etag=weak,
+    )
+    reports = _per_account_reports(data, date_preset)
+    etag_headers = _etag_headers(_report_etag(request, n8n_user, data["snapshot_version"], weak=weak))
+
+    if mode == "zip":
+        filename = f"relatorios-{date_preset}-{datetime.now().strftime('%Y%m%d')}.zip"
+        return StreamingResponse(
+            _zip_stream(generate_campaign_reports(reports), filenames={
+                account_id: _account_filename(data["account_names"][account_id], date_preset)
+                for account_id in reports
+            }),
+            media_type="application/zip",
+            headers={"Content-Disposition": f'attachment; filename="{filename}"', **etag_headers},
+        )
+
+    tokens = {
+        account_id: _pdf_token(n8n_user.id, account_id, date_preset, data["snapshot_version"], kwargs)
+        for account_id, kwargs in reports.items()
+    }
+    now = datetime.utcnow()
+    stored = set(await db.scalars(
+        select(ReportPdf.token).where(ReportPdf.token.in_(list(tokens.values())), ReportPdf.expires_at > now)
+    ))
+    missing = {account_id: kwargs for account_id, kwargs in reports.items() if tokens[account_id] not in stored}
+    rendered = await run_in_threadpool(lambda: list(generate_campaign_reports(missing)))
+    if rendered:
+        await _store_pdfs(db, n8n_user.id, [
+            {
+                "token": tokens[account_id],
+                "filename": _account_filename(data["account_names"][account_id], date_preset),
+                "content": pdf_bytes,
+            }
+            for account_id, pdf_bytes in rendered
+        ])
+
+    return JSONResponse(headers=etag_headers, content={
+        "success": True,
+        "date_preset": date_preset,
+        "expires_in": settings.PDF_CACHE_TTL_SECONDS,
+        "files": [
+            {
+                "account_id": account_id,
+                "account_name": data["account_names"][account_id],
+                "campaign_count": len(kwargs["campaigns"]),
+                "filename": _account_filename(data["account_names"][account_id], date_preset),
+                "url": str(request.url_for("n8n_get_cached_pdf", token=tokens[account_id])),
+            }
+            for account_id, kwargs in reports.items()
+        ],
+    })
+
+
+@router.get("/n8n/pdf/cached/{token}", summary="[N8N] Baixar PDF gerado no modo manifest")
+async def n8n_get_cached_pdf(
+    request: Request,
+    token: str,
+    n8n_user: User = Depends(get_n8n_user),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Retorna um PDF por conta gerado por `/n8n/pdf/bundle?mode=manifest`."""
+    # O conteúdo de um token nunca muda: o If-None-Match é respondido sem ler o PDF
+    etag = f'"{token}"'
+    pdf = await db.scalar(
+        select(ReportPdf).where(
+            ReportPdf.token == token,
+            ReportPdf.user_id == n8n_user.id,
+            ReportPdf.expires_at > datetime.utcnow(),
+        )
     )
+    if not pdf:
+        raise HTTPException(404, "PDF não encontrado ou expirado — gere o manifest novamente")
+    raise_if_not_modified(request, etag)
+    return Response(
+        content=pdf.content,
+        media_type="application/pdf",
+        headers={"Content-Disposition": f'attachment; filename="{pdf.filename}"', **_etag_headers(etag)},
+    )
+
+
+async def _store_pdfs(db: AsyncSession, user_id: int, pdfs: List[dict]) -> None:
+    """Grava os PDFs do manifest (válidos por PDF_CACHE_TTL_SECONDS) e apaga os expirados."""
+    now = datetime.utcnow()
+    stmt = pg_insert(ReportPdf).values([
+        {**pdf, "user_id": user_id, "created_at": now,
+         "expires_at": now + timedelta(seconds=settings.PDF_CACHE_TTL_SECONDS)}
+        for pdf in pdfs
+    ])
+    # Outro worker pode ter renderizado o mesmo token ao mesmo tempo
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["token"],
+        set_={"content": stmt.excluded.content, "expires_at": stmt.excluded.expires_at},
+    )
+    await db.execute(stmt)
+    await db.execute(delete(ReportPdf).where(ReportPdf.expires_at <= now))
+    await db.commit()
+
+
+def _per_account_reports(data: dict, date_preset: str) -> Dict[str, dict]:
+    """Agrupa as campanhas por conta e monta os kwargs de generate_campaign_report."""
+    by_account: Dict[str, List[dict]] = {account_id: [] for account_id in data["account_names"]}
+    for c in data["campaigns"]:
+        by_account.setdefault(c["account_id"], []).append(c)
+
+    period = PRESET_LABELS.get(date_preset, date_preset)
+    return {
+        account_id: {
+            "campaigns": campaigns,
+            "period": period,
+            "account_name": data["account_names"].get(account_id, account_id),
+            "summary": _summarize(campaigns, date_preset),
+        }
+        for account_id, campaigns in by_account.items()
+        if campaigns
+    }
+
+
+def _pdf_token(user_id: int, account_id: str, date_preset: str, snapshot_version: Optional[int], report: dict) -> str:
+    """Muda com a versão do snapshot e com o conteúdo do relatório da conta — nunca serve um PDF antigo."""
+    # O resumo é derivado das campanhas (e tem generated_at, que muda a cada chamada)
+    content = json.dumps([report["account_name"], report["campaigns"]], sort_keys=True, default=str, ensure_ascii=False)
+    key = f"{user_id}:{account_id}:{date_preset}:{snapshot_version}:{content}"
+    return hashlib.sha256(key.encode()).hexdigest()[:32]
+
+
+def _account_filename(account_name: str, date_preset: str) -> str:
+    slug = unicodedata.normalize("NFKD", account_name).encode("ascii", "ignore").decode()
+    slug = re.sub(r"[^a-zA-Z0-9]+", "-", slug).strip("-").lower() or "conta"
+    return f"relatorio-{slug}-{date_preset}-{datetime.now().strftime('%Y%m%d')}.pdf"
+
+
+class _ZipSink(io.RawIOBase):
+    """Destino não-seekable do ZipFile — acumula bytes até serem enviados ao cliente."""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, b) -> int:
+        self._chunks.append(bytes(b))
+        return len(b)
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def _zip_stream(pdfs: Iterator[Tuple[str, bytes]], filenames: Dict[str, str]) -> Iterator[bytes]:
+    """Escreve cada PDF no ZIP assim que fica pronto e envia os bytes imediatamente."""
+    sink = _ZipSink()
+    used = set()
+    with zipfile.ZipFile(sink, mode="w", compression=zipfile.ZIP_DEFLATED) as zf:
+        for account_id, pdf_bytes in pdfs:
+            name = filenames[account_id]
+            if name in used:
+                name = name.replace(".pdf", f"-{account_id}.pdf")
+            used.add(name)
+            zf.writestr(name, pdf_bytes)
+            yield sink.drain()
+    yield sink.drain()
 
 
 @router.get("/n8n/summary", summary="[N8N] Resumo rápido via API Key")
-def n8n_summary(
+async def n8n_summary(
+    request: Request,
+    response: Response,
     date_preset: str = Query("last_7d"),
     n8n_user: User = Depends(get_n8n_user),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """Resumo de métricas em JSON para processar no N8N."""
-    data = _fetch_report_data(user=n8n_user, account_ids=None, date_preset=date_preset)
+    data = await _get_report_data(db, user=n8n_user, account_ids=None, date_preset=date_preset, request=request)
+    response.headers.update(_etag_headers(_report_etag(request, n8n_user, data["snapshot_version"])))
     return {"success": True, "summary": data["summary"], "campaign_count": len(data["campaigns"])}
@@ -0,0 +1,104 @@
+"""
+Autenticação por API Key (N8N) sem tocar no banco a cada requisição.
+
+- O principal (chave ativa + usuário) fica em um TTLCache por processo,
+  indexado pelo hash da chave; revogar a chave remove a entrada na hora
+  (nos demais workers, expira em API_KEY_CACHE_TTL_SECONDS).
+- O last_used_at é acumulado em memória e gravado em lote a cada
+  API_KEY_USAGE_FLUSH_SECONDS, em um único UPDATE.
+"""
+import asyncio
+import logging
+import threading
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, Optional
+
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.models.database import AsyncSessionLocal
+from app.models.user import ApiKey, User
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class ApiKeyPrincipal:
+    key_id: int
+    user: User  # instância desanexada da sessão — somente leitura
+
+
+_principals = TTLCache(maxsize=4096, ttl=settings.API_KEY_CACHE_TTL_SECONDS)
+
+# {api_key_id: último uso} ainda não gravado no banco
+_pending_usage: Dict[int, datetime] = {}
+_usage_lock = threading.Lock()
+
+
+async def resolve_api_key(db: AsyncSession, api_key: str) -> Optional[ApiKeyPrincipal]:
+    """Retorna o principal da chave (do cache ou do banco) e registra o uso."""
+    key_hash = ApiKey.hash_key(api_key)
+    principal = _principals.get(key_hash)
+    if principal is None:
+        key_record = await db.scalar(
+            select(ApiKey)
+            .options(selectinload(ApiKey.user))
+            .where(ApiKey.key_hash == key_hash, ApiKey.is_active == True)
+        )
+        if not key_record:
+            return None
+        principal = ApiKeyPrincipal(key_id=key_record.id, user=key_record.user)
+        _principals.set(key_hash, principal)
+
+    with _usage_lock:
+        _pending_usage[principal.key_id] = datetime.utcnow()
+    return principal
+
+
+def invalidate_api_key(key_hash: str) -> None:
+    """Remove a chave do cache (revogação)."""
+    _principals.pop(key_hash)
+
+
+def clear_api_key_cache() -> None:
+    """Descarta todos os principais em cache (ex: um usuário reconectou o Meta e o token mudou)."""
+    _principals.clear()
+
+
+async def flush_usage() -> int:
+    """Grava os last_used_at acumulados em um único UPDATE em lote. Retorna quantas chaves."""
+    with _usage_lock:
+        pending = dict(_pending_usage)
+        _pending_usage.clear()
+    if not pending:
+        return 0
+
+    try:
+        async with AsyncSessionLocal() as db:
+            await db.execute(
+                update(ApiKey),
+                [{"id": key_id, "last_used_at": used_at} for key_id, used_at in pending.items()],
+            )
+            await db.commit()
+    except Exception as e:
+        logger.error(f"Erro ao gravar last_used_at de {len(pending)} API keys: {e}")
+        # Devolve ao buffer sem sobrescrever usos mais recentes
+        with _usage_lock:
+            for key_id, used_at in pending.items():
+                _pending_usage.setdefault(key_id, used_at)
+        return 0
+    return len(pending)
+
+
+async def run_usage_flusher() -> None:
+    """Loop do lifespan da aplicação: grava o uso periodicamente e uma última vez ao encerrar."""
+    try:
+        while True:
+            await asyncio.sleep(settings.API_KEY_USAGE_FLUSH_SECONDS)
+            await flush_usage()
+    finally:
+        await flush_usage()
@@ -0,0 +1,19 @@
+"""
+Compressão brotli (com fallback gzip) das respostas da API.
+Além das rotas excluídas pelo path, pula as exportações em XLSX: o arquivo já
+é um ZIP, enquanto o CSV da mesma rota (/export) é texto e é comprimido.
+"""
+from urllib.parse import parse_qs
+
+from brotli_asgi import BrotliMiddleware
+from starlette.types import Scope
+
+
+class CompressionMiddleware(BrotliMiddleware):
+    def _is_handler_excluded(self, scope: Scope) -> bool:
+        if super()._is_handler_excluded(scope):
+            return True
+        if not scope.get("path", "").endswith("/export"):
+            return False
+        query = parse_qs(scope.get("query_string", b"").decode("latin-1"))
+        return query.get("format", ["csv"])[0] == "xlsx"
@@ -1,12 +1,19 @@
 from pydantic_settings import BaseSettings
 from pydantic import field_validator
-from typing import List, Any
+from typing import List, Any, Optional
 import json
 
 
 class Settings(BaseSettings):
     # Banco de dados
     DATABASE_URL: str = "postgresql://postgres:senha@db:5432/gestor_trafego"
+    # Pool do engine assíncrono — limita quantas requisições usam o banco ao mesmo tempo
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 20
+    DB_POOL_TIMEOUT_SECONDS: int = 30
+    # Pool do engine síncrono — só rotas de IA, jobs de análise e CLI (ver README, "Conexões com o banco")
+    DB_SYNC_POOL_SIZE: int = 3
+    DB_SYNC_MAX_OVERFLOW: int = 2
 
     # Meta / Facebook
     META_APP_ID: str = "1008535358112208"
@@ -15,6 +22,32 @@ class Settings(BaseSettings):
 
     # Anthropic
     ANTHROPIC_API_KEY: str = ""
+    # URL alternativa da API (ex.: stand-in local para testes); vazio = API oficial
+    ANTHROPIC_BASE_URL: Optional[str] = None
+    AI_BATCH_POLL_SECONDS: int = 60  # intervalo de consulta dos lotes (Message Batches)
+    # Preços (US$ por milhão de tokens) usados na estimativa de custo das métricas
+    AI_PRICE_INPUT_PER_MTOK: float = 5.0
+    AI_PRICE_OUTPUT_PER_MTOK: float = 25.0
+    AI_PRICE_CACHE_READ_PER_MTOK: float = 0.5
+    AI_PRICE_CACHE_WRITE_PER_MTOK: float = 6.25
+    # Orçamento de tokens da tabela de campanhas enviada à IA
+    AI_CONTEXT_TOKEN_BUDGET: int = 8000
+    AI_CHAT_CONTEXT_TOKEN_BUDGET: int = 3000
+    # Conversas: acima deste total de tokens, as mensagens antigas viram resumo
+    AI_CONVERSATION_TOKEN_THRESHOLD: int = 6000
+    AI_CONVERSATION_KEEP_TURNS: int = 4  # mensagens recentes mantidas na íntegra
+    # Limite de chamadas ao modelo por loop de agente (análise, chat e lotes)
+    AI_MAX_AGENT_TURNS: int = 8
+    # Análise map-reduce: análises por conta simultâneas e contexto de cada conta
+    AI_MAP_CONCURRENCY: int = 8
+    AI_MAP_CONTEXT_TOKEN_BUDGET: int = 4000
+    # Resultado de /api/ai/analyze reaproveitado para os mesmos dados (force=true ignora)
+    AI_ANALYSIS_CACHE_TTL_MINUTES: int = 60
+    # Duração máxima de um job de análise; jobs queued/running mais antigos são órfãos
+    # (processo reiniciado) e passam a "failed"
+    AI_JOB_TIMEOUT_SECONDS: int = 15 * 60
+    # Contas consultadas em paralelo no Meta ao montar o contexto da IA
+    META_FETCH_CONCURRENCY: int = 8
 
     # Segurança
     SECRET_KEY: str = "change-this-in-production"
@@ -30,6 +63,31 @@ class Settings(BaseSettings):
     # Ambiente
     ENVIRONMENT: str = "development"
 
+    # Relatórios PDF
+    PDF_RENDER_WORKERS: int = 4  # processos para renderizar PDFs em paralelo
+    PDF_CACHE_TTL_SECONDS: int = 60 * 60  # validade das URLs do modo manifest
+    # Snapshots de relatório são recalculados após este tempo mesmo sem mudança
+    # nas entradas (o Meta atualiza as métricas ao longo do dia)
+    REPORT_SNAPSHOT_TTL_MINUTES: int = 30
+
+    # HTTP
+    INSIGHTS_ETAG_TTL_SECONDS: int = 300  # janela de validade do ETag de /api/campaigns/*
+    COMPRESSION_MIN_SIZE: int = 1024  # respostas menores não são comprimidas
+
+    # Cache por processo do usuário autenticado por JWT
+    USER_CACHE_TTL_SECONDS: int = 30
+    # API Keys (N8N): cache do principal por processo e gravação em lote do last_used_at
+    # Também é o atraso máximo de uma revogação nos demais workers (ver README, "Uso com N8N")
+    API_KEY_CACHE_TTL_SECONDS: int = 30
+    API_KEY_USAGE_FLUSH_SECONDS: int = 60
+
+    # Cache de insights do Meta no banco (insight_cache), compartilhado entre os workers
+    INSIGHT_CACHE_TTL_MINUTES: int = 30
+    INSIGHT_CACHE_MAX_ENTRIES_PER_USER: int = 200  # acima disso, descarta as de acesso mais antigo
+    INSIGHT_CACHE_TOUCH_SECONDS: int = 60  # intervalo mínimo entre gravações do último acesso
+    INSIGHT_CACHE_PURGE_INTERVAL_SECONDS: int = 300
+    INSIGHT_CACHE_PURGE_BATCH: int = 1000  # linhas por DELETE na limpeza das expiradas
+
     @field_validator("DATABASE_URL", mode="before")
     @classmethod
     def fix_database_url(cls, v: Any) -> Any:
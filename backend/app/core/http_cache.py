@@ -0,0 +1,54 @@
+"""
+ETags e GET condicional (If-None-Match → 304).
+Os ETags são calculados a partir da versão dos dados, antes de qualquer
+chamada ao Meta ou renderização de PDF.
+"""
+import hashlib
+import time
+from typing import Any
+
+from fastapi import HTTPException, Request
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+
+
+def compute_etag(request: Request, *parts: Any) -> str:
+    """
+    ETag forte a partir das partes informadas, do path/query da requisição e da
+    codificação negociada (representações comprimidas têm ETags distintos).
+    """
+    accept_encoding = request.headers.get("accept-encoding", "")
+    encoding = "br" if "br" in accept_encoding else "gzip" if "gzip" in accept_encoding else "identity"
+    raw = "|".join(str(p) for p in (*parts, request.url.path, request.url.query, encoding))
+    return '"' + hashlib.sha256(raw.encode()).hexdigest()[:32] + '"'
+
+
+def raise_if_not_modified(request: Request, etag: str) -> None:
+    """
+    Interrompe a requisição com 304 se o cliente já tem esta versão.
+    Comparação fraca (RFC 9110): o prefixo W/ é ignorado dos dois lados.
+    """
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return
+    candidates = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    if "*" in candidates or etag.removeprefix("W/") in candidates:
+        raise HTTPException(status_code=304, headers={"ETag": etag})
+
+
+async def insights_data_version(db: AsyncSession, user) -> str:
+    """
+    Versão dos dados de insights do usuário sem consultar o Meta: muda quando
+    o token Meta muda, quando uma ação é executada nas campanhas ou a cada
+    INSIGHTS_ETAG_TTL_SECONDS (o Meta atualiza as métricas continuamente).
+    """
+    from app.models.approval import Approval
+
+    last_executed = await db.scalar(
+        select(func.max(Approval.executed_at)).where(Approval.user_id == user.id)
+    )
+    token_hash = hashlib.sha256((user.meta_access_token or "").encode()).hexdigest()[:16]
+    bucket = int(time.time() // settings.INSIGHTS_ETAG_TTL_SECONDS)
+    return f"{user.id}:{token_hash}:{last_executed}:{bucket}"
@@ -0,0 +1,25 @@
+"""
+Paginação por keyset (cursor opaco).
+O cursor codifica a chave de ordenação (created_at, id) do último item da
+página; a próxima página começa estritamente depois dela — o custo não cresce
+com a profundidade, ao contrário de OFFSET.
+"""
+import base64
+from datetime import datetime
+from typing import Tuple
+
+from fastapi import HTTPException
+
+
+def encode_cursor(created_at: datetime, item_id: int) -> str:
+    raw = f"{created_at.isoformat()}|{item_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, item_id = base64.urlsafe_b64decode(padded.encode()).decode().split("|")
+        return datetime.fromisoformat(created_at), int(item_id)
+    except (ValueError, UnicodeDecodeError):
+        raise HTTPException(400, "Cursor de paginação inválido")
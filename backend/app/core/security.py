@@ -4,14 +4,20 @@ from jose import JWTError, jwt
 from passlib.context import CryptContext
 from fastapi import HTTPException, Security, Depends
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials, APIKeyHeader
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.api_keys import clear_api_key_cache, resolve_api_key
+from app.core.cache import TTLCache
 from app.core.config import settings
-from app.models.database import get_db
+from app.models.database import get_async_db
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 bearer_scheme = HTTPBearer(auto_error=False)
 api_key_header = APIKeyHeader(name="X-API-Key", auto_error=False)
 
+# Usuários autenticados por JWT — {user_id: User desanexado da sessão, somente leitura}.
+# As várias chamadas paralelas do painel não consultam o banco só para autenticar.
+_user_cache = TTLCache(maxsize=4096, ttl=settings.USER_CACHE_TTL_SECONDS)
+
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     to_encode = data.copy()
@@ -29,9 +35,9 @@ def decode_token(token: str) -> dict:
         raise HTTPException(status_code=401, detail="Token inválido ou expirado")
 
 
-def get_current_user(
+async def get_current_user(
     credentials: Optional[HTTPAuthorizationCredentials] = Security(bearer_scheme),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     from app.models.user import User
 
@@ -43,32 +49,40 @@ def get_current_user(
     if not user_id:
         raise HTTPException(status_code=401, detail="Token inválido")
 
-    user = db.query(User).filter(User.id == int(user_id)).first()
-    if not user:
-        raise HTTPException(status_code=401, detail="Usuário não encontrado")
+    user = _user_cache.get(int(user_id))
+    if user is None:
+        user = await db.get(User, int(user_id))
+        if not user:
+            raise HTTPException(status_code=401, detail="Usuário não encontrado")
+        db.expunge(user)
+        _user_cache.set(user.id, user)
 
     return user
 
 
-def get_n8n_user(
+def invalidate_user(user_id: int) -> None:
+    """
+    Descarta os dados em cache do usuário (JWT e API Keys) — chamado quando o
+    token Meta muda. Nos demais workers, expiram em USER_CACHE_TTL_SECONDS.
+    """
+    _user_cache.pop(user_id)
+    clear_api_key_cache()
+
+
+async def get_n8n_user(
     api_key: Optional[str] = Security(api_key_header),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
-    """Autenticação via API Key para N8N e integrações externas."""
-    from app.models.user import ApiKey
-
+    """
+    Autenticação via API Key para N8N e integrações externas.
+    Resolvida pelo cache de app.core.api_keys — sem consulta nem escrita no banco
+    por requisição enquanto a chave estiver em cache.
+    """
     if not api_key:
         raise HTTPException(status_code=401, detail="API Key necessária (X-API-Key header)")
 
-    key_record = (
-        db.query(ApiKey)
-        .filter(ApiKey.key == api_key, ApiKey.is_active == True)
-        .first()
-    )
-    if not key_record:
+    principal = await resolve_api_key(db, api_key)
+    if not principal:
         raise HTTPException(status_code=401, detail="API Key inválida")
 
-    key_record.last_used_at = datetime.utcnow()
-    db.commit()
-
-    return key_record.user
+    return principal.user
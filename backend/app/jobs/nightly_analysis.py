@@ -0,0 +1,104 @@
+"""
+Análise noturna de todos os portfólios via Message Batches.
+Não é interativa: todas as análises vão em um único lote (mais barato e com
+mais vazão do que chamar /api/ai/analyze em sequência) e as sugestões
+criadas aparecem na fila de aprovações de cada usuário.
+
+Uso (a partir de backend/, ex. via cron):
+    python -m app.jobs.nightly_analysis
+    python -m app.jobs.nightly_analysis --group account --date-preset last_30d
+
+Com ANTHROPIC_BASE_URL apontando para um stand-in local, o job roda sem a API real.
+"""
+import argparse
+import logging
+import re
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
+
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.database import SessionLocal
+from app.models.user import User
+from app.services.ai_service import analyze_campaigns_batch, create_rule_approvals
+from app.services.meta_service import MetaService
+from app.services.rules_engine import describe_screen, screen_campaigns
+
+logger = logging.getLogger(__name__)
+
+
+def _custom_id(*parts) -> str:
+    return re.sub(r"[^a-zA-Z0-9_-]", "-", "_".join(str(p) for p in parts))[:64]
+
+
+def _user_campaigns(user: User, date_preset: str) -> Dict[str, List[Dict]]:
+    """Campanhas de todas as contas do usuário, agrupadas por conta."""
+    meta = MetaService(access_token=user.meta_access_token)
+    account_ids = [a["account_id"] for a in meta.get_ad_accounts()]
+
+    def fetch(account_id: str) -> List[Dict]:
+        try:
+            return meta.get_campaign_insights_with_status(account_id=account_id, date_preset=date_preset)
+        except Exception as e:
+            logger.warning(f"Usuário {user.id}, conta {account_id}: {e}")
+            return []
+
+    with ThreadPoolExecutor(max_workers=settings.META_FETCH_CONCURRENCY) as pool:
+        return dict(zip(account_ids, pool.map(fetch, account_ids)))
+
+
+def collect_analyses(db: Session, group: str, date_preset: str) -> Dict[str, Dict]:
+    """Monta as análises do lote: uma por usuário ou uma por conta (`group`)."""
+    analyses = {}
+    users = db.query(User).filter(User.meta_access_token.isnot(None)).all()
+    for user in users:
+        try:
+            by_account = _user_campaigns(user, date_preset)
+        except Exception as e:
+            logger.error(f"Usuário {user.id}: erro ao buscar contas: {e}")
+            continue
+
+        if group == "account":
+            groups = {_custom_id("u", user.id, a): cs for a, cs in by_account.items()}
+        else:
+            groups = {_custom_id("u", user.id): [c for cs in by_account.values() for c in cs]}
+
+        # Regras automáticas antes da IA: só campanhas com alerta ou limítrofes vão no lote
+        for custom_id, campaigns in groups.items():
+            screen = screen_campaigns(campaigns)
+            create_rule_approvals(db, user.id, screen["candidates"])
+            if screen["review"]:
+                analyses[custom_id] = {
+                    "user_id": user.id,
+                    "campaigns": screen["review"],
+                    "rules_note": describe_screen(screen),
+                }
+    return analyses
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Análise noturna via Message Batches")
+    parser.add_argument("--group", choices=["user", "account"], default="user")
+    parser.add_argument("--date-preset", default="last_7d")
+    parser.add_argument("--poll-seconds", type=int, default=None)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+
+    db = SessionLocal()
+    try:
+        analyses = collect_analyses(db, args.group, args.date_preset)
+        if not analyses:
+            logger.info("Nenhuma análise a enviar.")
+            return
+        results = analyze_campaigns_batch(analyses, db=db, poll_seconds=args.poll_seconds)
+        for custom_id, text in results.items():
+            logger.info(f"{custom_id}: {text[:200]}")
+        logger.info(f"{len(results)} análises concluídas.")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
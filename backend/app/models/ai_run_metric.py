@@ -0,0 +1,29 @@
+from sqlalchemy import Column, Integer, String, DateTime, Float, ForeignKey, Index
+from datetime import datetime
+from app.models.database import Base
+
+
+class AIRunMetric(Base):
+    """Métricas de uma execução da IA (análise, chat, lote, resumo)."""
+    __tablename__ = "ai_run_metrics"
+    __table_args__ = (
+        Index("ix_ai_run_metrics_user_created", "user_id", "created_at"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=True)
+    kind = Column(String(30), nullable=False)  # analyze_single, analyze_map_reduce, chat, batch, summary...
+    model = Column(String(50), nullable=False)
+
+    iterations = Column(Integer, nullable=False, default=0)  # chamadas ao modelo
+    tool_calls = Column(Integer, nullable=False, default=0)
+    input_tokens = Column(Integer, nullable=False, default=0)
+    output_tokens = Column(Integer, nullable=False, default=0)
+    cache_read_tokens = Column(Integer, nullable=False, default=0)
+    cache_write_tokens = Column(Integer, nullable=False, default=0)
+    cost_usd = Column(Float, nullable=False, default=0.0)  # estimativa pelos preços da configuração
+
+    ttft_ms = Column(Integer, nullable=True)  # até o primeiro token da primeira chamada em streaming
+    duration_ms = Column(Integer, nullable=False)
+    meta_fetch_ms = Column(Integer, nullable=True)  # busca das campanhas no Meta
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
@@ -0,0 +1,18 @@
+from sqlalchemy import Column, Integer, String, DateTime, Text, ForeignKey
+from datetime import datetime
+from app.models.database import Base
+
+
+class AnalysisJob(Base):
+    """Análise de IA executada em segundo plano (POST /api/ai/analyze/jobs)."""
+    __tablename__ = "analysis_jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    status = Column(String(20), nullable=False, default="queued")  # queued, running, done, failed
+    request = Column(Text, nullable=False)  # JSON do AIAnalysisRequest
+    result = Column(Text, nullable=True)  # JSON: {analysis, approval_ids, ...}
+    error = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
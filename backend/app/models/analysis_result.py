@@ -0,0 +1,25 @@
+from sqlalchemy import Column, Integer, String, DateTime, Text, ForeignKey, Index
+from datetime import datetime
+from app.models.database import Base
+
+
+class AnalysisResult(Base):
+    """
+    Resultado de uma análise da IA, reaproveitado enquanto os dados das
+    campanhas (fingerprint) não mudarem e dentro do TTL.
+    """
+    __tablename__ = "analysis_results"
+    __table_args__ = (
+        Index("ix_analysis_results_user_fingerprint", "user_id", "fingerprint"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    # Hash dos dados normalizados das campanhas + instrução + período + modo
+    fingerprint = Column(String(64), nullable=False)
+    mode = Column(String(20), nullable=False)
+    date_preset = Column(String(20), nullable=False)
+    analysis = Column(Text, nullable=False)
+    approval_ids = Column(Text, nullable=False)  # JSON: [ids das aprovações criadas]
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    expires_at = Column(DateTime, nullable=False)
@@ -1,4 +1,5 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, Enum
+from sqlalchemy import JSON, Column, Integer, String, DateTime, ForeignKey, Text, Enum, Index, text
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import relationship
 from datetime import datetime
 import enum
@@ -21,8 +22,40 @@ class ActionType(str, enum.Enum):
     DUPLICATE_ADSET = "duplicate_adset"
 
 
+# Novo orçamento (adjust_budget) como número — mesma expressão do índice
+# ix_approvals_user_action_budget, para o Postgres usá-lo nos filtros por valor
+NEW_BUDGET_SQL = "CAST(payload ->> 'new_budget' AS NUMERIC)"
+
+
 class Approval(Base):
     __tablename__ = "approvals"
+    __table_args__ = (
+        # Listagem/contagem por status: WHERE user_id AND status, keyset (created_at, id)
+        Index("ix_approvals_user_status_created", "user_id", "status", "created_at", "id"),
+        # Listagem sem filtro de status (e por período), na ordem (created_at, id)
+        Index("ix_approvals_user_created", "user_id", "created_at", "id"),
+        # Filtros da listagem por conta, campanha e tipo de ação, na mesma ordem
+        Index("ix_approvals_user_account_created", "user_id", "account_id", "created_at", "id"),
+        Index("ix_approvals_user_campaign_created", "user_id", "campaign_id", "created_at", "id"),
+        Index("ix_approvals_user_action_created", "user_id", "action_type", "created_at", "id"),
+        # Pendentes: contador do menu e deduplicação das sugestões das regras
+        Index(
+            "ix_approvals_pending", "user_id", "campaign_id", "action_type",
+            postgresql_where=text("status = 'pending'"),
+        ),
+        # Última ação executada do usuário (versão dos dados para os ETags)
+        Index(
+            "ix_approvals_user_executed", "user_id", "executed_at",
+            postgresql_where=text("executed_at IS NOT NULL"),
+        ),
+        # Consultas por conteúdo do payload (payload @> '{"adset_id": "..."}')
+        Index(
+            "ix_approvals_payload", "payload",
+            postgresql_using="gin", postgresql_ops={"payload": "jsonb_path_ops"},
+        ),
+        # Faixa de valor do novo orçamento por tipo de ação
+        Index("ix_approvals_user_action_budget", "user_id", "action_type", text(NEW_BUDGET_SQL)),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
@@ -30,8 +63,8 @@ class Approval(Base):
     # Tipo de ação
     action_type = Column(String(50), nullable=False)
 
-    # Dados da ação (JSON serializado como texto)
-    payload = Column(Text, nullable=False)  # JSON: {campaign_id, new_budget, ...}
+    # Dados da ação — JSONB no Postgres; formato por action_type em app.schemas.approval.ACTION_PAYLOADS
+    payload = Column(JSON().with_variant(JSONB(), "postgresql"), nullable=False)
 
     # Contexto Meta
     account_id = Column(String(100), nullable=True)
@@ -43,8 +76,8 @@ class Approval(Base):
     ai_reasoning = Column(Text, nullable=False)
 
     # Status e controle
-    status = Column(String(20), default=ApprovalStatus.PENDING, index=True)
-    created_at = Column(DateTime, default=datetime.utcnow, index=True)
+    status = Column(String(20), default=ApprovalStatus.PENDING)
+    created_at = Column(DateTime, default=datetime.utcnow)
     decided_at = Column(DateTime, nullable=True)
     executed_at = Column(DateTime, nullable=True)
     execution_result = Column(Text, nullable=True)
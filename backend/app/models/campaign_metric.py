@@ -0,0 +1,73 @@
+from sqlalchemy import Column, Integer, BigInteger, String, Date, DateTime, Float, ForeignKey, Index, PrimaryKeyConstraint
+from datetime import datetime
+from app.models.database import Base
+
+
+class CampaignDailyMetric(Base):
+    """
+    Histórico diário de métricas por campanha ou conjunto de anúncios, ingerido
+    do Meta por app.jobs.ingest_metrics. No Postgres, particionado por mês
+    (RANGE em date) — as partições são criadas sob demanda pelo ingest.
+    """
+    __tablename__ = "campaign_daily_metrics"
+    __table_args__ = (
+        # A chave de partição (date) precisa fazer parte da chave primária
+        PrimaryKeyConstraint(
+            "user_id", "level", "account_id", "campaign_id", "adset_id", "date",
+            name="pk_campaign_daily_metrics",
+        ),
+        # Dados chegam em ordem de data: BRIN é minúsculo e basta para varreduras por período
+        Index("ix_campaign_daily_metrics_date", "date", postgresql_using="brin"),
+        {"postgresql_partition_by": "RANGE (date)"},
+    )
+
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    level = Column(String(10), nullable=False)  # campaign | adset
+    account_id = Column(String(100), nullable=False)
+    campaign_id = Column(String(100), nullable=False)
+    adset_id = Column(String(100), nullable=False, default="")  # "" no nível campaign
+    date = Column(Date, nullable=False)
+
+    campaign_name = Column(String(200), nullable=True)
+    adset_name = Column(String(200), nullable=True)
+    impressions = Column(BigInteger, nullable=False, default=0)
+    clicks = Column(BigInteger, nullable=False, default=0)
+    spend = Column(Float, nullable=False, default=0.0)
+    reach = Column(BigInteger, nullable=False, default=0)  # não é somável entre dias
+    conversions = Column(Integer, nullable=False, default=0)
+    purchase_value = Column(Float, nullable=False, default=0.0)  # roas x spend — permite recalcular o ROAS agregado
+    updated_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+
+class CampaignMetricRollup(Base):
+    """
+    Agregados semanais e mensais de campaign_daily_metrics, recalculados a cada
+    ingest para os períodos afetados. Nível account = soma das campanhas da conta.
+    """
+    __tablename__ = "campaign_metric_rollups"
+    __table_args__ = (
+        PrimaryKeyConstraint(
+            "user_id", "period", "level", "account_id", "campaign_id", "adset_id", "period_start",
+            name="pk_campaign_metric_rollups",
+        ),
+        # Séries de tendência: WHERE user_id AND period AND level ORDER BY period_start
+        Index("ix_campaign_metric_rollups_trend", "user_id", "period", "level", "period_start"),
+    )
+
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    period = Column(String(5), nullable=False)  # week (início na segunda) | month
+    level = Column(String(10), nullable=False)  # account | campaign | adset
+    account_id = Column(String(100), nullable=False)
+    campaign_id = Column(String(100), nullable=False, default="")
+    adset_id = Column(String(100), nullable=False, default="")
+    period_start = Column(Date, nullable=False)
+
+    campaign_name = Column(String(200), nullable=True)
+    adset_name = Column(String(200), nullable=True)
+    impressions = Column(BigInteger, nullable=False, default=0)
+    clicks = Column(BigInteger, nullable=False, default=0)
+    spend = Column(Float, nullable=False, default=0.0)
+    conversions = Column(Integer, nullable=False, default=0)
+    purchase_value = Column(Float, nullable=False, default=0.0)
+    days = Column(Integer, nullable=False, default=0)  # dias com dados no período
+    updated_at = Column(DateTime, default=datetime.utcnow, nullable=False)
@@ -0,0 +1,41 @@
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, ForeignKey, Text
+from sqlalchemy.orm import relationship
+from datetime import datetime
+from app.models.database import Base
+
+
+class Conversation(Base):
+    """Conversa do chat com a IA — o cliente envia só o conversation_id."""
+    __tablename__ = "conversations"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    title = Column(String(200))
+    # Tabela de campanhas montada no início da conversa (não é buscada a cada mensagem)
+    context = Column(Text, nullable=False)
+    # Resumo das mensagens antigas já compactadas
+    summary = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    turns = relationship(
+        "ConversationTurn",
+        back_populates="conversation",
+        order_by="ConversationTurn.id",
+        cascade="all, delete-orphan",
+    )
+
+
+class ConversationTurn(Base):
+    __tablename__ = "conversation_turns"
+
+    id = Column(Integer, primary_key=True, index=True)
+    conversation_id = Column(Integer, ForeignKey("conversations.id"), nullable=False, index=True)
+    role = Column(String(20), nullable=False)  # user | assistant
+    content = Column(Text, nullable=False)
+    tokens = Column(Integer, nullable=False, default=0)  # estimativa
+    # Mensagem já incorporada ao resumo — não é mais enviada ao modelo
+    is_summarized = Column(Boolean, nullable=False, default=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    conversation = relationship("Conversation", back_populates="turns")
@@ -1,17 +1,61 @@
+from typing import AsyncIterator
+
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from app.core.config import settings
 
+# Engine síncrono: jobs em segundo plano, CLI e serviços de IA que gravam a partir de threads.
+# Pool pequeno: o tráfego das rotas passa pelo engine assíncrono
 engine = create_engine(
     settings.DATABASE_URL,
     pool_pre_ping=True,
-    pool_size=10,
-    max_overflow=20,
+    **(
+        {}
+        if settings.DATABASE_URL.startswith("sqlite")
+        else {
+            "pool_size": settings.DB_SYNC_POOL_SIZE,
+            "max_overflow": settings.DB_SYNC_MAX_OVERFLOW,
+            "pool_timeout": settings.DB_POOL_TIMEOUT_SECONDS,
+        }
+    ),
 )
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+
+def _async_url(url: str):
+    """postgresql:// (psycopg2) → postgresql+asyncpg://; sqlite:// → sqlite+aiosqlite://."""
+    parsed = make_url(url)
+    if parsed.get_backend_name() == "sqlite":
+        return parsed.set(drivername="sqlite+aiosqlite")
+    query = dict(parsed.query)
+    # asyncpg não entende sslmode (libpq) — o equivalente é ssl
+    if "sslmode" in query:
+        query["ssl"] = query.pop("sslmode")
+    return parsed.set(drivername="postgresql+asyncpg", query=query)
+
+
+# Engine assíncrono das rotas: o pool é o limite de concorrência no banco
+async_engine = create_async_engine(
+    _async_url(settings.DATABASE_URL),
+    pool_pre_ping=True,
+    **(
+        {}
+        if settings.DATABASE_URL.startswith("sqlite")
+        else {
+            "pool_size": settings.DB_POOL_SIZE,
+            "max_overflow": settings.DB_MAX_OVERFLOW,
+            "pool_timeout": settings.DB_POOL_TIMEOUT_SECONDS,
+        }
+    ),
+)
+
+# expire_on_commit=False: atributos continuam acessíveis após o commit (sem lazy load implícito)
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
 Base = declarative_base()
 
 
@@ -23,5 +67,6 @@ def get_db():
         db.close()
 
 
-def create_tables():
-    Base.metadata.create_all(bind=engine)
+async def get_async_db() -> AsyncIterator[AsyncSession]:
+    async with AsyncSessionLocal() as db:
+        yield db
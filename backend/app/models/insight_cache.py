@@ -1,19 +1,33 @@
-from sqlalchemy import Column, Integer, String, DateTime, Text, Float
+from sqlalchemy import Column, Integer, String, DateTime, LargeBinary, ForeignKey, Index, UniqueConstraint
 from datetime import datetime
 from app.models.database import Base
 
 
 class InsightCache(Base):
-    """Cache de métricas para evitar muitas chamadas à API do Meta."""
+    """
+    Cache de métricas para evitar muitas chamadas à API do Meta.
+    O conteúdo é JSON comprimido com zlib; expiração em lote e limite de entradas
+    por usuário (descarte LRU) ficam em app.services.insights_cache.
+    """
     __tablename__ = "insight_cache"
+    __table_args__ = (
+        UniqueConstraint("user_id", "cache_key", name="uq_insight_cache_user_key"),
+        # Limpeza periódica: DELETE em lotes de expires_at <= agora
+        Index("ix_insight_cache_expires_at", "expires_at"),
+        # Descarte LRU: entradas do usuário por último acesso
+        Index("ix_insight_cache_user_accessed", "user_id", "last_accessed_at"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
-    account_id = Column(String(100), index=True)
-    campaign_id = Column(String(100), index=True, nullable=True)
-    adset_id = Column(String(100), index=True, nullable=True)
-    date_start = Column(String(20))
-    date_stop = Column(String(20))
-    data = Column(Text)  # JSON com as métricas
-    cached_at = Column(DateTime, default=datetime.utcnow)
-    # Cache expira em 30 minutos por padrão
-    expires_at = Column(DateTime)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    cache_key = Column(String(64), nullable=False)  # sha256 dos parâmetros da consulta
+    account_id = Column(String(100), nullable=False)
+    campaign_id = Column(String(100), nullable=True)
+    adset_id = Column(String(100), nullable=True)
+    date_preset = Column(String(20), nullable=False)
+    payload = Column(LargeBinary, nullable=False)  # JSON com as métricas, comprimido (zlib)
+    raw_bytes = Column(Integer, nullable=False)  # tamanho do JSON antes da compressão
+    cached_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    last_accessed_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    # Cache expira em INSIGHT_CACHE_TTL_MINUTES (30 minutos por padrão)
+    expires_at = Column(DateTime, nullable=False)
@@ -0,0 +1,50 @@
+from sqlalchemy import Column, Integer, String, DateTime, Text, Boolean, ForeignKey, UniqueConstraint, LargeBinary
+from datetime import datetime
+from app.models.database import Base
+
+
+class ReportSnapshot(Base):
+    """
+    Relatório consolidado pré-calculado por (usuário, conjunto de contas, período, data).
+    Lido por todos os endpoints de relatório; recalculado só quando as entradas mudam.
+    """
+    __tablename__ = "report_snapshots"
+    __table_args__ = (
+        UniqueConstraint("user_id", "accounts_key", "date_preset", "data_date", name="uq_report_snapshots_key"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    # Hash das contas consultadas ("all" = todas as contas do usuário)
+    accounts_key = Column(String(64), nullable=False)
+    date_preset = Column(String(20), nullable=False)
+    data_date = Column(String(10), nullable=False)  # YYYY-MM-DD (UTC)
+
+    # Hash das entradas do cálculo (contas, período, data, token Meta)
+    inputs_hash = Column(String(64), nullable=False)
+    # Hash do conteúdo — a versão só incrementa quando o conteúdo muda
+    content_hash = Column(String(64), nullable=False)
+    version = Column(Integer, nullable=False, default=1)
+    # Marcado quando uma ação executada altera as campanhas do usuário
+    is_stale = Column(Boolean, nullable=False, default=False)
+
+    campaigns = Column(Text, nullable=False)  # JSON
+    summary = Column(Text, nullable=False)  # JSON
+    account_names = Column(Text, nullable=False)  # JSON: {account_id: nome}
+    computed_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+
+class ReportPdf(Base):
+    """
+    PDF por conta gerado pelo modo manifest de /n8n/pdf/bundle, baixado depois por
+    /n8n/pdf/cached/{token} — no banco para que qualquer worker sirva o download.
+    """
+    __tablename__ = "report_pdfs"
+
+    # Hash do usuário, conta, período, versão do snapshot e conteúdo do relatório
+    token = Column(String(64), primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    filename = Column(String(200), nullable=False)
+    content = Column(LargeBinary, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    expires_at = Column(DateTime, nullable=False, index=True)
@@ -1,6 +1,7 @@
 from sqlalchemy import Column, Integer, String, DateTime, Boolean, ForeignKey, Text
 from sqlalchemy.orm import relationship
 from datetime import datetime
+import hashlib
 import secrets
 from app.models.database import Base
 
@@ -41,7 +42,9 @@ class ApiKey(Base):
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     name = Column(String(100))  # ex: "N8N Producao"
-    key = Column(String(64), unique=True, index=True)
+    # Só o hash SHA-256 da chave é guardado; o valor é exibido uma única vez na criação
+    key_hash = Column(String(64), unique=True, index=True, nullable=False)
+    key_prefix = Column(String(12), nullable=False)  # início da chave, para identificá-la no painel
     is_active = Column(Boolean, default=True)
     created_at = Column(DateTime, default=datetime.utcnow)
     last_used_at = Column(DateTime, nullable=True)
@@ -51,3 +54,8 @@ class ApiKey(Base):
     @staticmethod
     def generate_key() -> str:
         return secrets.token_urlsafe(48)
+
+    @staticmethod
+    def hash_key(key: str) -> str:
+        # Chaves aleatórias de 384 bits: SHA-256 basta (não há senha fraca a proteger com bcrypt)
+        return hashlib.sha256(key.encode()).hexdigest()
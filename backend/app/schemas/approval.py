@@ -1,12 +1,40 @@
 from pydantic import BaseModel
-from typing import Optional, Any, Dict
+from typing import Optional, Any, Dict, Type
 from datetime import datetime
 
 
+# Payloads das ações (coluna JSONB approvals.payload), por action_type
+class CampaignActionPayload(BaseModel):
+    """pause_campaign / enable_campaign"""
+    campaign_id: str
+
+
+class BudgetPayload(BaseModel):
+    """adjust_budget"""
+    campaign_id: str
+    new_budget: float
+    current_budget: Optional[float] = None
+
+
+class BidPayload(BaseModel):
+    """adjust_bid"""
+    adset_id: str
+    campaign_id: str
+    new_bid: float
+
+
+ACTION_PAYLOADS: Dict[str, Type[BaseModel]] = {
+    "pause_campaign": CampaignActionPayload,
+    "enable_campaign": CampaignActionPayload,
+    "adjust_budget": BudgetPayload,
+    "adjust_bid": BidPayload,
+}
+
+
 class ApprovalOut(BaseModel):
     id: int
     action_type: str
-    payload: str
+    payload: Dict[str, Any]
     account_id: Optional[str]
     campaign_id: Optional[str]
     campaign_name: Optional[str]
@@ -30,8 +58,32 @@ class AIAnalysisRequest(BaseModel):
     account_ids: Optional[list[str]] = None  # None = todas as contas
     date_preset: str = "last_7d"  # last_7d, last_30d, this_month, last_month
     custom_prompt: Optional[str] = None  # Instrução extra ao Claude
+    mode: str = "single"  # single (até 5 contas), map_reduce (todas as contas) ou rules (sem IA)
+    force: bool = False  # ignora o resultado em cache para os mesmos dados
 
 
 class AIChatMessage(BaseModel):
     message: str
-    account_ids: Optional[list[str]] = None
+    account_ids: Optional[list[str]] = None  # usado só ao iniciar uma conversa
+    conversation_id: Optional[int] = None  # None = nova conversa
+
+
+class ConversationOut(BaseModel):
+    id: int
+    title: Optional[str]
+    summary: Optional[str]
+    created_at: datetime
+    updated_at: Optional[datetime]
+
+    class Config:
+        from_attributes = True
+
+
+class ConversationTurnOut(BaseModel):
+    id: int
+    role: str
+    content: str
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
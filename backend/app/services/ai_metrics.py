@@ -0,0 +1,140 @@
+"""
+Instrumentação das execuções da IA: tokens (inclusive cache), tempo até o
+primeiro token, duração, iterações do loop, chamadas de ferramentas e tempo
+de busca no Meta. Cada execução vira uma linha em ai_run_metrics.
+"""
+import logging
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.ai_run_metric import AIRunMetric
+from app.models.database import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+MODEL = "claude-opus-4-6"
+
+
+class RunRecorder:
+    """Acumula as métricas de uma execução; `save_run` grava no banco."""
+
+    def __init__(self, kind: str, user_id: Optional[int] = None, model: str = MODEL):
+        self.kind = kind
+        self.user_id = user_id
+        self.model = model
+        self.started = time.perf_counter()
+        self.iterations = 0
+        self.tool_calls = 0
+        self.input_tokens = 0
+        self.output_tokens = 0
+        self.cache_read_tokens = 0
+        self.cache_write_tokens = 0
+        self.ttft_ms: Optional[int] = None
+        self.meta_fetch_ms: Optional[int] = None
+
+    def add_usage(self, usage: Any) -> None:
+        """Soma o `usage` de uma chamada ao modelo (uma iteração)."""
+        self.iterations += 1
+        self.input_tokens += usage.input_tokens or 0
+        self.output_tokens += usage.output_tokens or 0
+        self.cache_read_tokens += getattr(usage, "cache_read_input_tokens", 0) or 0
+        self.cache_write_tokens += getattr(usage, "cache_creation_input_tokens", 0) or 0
+
+    def first_token(self, call_started: float) -> None:
+        """Registra o tempo até o primeiro token (só da primeira chamada da execução)."""
+        if self.ttft_ms is None:
+            self.ttft_ms = int((time.perf_counter() - call_started) * 1000)
+
+    def cost_usd(self) -> float:
+        return (
+            self.input_tokens * settings.AI_PRICE_INPUT_PER_MTOK
+            + self.output_tokens * settings.AI_PRICE_OUTPUT_PER_MTOK
+            + self.cache_read_tokens * settings.AI_PRICE_CACHE_READ_PER_MTOK
+            + self.cache_write_tokens * settings.AI_PRICE_CACHE_WRITE_PER_MTOK
+        ) / 1_000_000
+
+
+def save_run(recorder: RunRecorder) -> None:
+    """Grava a execução em sessão própria — falhas de métrica não afetam a resposta."""
+    duration_ms = int((time.perf_counter() - recorder.started) * 1000)
+    db = SessionLocal()
+    try:
+        db.add(AIRunMetric(
+            user_id=recorder.user_id,
+            kind=recorder.kind,
+            model=recorder.model,
+            iterations=recorder.iterations,
+            tool_calls=recorder.tool_calls,
+            input_tokens=recorder.input_tokens,
+            output_tokens=recorder.output_tokens,
+            cache_read_tokens=recorder.cache_read_tokens,
+            cache_write_tokens=recorder.cache_write_tokens,
+            cost_usd=round(recorder.cost_usd(), 6),
+            ttft_ms=recorder.ttft_ms,
+            duration_ms=duration_ms,
+            meta_fetch_ms=recorder.meta_fetch_ms,
+        ))
+        db.commit()
+    except Exception as e:
+        logger.error(f"Erro ao gravar métricas da IA ({recorder.kind}): {e}")
+    finally:
+        db.close()
+
+
+def summarize_runs(db: Session, user_id: int, days: int = 7) -> List[Dict]:
+    """Métricas agregadas por tipo de execução nos últimos `days` dias."""
+    since = datetime.utcnow() - timedelta(days=days)
+    rows = (
+        db.query(
+            AIRunMetric.kind,
+            func.count(AIRunMetric.id).label("runs"),
+            func.avg(AIRunMetric.duration_ms).label("avg_duration_ms"),
+            func.percentile_cont(0.95).within_group(AIRunMetric.duration_ms).label("p95_duration_ms"),
+            func.avg(AIRunMetric.ttft_ms).label("avg_ttft_ms"),
+            func.avg(AIRunMetric.meta_fetch_ms).label("avg_meta_fetch_ms"),
+            func.avg(AIRunMetric.iterations).label("avg_iterations"),
+            func.sum(AIRunMetric.tool_calls).label("tool_calls"),
+            func.sum(AIRunMetric.input_tokens).label("input_tokens"),
+            func.sum(AIRunMetric.output_tokens).label("output_tokens"),
+            func.sum(AIRunMetric.cache_read_tokens).label("cache_read_tokens"),
+            func.sum(AIRunMetric.cache_write_tokens).label("cache_write_tokens"),
+            func.sum(AIRunMetric.cost_usd).label("cost_usd"),
+        )
+        .filter(AIRunMetric.user_id == user_id, AIRunMetric.created_at >= since)
+        .group_by(AIRunMetric.kind)
+        .order_by(AIRunMetric.kind)
+        .all()
+    )
+
+    summary = []
+    for r in rows:
+        prompt_tokens = (r.input_tokens or 0) + (r.cache_read_tokens or 0) + (r.cache_write_tokens or 0)
+        summary.append({
+            "kind": r.kind,
+            "runs": r.runs,
+            "avg_duration_ms": _round(r.avg_duration_ms),
+            "p95_duration_ms": _round(r.p95_duration_ms),
+            "avg_ttft_ms": _round(r.avg_ttft_ms),
+            "avg_meta_fetch_ms": _round(r.avg_meta_fetch_ms),
+            "avg_iterations": _round(r.avg_iterations, 2),
+            "tool_calls": r.tool_calls or 0,
+            "input_tokens": r.input_tokens or 0,
+            "output_tokens": r.output_tokens or 0,
+            "cache_read_tokens": r.cache_read_tokens or 0,
+            "cache_write_tokens": r.cache_write_tokens or 0,
+            # Fração do prompt servida pelo cache
+            "cache_hit_ratio": round((r.cache_read_tokens or 0) / prompt_tokens, 3) if prompt_tokens else 0.0,
+            "cost_usd": round(r.cost_usd or 0.0, 4),
+        })
+    return summary
+
+
+def _round(value, digits: int = 0):
+    if value is None:
+        return None
+    return round(float(value), digits) if digits else int(round(float(value)))
@@ -2,16 +2,27 @@
 Serviço de IA usando Claude claude-opus-4-6 com tool use (manual loop).
 As ferramentas NÃO executam imediatamente — criam registros de aprovação no DB.
 """
-import json
-from typing import List, Dict, Any, Generator, Optional
-from datetime import datetime
+import asyncio
+import logging
+import threading
+import time
+from typing import List, Dict, Any, AsyncGenerator, Callable, Optional, Tuple
+from sqlalchemy import insert
 from sqlalchemy.orm import Session
 
 import anthropic
+from pydantic import ValidationError
 
 from app.core.config import settings
 from app.models.approval import Approval, ApprovalStatus
+from app.schemas.approval import ACTION_PAYLOADS
+from app.services.ai_metrics import RunRecorder, save_run
+from app.services.context_encoder import encode_campaigns
 
+logger = logging.getLogger(__name__)
+
+# Breakpoint de prompt caching — o prefixo até aqui é reaproveitado nas chamadas seguintes
+CACHE_CONTROL = {"type": "ephemeral"}
 
 SYSTEM_PROMPT = """Você é um especialista em tráfego pago digital com mais de 10 anos de experiência
 em Meta ADS (Facebook e Instagram). Você analisa dados de campanhas e sugere otimizações
@@ -26,9 +37,50 @@ Forneça benchmarks do setor quando relevante.
 Priorize otimizações com maior impacto no ROAS e ROI."""
 
 
+class AnalysisAborted(Exception):
+    """A análise passou do prazo ou foi cancelada (ver Deadline)."""
+
+
+class Deadline:
+    """
+    Prazo de uma análise em segundo plano, verificado pelo próprio loop do agente
+    antes de cada chamada ao modelo e antes de gravar aprovações: a análise roda
+    em threads que não podem ser interrompidas de fora, então é ela que para.
+    """
+
+    def __init__(self, seconds: float, elapsed: float = 0.0):
+        """`elapsed`: parte do prazo já consumida (ex.: tempo do job na fila)."""
+        self.seconds = seconds
+        self.expires_at = time.monotonic() + seconds - elapsed
+        self._cancelled = threading.Event()
+
+    def cancel(self) -> None:
+        self._cancelled.set()
+
+    def check(self) -> None:
+        """Levanta AnalysisAborted se o prazo acabou ou a análise foi cancelada."""
+        if self._cancelled.is_set():
+            raise AnalysisAborted("Análise cancelada")
+        if time.monotonic() >= self.expires_at:
+            raise AnalysisAborted(f"Tempo limite da análise excedido ({int(self.seconds)}s)")
+
+
+def _check(deadline: Optional[Deadline]) -> None:
+    if deadline:
+        deadline.check()
+
+
+def _system_blocks() -> List[Dict]:
+    """System prompt com breakpoint de cache (cobre também as ferramentas, que vêm antes)."""
+    return [{"type": "text", "text": SYSTEM_PROMPT, "cache_control": CACHE_CONTROL}]
+
+
 def _build_tools() -> List[Dict]:
-    """Define as ferramentas disponíveis para o Claude."""
-    return [
+    """
+    Define as ferramentas disponíveis para o Claude.
+    A última ferramenta carrega o breakpoint de cache de todo o bloco de ferramentas.
+    """
+    tools = [
         {
             "name": "pause_campaign",
             "description": "Pausa uma campanha que está com performance ruim. Use quando: ROAS < 0.5, CPC muito alto (>3x do benchmark), ou campanha com alto gasto e zero conversões.",
@@ -90,256 +142,624 @@ def _build_tools() -> List[Dict]:
             },
         },
     ]
+    tools[-1]["cache_control"] = CACHE_CONTROL
+    return tools
 
 
-def _create_approval(
-    db: Session,
-    user_id: int,
-    action_type: str,
-    payload: Dict,
-    ai_reasoning: str,
-    campaign_id: Optional[str] = None,
-    campaign_name: Optional[str] = None,
-    adset_id: Optional[str] = None,
-    account_id: Optional[str] = None,
-) -> Approval:
-    """Cria um registro de aprovação pendente no banco de dados."""
-    approval = Approval(
-        user_id=user_id,
-        action_type=action_type,
-        payload=json.dumps(payload, ensure_ascii=False),
-        ai_reasoning=ai_reasoning,
-        campaign_id=campaign_id,
-        campaign_name=campaign_name,
-        adset_id=adset_id,
-        account_id=account_id,
-        status=ApprovalStatus.PENDING,
-    )
-    db.add(approval)
-    db.commit()
-    db.refresh(approval)
-    return approval
+def _context_message(context: str, text: str) -> Dict:
+    """
+    Mensagem do usuário com o contexto das campanhas em um bloco cacheado,
+    separado da instrução que varia a cada chamada.
+    """
+    return {
+        "role": "user",
+        "content": [
+            {"type": "text", "text": context, "cache_control": CACHE_CONTROL},
+            {"type": "text", "text": text},
+        ],
+    }
 
 
-def _execute_tool(
-    tool_name: str,
-    tool_input: Dict,
-    db: Session,
-    user_id: int,
-) -> str:
-    """Executa uma ferramenta — cria aprovação pendente em vez de executar imediatamente."""
-    reasoning = tool_input.get("reason", "Sem justificativa fornecida")
+def _move_turn_breakpoint(messages: List[Dict]) -> None:
+    """
+    Mantém um breakpoint móvel no último bloco da conversa, para que cada
+    iteração do loop reaproveite o prefixo da anterior. O limite da API é de
+    4 breakpoints: ferramentas, system, contexto e este.
+    """
+    for message in messages[1:]:
+        if isinstance(message["content"], list):
+            for block in message["content"]:
+                if isinstance(block, dict):
+                    block.pop("cache_control", None)
+    last = messages[-1]
+    if len(messages) > 1 and isinstance(last["content"], list) and isinstance(last["content"][-1], dict):
+        last["content"][-1]["cache_control"] = CACHE_CONTROL
+
+
+async def summarize_conversation(previous_summary: Optional[str], turns: List[Dict]) -> str:
+    """Resume mensagens antigas de uma conversa (incorporando o resumo anterior)."""
+    transcript = "\n\n".join(
+        f"{'Usuário' if t['role'] == 'user' else 'Assistente'}: {t['content']}" for t in turns
+    )
+    prompt = (
+        (f"Resumo anterior:\n{previous_summary}\n\n" if previous_summary else "")
+        + f"Novas mensagens:\n{transcript}\n\n"
+        "Atualize o resumo desta conversa sobre campanhas de Meta ADS. Mantenha campanhas, "
+        "métricas, decisões, sugestões criadas e perguntas em aberto. Seja conciso."
+    )
+    recorder = RunRecorder("summary")
+    response = await _get_async_client().messages.create(
+        model="claude-opus-4-6",
+        max_tokens=1024,
+        messages=[{"role": "user", "content": prompt}],
+    )
+    _log_usage("resumo da conversa", response.usage, recorder)
+    await asyncio.to_thread(save_run, recorder)
+    return "\n".join(b.text for b in response.content if b.type == "text")
+
+
+def _log_usage(label: str, usage: Any, recorder: Optional[RunRecorder] = None) -> None:
+    """Registra tokens de entrada/saída e acertos/escritas de cache da chamada."""
+    if recorder:
+        recorder.add_usage(usage)
+    logger.info(
+        f"[IA] {label}: input={usage.input_tokens} output={usage.output_tokens} "
+        f"cache_read={getattr(usage, 'cache_read_input_tokens', 0) or 0} "
+        f"cache_write={getattr(usage, 'cache_creation_input_tokens', 0) or 0}"
+    )
+
 
+def _approval_row(tool_name: str, tool_input: Dict, user_id: int) -> Optional[Dict]:
+    """Valores da aprovação pendente para uma chamada de ferramenta (None se desconhecida ou inválida)."""
+    row = {
+        "user_id": user_id,
+        "action_type": tool_name,
+        "ai_reasoning": tool_input.get("reason", "Sem justificativa fornecida"),
+        "campaign_id": tool_input.get("campaign_id"),
+        "campaign_name": tool_input.get("campaign_name"),
+        "adset_id": None,
+        "account_id": tool_input.get("account_id"),
+        "status": ApprovalStatus.PENDING,
+    }
+    payload_model = ACTION_PAYLOADS.get(tool_name)
+    if payload_model is None:
+        return None
+    try:
+        payload = payload_model.model_validate(tool_input)
+    except ValidationError as e:
+        logger.warning(f"Entrada inválida para a ferramenta {tool_name}: {e}")
+        return None
+    row["payload"] = payload.model_dump()
+    row["adset_id"] = getattr(payload, "adset_id", None)
+    return row
+
+
+def _tool_message(row: Dict, approval_id: int) -> str:
+    """Mensagem para o Claude a partir da aprovação gravada (payload já validado e convertido)."""
+    tool_name, name, payload = row["action_type"], row["campaign_name"], row["payload"]
     if tool_name == "pause_campaign":
-        approval = _create_approval(
-            db=db,
-            user_id=user_id,
-            action_type="pause_campaign",
-            payload={"campaign_id": tool_input["campaign_id"]},
-            ai_reasoning=reasoning,
-            campaign_id=tool_input["campaign_id"],
-            campaign_name=tool_input.get("campaign_name"),
-            account_id=tool_input.get("account_id"),
-        )
-        return f"✅ Sugestão criada (ID #{approval.id}): Pausar campanha '{tool_input['campaign_name']}'. Aguardando sua aprovação."
-
-    elif tool_name == "enable_campaign":
-        approval = _create_approval(
-            db=db,
-            user_id=user_id,
-            action_type="enable_campaign",
-            payload={"campaign_id": tool_input["campaign_id"]},
-            ai_reasoning=reasoning,
-            campaign_id=tool_input["campaign_id"],
-            campaign_name=tool_input.get("campaign_name"),
-            account_id=tool_input.get("account_id"),
-        )
-        return f"✅ Sugestão criada (ID #{approval.id}): Ativar campanha '{tool_input['campaign_name']}'. Aguardando sua aprovação."
-
-    elif tool_name == "adjust_budget":
-        payload = {
-            "campaign_id": tool_input["campaign_id"],
-            "new_budget": tool_input["new_budget"],
-            "current_budget": tool_input.get("current_budget"),
-        }
-        approval = _create_approval(
-            db=db,
-            user_id=user_id,
-            action_type="adjust_budget",
-            payload=payload,
-            ai_reasoning=reasoning,
-            campaign_id=tool_input["campaign_id"],
-            campaign_name=tool_input.get("campaign_name"),
-            account_id=tool_input.get("account_id"),
-        )
-        return f"✅ Sugestão criada (ID #{approval.id}): Ajustar orçamento de '{tool_input['campaign_name']}' para R$ {tool_input['new_budget']:.2f}/dia. Aguardando aprovação."
-
-    elif tool_name == "adjust_bid":
-        payload = {
-            "adset_id": tool_input["adset_id"],
-            "campaign_id": tool_input["campaign_id"],
-            "new_bid": tool_input["new_bid"],
-        }
-        approval = _create_approval(
-            db=db,
-            user_id=user_id,
-            action_type="adjust_bid",
-            payload=payload,
-            ai_reasoning=reasoning,
-            campaign_id=tool_input["campaign_id"],
-            campaign_name=tool_input.get("campaign_name"),
-            adset_id=tool_input["adset_id"],
-            account_id=tool_input.get("account_id"),
-        )
-        return f"✅ Sugestão criada (ID #{approval.id}): Ajustar lance para R$ {tool_input['new_bid']:.2f}. Aguardando aprovação."
+        return f"✅ Sugestão criada (ID #{approval_id}): Pausar campanha '{name}'. Aguardando sua aprovação."
+    if tool_name == "enable_campaign":
+        return f"✅ Sugestão criada (ID #{approval_id}): Ativar campanha '{name}'. Aguardando sua aprovação."
+    if tool_name == "adjust_budget":
+        return f"✅ Sugestão criada (ID #{approval_id}): Ajustar orçamento de '{name}' para R$ {payload['new_budget']:.2f}/dia. Aguardando aprovação."
+    return f"✅ Sugestão criada (ID #{approval_id}): Ajustar lance para R$ {payload['new_bid']:.2f}. Aguardando aprovação."
 
-    return f"Ferramenta '{tool_name}' não reconhecida."
 
+def _execute_tools(
+    tool_calls: List[Tuple[str, Dict]],
+    db: Session,
+    user_id: int,
+    on_event: Optional[Callable[[str, Dict], None]] = None,
+    deadline: Optional[Deadline] = None,
+) -> List[Tuple[str, Optional[int]]]:
+    """
+    Executa as ferramentas de um turno — cria aprovações pendentes em vez de
+    executar imediatamente. Todas as aprovações do turno entram em um único
+    INSERT ... RETURNING e um único commit.
+    Recebe [(nome, input)] e retorna [(mensagem para o Claude, id da aprovação ou None)].
+    `on_event` recebe os eventos "tool_call" e "approval" (progresso dos jobs).
+    Com `deadline` vencido, levanta AnalysisAborted sem gravar nada.
+    """
+    _check(deadline)
+    rows = []
+    for tool_name, tool_input in tool_calls:
+        if on_event:
+            on_event("tool_call", {"tool": tool_name, "campaign_name": tool_input.get("campaign_name")})
+        rows.append(_approval_row(tool_name, tool_input, user_id))
+
+    valid = [row for row in rows if row is not None]
+    ids = iter([])
+    if valid:
+        ids = iter(db.scalars(
+            insert(Approval).returning(Approval.id, sort_by_parameter_order=True),
+            valid,
+        ).all())
+        db.commit()
+
+    results = []
+    for (tool_name, _), row in zip(tool_calls, rows):
+        if row is None:
+            results.append((f"Ferramenta '{tool_name}' não reconhecida ou com parâmetros inválidos.", None))
+            continue
+        approval_id = next(ids)
+        if on_event:
+            on_event("approval", {
+                "id": approval_id,
+                "action_type": tool_name,
+                "campaign_name": row["campaign_name"],
+            })
+        results.append((_tool_message(row, approval_id), approval_id))
+    return results
+
+
+def _run_tool_blocks(
+    content: List[Any],
+    db: Session,
+    user_id: int,
+    on_event: Optional[Callable[[str, Dict], None]] = None,
+    deadline: Optional[Deadline] = None,
+) -> Tuple[List[Dict], List[int]]:
+    """Executa os blocos tool_use de uma resposta; retorna (blocos tool_result, ids criados)."""
+    blocks = [b for b in content if b.type == "tool_use"]
+    results = _execute_tools([(b.name, b.input) for b in blocks], db, user_id, on_event, deadline)
+    tool_results = [
+        {"type": "tool_result", "tool_use_id": block.id, "content": message}
+        for block, (message, _) in zip(blocks, results)
+    ]
+    return tool_results, [approval_id for _, approval_id in results if approval_id is not None]
 
-def analyze_campaigns(
-    campaigns_data: List[Dict],
+
+def create_rule_approvals(
     db: Session,
     user_id: int,
+    candidates: List[Dict],
+    on_event: Optional[Callable[[str, Dict], None]] = None,
+    deadline: Optional[Deadline] = None,
+) -> List[int]:
+    """
+    Cria as sugestões pré-montadas pelas regras (em um único insert), ignorando
+    campanhas que já têm sugestão pendente da mesma ação. Retorna os ids criados.
+    """
+    pending = set(
+        db.query(Approval.campaign_id, Approval.action_type)
+        .filter(Approval.user_id == user_id, Approval.status == ApprovalStatus.PENDING)
+        .all()
+    )
+    tool_calls = []
+    for candidate in candidates:
+        key = (candidate["tool_input"]["campaign_id"], candidate["tool_name"])
+        if key in pending:
+            continue
+        tool_calls.append((candidate["tool_name"], candidate["tool_input"]))
+        pending.add(key)
+    results = _execute_tools(tool_calls, db, user_id, on_event, deadline) if tool_calls else []
+    return [approval_id for _, approval_id in results if approval_id is not None]
+
+
+def _analysis_message(
+    campaigns_data: List[Dict],
     custom_prompt: Optional[str] = None,
-) -> str:
+    token_budget: Optional[int] = None,
+    rules_note: Optional[str] = None,
+) -> Dict:
     """
-    Analisa dados de campanhas com Claude e cria sugestões de otimização.
-    Usa manual agentic loop com human-in-the-loop.
+    Mensagem inicial da análise: tabela compacta das campanhas + instruções.
+    `rules_note` descreve a pré-triagem — as campanhas recebidas são só as
+    com alerta ou limítrofes, e as sugestões das regras já foram criadas.
     """
-    client = anthropic.Anthropic(api_key=settings.ANTHROPIC_API_KEY)
-    tools = _build_tools()
-
-    # Prepara contexto com dados das campanhas
-    campaigns_json = json.dumps(campaigns_data, ensure_ascii=False, indent=2)
-    user_message = f"""Analise as seguintes campanhas do Meta ADS e crie sugestões de otimização:
+    context = f"""Analise as seguintes campanhas do Meta ADS e crie sugestões de otimização:
 
-```json
-{campaigns_json}
-```
+{encode_campaigns(campaigns_data, token_budget=token_budget)}"""
+    if rules_note:
+        context += f"""
 
-{f'Instrução adicional: {custom_prompt}' if custom_prompt else ''}
+As campanhas acima foram pré-selecionadas por regras automáticas (alertas ou casos limítrofes).
+{rules_note}
+Não repita as sugestões já criadas pelas regras; foque nos casos limítrofes."""
+    instructions = f"""{f'Instrução adicional: {custom_prompt}' if custom_prompt else ''}
 
 Por favor:
 1. Identifique as campanhas com melhor e pior performance
 2. Calcule benchmarks e compare com as métricas apresentadas
 3. Use as ferramentas disponíveis para criar sugestões de otimização concretas
 4. Forneça um resumo executivo com as principais conclusões e próximos passos"""
+    return _context_message(context, instructions)
+
+
+def analyze_campaigns(
+    campaigns_data: List[Dict],
+    db: Session,
+    user_id: int,
+    custom_prompt: Optional[str] = None,
+    rules_note: Optional[str] = None,
+    on_event: Optional[Callable[[str, Dict], None]] = None,
+    recorder: Optional[RunRecorder] = None,
+    deadline: Optional[Deadline] = None,
+) -> Tuple[str, List[int]]:
+    """
+    Analisa dados de campanhas com Claude e cria sugestões de otimização.
+    Usa manual agentic loop com human-in-the-loop.
+    Retorna (texto da análise, ids das aprovações criadas); as métricas vão para `recorder`.
+    Com `deadline`, para (AnalysisAborted) antes da próxima chamada ou gravação após o prazo.
+    """
+    client = anthropic.Anthropic(api_key=settings.ANTHROPIC_API_KEY, base_url=settings.ANTHROPIC_BASE_URL)
+    tools = _build_tools()
+    recorder = recorder or RunRecorder("analyze", user_id)
 
-    messages = [{"role": "user", "content": user_message}]
+    messages = [_analysis_message(campaigns_data, custom_prompt, rules_note=rules_note)]
+    approval_ids: List[int] = []
 
-    # Loop do agente até parar de chamar ferramentas
-    while True:
+    # Loop do agente até parar de chamar ferramentas (no máximo AI_MAX_AGENT_TURNS chamadas)
+    for iteration in range(1, settings.AI_MAX_AGENT_TURNS + 1):
+        _check(deadline)
+        call_started = time.perf_counter()
         with client.messages.stream(
             model="claude-opus-4-6",
             max_tokens=4096,
             thinking={"type": "adaptive"},
-            system=SYSTEM_PROMPT,
+            system=_system_blocks(),
             tools=tools,
             messages=messages,
         ) as stream:
+            for event in stream:
+                if event.type == "content_block_delta":
+                    recorder.first_token(call_started)
+                    break
             response = stream.get_final_message()
+        _log_usage(f"analyze iteração {iteration}", response.usage, recorder)
 
         # Se parou (sem mais ferramentas para chamar), retorna
         if response.stop_reason == "end_turn":
             text_blocks = [b.text for b in response.content if b.type == "text"]
-            return "\n".join(text_blocks)
+            return "\n".join(text_blocks), approval_ids
 
         # Processa chamadas de ferramentas
         if response.stop_reason == "tool_use":
             messages.append({"role": "assistant", "content": response.content})
 
-            tool_results = []
-            for block in response.content:
-                if block.type == "tool_use":
-                    result = _execute_tool(
-                        tool_name=block.name,
-                        tool_input=block.input,
-                        db=db,
-                        user_id=user_id,
-                    )
-                    tool_results.append({
-                        "type": "tool_result",
-                        "tool_use_id": block.id,
-                        "content": result,
-                    })
-
+            tool_results, created = _run_tool_blocks(response.content, db, user_id, on_event, deadline)
+            approval_ids.extend(created)
+            recorder.tool_calls += len(tool_results)
             messages.append({"role": "user", "content": tool_results})
+            _move_turn_breakpoint(messages)
         else:
             # Outro stop reason (max_tokens, etc.)
             break
 
     text_blocks = [b.text for b in response.content if hasattr(b, "text")]
-    return "\n".join(text_blocks) if text_blocks else "Análise concluída."
+    return ("\n".join(text_blocks) if text_blocks else "Análise concluída."), approval_ids
+
+
+def analyze_campaigns_batch(
+    analyses: Dict[str, Dict],
+    db: Session,
+    poll_seconds: Optional[int] = None,
+) -> Dict[str, str]:
+    """
+    Variante offline de `analyze_campaigns` via Message Batches: todas as
+    análises são enviadas em um único lote e consultadas até terminar.
+    `analyses` é {custom_id: {"user_id", "campaigns", "custom_prompt", "rules_note"}};
+    custom_id deve casar com ^[a-zA-Z0-9_-]{1,64}$.
+
+    As chamadas de ferramentas de cada resultado passam por `_run_tool_blocks`
+    (criando as aprovações) e as análises que pararam em tool_use seguem para
+    uma nova rodada com os resultados, até AI_MAX_AGENT_TURNS rodadas.
+    Retorna {custom_id: texto da análise}.
+    """
+    client = anthropic.Anthropic(api_key=settings.ANTHROPIC_API_KEY, base_url=settings.ANTHROPIC_BASE_URL)
+    tools = _build_tools()
+    poll = poll_seconds if poll_seconds is not None else settings.AI_BATCH_POLL_SECONDS
+    recorder = RunRecorder("batch")
+
+    pending = {
+        custom_id: [_analysis_message(a["campaigns"], a.get("custom_prompt"), rules_note=a.get("rules_note"))]
+        for custom_id, a in analyses.items()
+    }
+    texts: Dict[str, str] = {}
+
+    for round_number in range(1, settings.AI_MAX_AGENT_TURNS + 1):
+        if not pending:
+            break
+        batch = client.beta.messages.batches.create(requests=[
+            {
+                "custom_id": custom_id,
+                "params": {
+                    "model": "claude-opus-4-6",
+                    "max_tokens": 4096,
+                    "thinking": {"type": "adaptive"},
+                    "system": _system_blocks(),
+                    "tools": tools,
+                    "messages": messages,
+                },
+            }
+            for custom_id, messages in pending.items()
+        ])
+        logger.info(f"[IA] lote {batch.id} enviado (rodada {round_number}, {len(pending)} análises)")
+
+        while batch.processing_status != "ended":
+            time.sleep(poll)
+            batch = client.beta.messages.batches.retrieve(batch.id)
+        logger.info(f"[IA] lote {batch.id} concluído: {batch.request_counts}")
+
+        next_pending = {}
+        for item in client.beta.messages.batches.results(batch.id):
+            custom_id = item.custom_id
+            if item.result.type != "succeeded":
+                logger.error(f"[IA] lote {batch.id}: análise {custom_id} falhou ({item.result.type})")
+                texts[custom_id] = "Análise não concluída."
+                continue
+
+            message = item.result.message
+            _log_usage(f"lote {custom_id} rodada {round_number}", message.usage, recorder)
+            text = "\n".join(b.text for b in message.content if b.type == "text")
+            if text:
+                texts[custom_id] = text
+            if message.stop_reason != "tool_use":
+                continue
+
+            tool_results, _ = _run_tool_blocks(message.content, db, analyses[custom_id]["user_id"])
+            recorder.tool_calls += len(tool_results)
+            messages = pending[custom_id]
+            messages.append({
+                "role": "assistant",
+                "content": [b.model_dump(exclude_none=True) for b in message.content],
+            })
+            messages.append({"role": "user", "content": tool_results})
+            _move_turn_breakpoint(messages)
+            next_pending[custom_id] = messages
+        pending = next_pending
+
+    save_run(recorder)
+    return {custom_id: texts.get(custom_id, "Análise concluída.") for custom_id in analyses}
+
+
+_async_client: Optional[anthropic.AsyncAnthropic] = None
+
+
+def _get_async_client() -> anthropic.AsyncAnthropic:
+    """Cliente assíncrono compartilhado — reaproveita o pool de conexões entre os chats."""
+    global _async_client
+    if _async_client is None:
+        _async_client = anthropic.AsyncAnthropic(
+            api_key=settings.ANTHROPIC_API_KEY, base_url=settings.ANTHROPIC_BASE_URL,
+        )
+    return _async_client
 
 
-def chat_with_ai(
+async def chat_with_ai(
     message: str,
-    campaigns_data: List[Dict],
+    context: str,
     db: Session,
     user_id: int,
     conversation_history: Optional[List[Dict]] = None,
-) -> Generator[str, None, None]:
+    summary: Optional[str] = None,
+    recorder: Optional[RunRecorder] = None,
+) -> AsyncGenerator[Tuple[str, Any], None]:
     """
-    Chat com IA via streaming. Suporta histórico de conversa.
-    Retorna generator de chunks de texto.
+    Chat com IA via streaming assíncrono. Suporta histórico de conversa.
+    `context` é a tabela de campanhas da conversa e `summary` o resumo das
+    mensagens antigas já compactadas.
+
+    Roda o mesmo loop de agente de `analyze_campaigns` (até AI_MAX_AGENT_TURNS
+    rodadas, todas com thinking), transmitindo o texto de cada rodada. As
+    ferramentas de uma rodada criam suas aprovações juntas, em um único INSERT;
+    se o limite de rodadas acabar com ferramentas pendentes, um aviso fecha a resposta.
+
+    O INSERT roda depois do fim do streaming da rodada, não em paralelo a ele: os
+    blocos tool_use vêm no fim da resposta e o último só fecha junto com ela, então
+    um INSERT único não tem com o que se sobrepor — e a próxima rodada depende dos
+    ids gravados (tool_result). O cliente já recebe "started" a cada bloco fechado.
+
+    Retorna async generator de eventos ("text", chunk) e ("tool", dados) — cada
+    chat aberto custa uma corrotina, não uma thread do threadpool.
     """
-    client = anthropic.Anthropic(api_key=settings.ANTHROPIC_API_KEY)
+    client = _get_async_client()
     tools = _build_tools()
+    recorder = recorder or RunRecorder("chat", user_id)
+
+    messages = [dict(m) for m in conversation_history or []]
+    # Breakpoint no fim do histórico: a próxima mensagem reaproveita o prefixo em cache
+    if messages:
+        messages[-1]["content"] = [{"type": "text", "text": messages[-1]["content"], "cache_control": CACHE_CONTROL}]
+    messages.append({"role": "user", "content": message})
+
+    # Contexto das campanhas (e resumo, se houver) abre a primeira mensagem do usuário
+    blocks = [{"type": "text", "text": f"Contexto atual das campanhas:\n{context}", "cache_control": CACHE_CONTROL}]
+    if summary:
+        blocks.append({"type": "text", "text": f"Resumo da conversa até aqui:\n{summary}"})
+    first = messages[0]
+    if isinstance(first["content"], str):
+        first["content"] = [{"type": "text", "text": first["content"]}]
+    first["content"] = blocks + first["content"]
+
+    for round_number in range(1, settings.AI_MAX_AGENT_TURNS + 1):
+        call_started = time.perf_counter()
+        pending_tools = []
+        separated = round_number == 1
+        async with client.messages.stream(
+            model="claude-opus-4-6",
+            max_tokens=2048,
+            thinking={"type": "adaptive"},
+            system=_system_blocks(),
+            tools=tools,
+            messages=messages,
+        ) as stream:
+            async for event in stream:
+                if event.type == "text":
+                    recorder.first_token(call_started)
+                    if not separated:
+                        separated = True
+                        yield "text", "\n\n"
+                    yield "text", event.text
+                elif event.type == "content_block_stop" and event.content_block.type == "tool_use":
+                    block = event.content_block
+                    yield "tool", {"status": "started", "tool": block.name, "campaign_name": block.input.get("campaign_name")}
+                    pending_tools.append(block)
+
+            final = await stream.get_final_message()
+        _log_usage(f"chat rodada {round_number}", final.usage, recorder)
+
+        if final.stop_reason != "tool_use":
+            return
+
+        # Todas as ferramentas da rodada: um INSERT e um commit, após o fim do streaming
+        results = await asyncio.to_thread(
+            _execute_tools, [(block.name, block.input) for block in pending_tools], db, user_id,
+        )
+        tool_results = []
+        for block, (result, approval_id) in zip(pending_tools, results):
+            recorder.tool_calls += 1
+            tool_results.append({"type": "tool_result", "tool_use_id": block.id, "content": result})
+            yield "tool", {"status": "done", "tool": block.name, "approval_id": approval_id, "message": result}
+
+        if round_number == settings.AI_MAX_AGENT_TURNS:
+            logger.warning(f"[IA] chat do usuário {user_id}: limite de {round_number} rodadas atingido")
+            yield "text", (
+                "\n\n_Limite de etapas desta resposta atingido. As sugestões criadas acima já estão "
+                "na fila de aprovações — envie outra mensagem para continuar a análise._"
+            )
+            return
 
-    messages = list(conversation_history or [])
-
-    # Adiciona contexto de campanhas se não tiver histórico
-    if not messages and campaigns_data:
-        campaigns_json = json.dumps(campaigns_data[:10], ensure_ascii=False, indent=2)
-        context_msg = f"Contexto atual das campanhas:\n```json\n{campaigns_json}\n```\n\n{message}"
-        messages.append({"role": "user", "content": context_msg})
-    else:
-        messages.append({"role": "user", "content": message})
+        messages.append({"role": "assistant", "content": final.content})
+        messages.append({"role": "user", "content": tool_results})
+        _move_turn_breakpoint(messages)
 
-    full_response = ""
 
-    with client.messages.stream(
-        model="claude-opus-4-6",
-        max_tokens=2048,
-        thinking={"type": "adaptive"},
-        system=SYSTEM_PROMPT,
-        tools=tools,
-        messages=messages,
-    ) as stream:
-        for text in stream.text_stream:
-            full_response += text
-            yield text
-
-        final = stream.get_final_message()
-
-    # Se chamou ferramentas, processa em segundo plano
-    if final.stop_reason == "tool_use":
-        messages.append({"role": "assistant", "content": final.content})
-        tool_results = []
-        for block in final.content:
-            if block.type == "tool_use":
-                result = _execute_tool(
-                    tool_name=block.name,
-                    tool_input=block.input,
-                    db=db,
-                    user_id=user_id,
+async def analyze_campaigns_map_reduce(
+    campaigns_by_account: Dict[str, List[Dict]],
+    db: Session,
+    user_id: int,
+    custom_prompt: Optional[str] = None,
+    account_names: Optional[Dict[str, str]] = None,
+    rules_notes: Optional[Dict[str, str]] = None,
+    on_event: Optional[Callable[[str, Dict], None]] = None,
+    recorder: Optional[RunRecorder] = None,
+    deadline: Optional[Deadline] = None,
+) -> Tuple[str, List[int]]:
+    """
+    Análise map-reduce: cada conta é analisada separadamente (em paralelo, até
+    AI_MAP_CONCURRENCY por vez), criando suas próprias sugestões; uma chamada
+    final consolida as análises no resumo do portfólio.
+    O tempo total fica próximo ao da conta mais lenta, não à soma das contas.
+    Retorna (texto da análise, ids das aprovações criadas).
+    Com `deadline` vencido, levanta AnalysisAborted depois que todas as contas pararam.
+    """
+    client = _get_async_client()
+    semaphore = asyncio.Semaphore(settings.AI_MAP_CONCURRENCY)
+    # A sessão do banco não é thread-safe: uma ferramenta por vez
+    db_lock = asyncio.Lock()
+    names = account_names or {}
+    notes = rules_notes or {}
+    recorder = recorder or RunRecorder("analyze_map_reduce", user_id)
+
+    async def run_map(account_id: str, campaigns: List[Dict]) -> Tuple[str, List[int]]:
+        async with semaphore:
+            try:
+                return await _analyze_account(
+                    client, account_id, campaigns, db, db_lock, user_id, custom_prompt,
+                    notes.get(account_id), on_event, recorder, deadline,
                 )
-                tool_results.append({
-                    "type": "tool_result",
-                    "tool_use_id": block.id,
-                    "content": result,
-                })
+            except AnalysisAborted:
+                raise
+            except Exception as e:
+                logger.error(f"Erro na análise da conta {account_id}: {e}")
+                return f"Erro na análise desta conta: {e}", []
+
+    account_ids = list(campaigns_by_account)
+    # return_exceptions: com o prazo vencido, espera as demais contas pararem (nenhuma
+    # thread continua usando a sessão) antes de propagar o AnalysisAborted
+    results = await asyncio.gather(
+        *(run_map(a, campaigns_by_account[a]) for a in account_ids), return_exceptions=True,
+    )
+    for result in results:
+        if isinstance(result, BaseException):
+            raise result
 
-        messages.append({"role": "user", "content": tool_results})
+    sections = "\n\n".join(
+        f"### {names.get(account_id) or account_id} ({account_id})\n{text}"
+        for account_id, (text, _) in zip(account_ids, results)
+    )
+    approval_ids = [approval_id for _, ids in results for approval_id in ids]
+    _check(deadline)
+    portfolio = await _reduce_portfolio(client, sections, len(account_ids), custom_prompt, recorder)
+    return f"{portfolio}\n\n---\n\n## Análises por conta\n\n{sections}", approval_ids
 
-        # Segunda rodada para o Claude responder após as ferramentas
-        with client.messages.stream(
+
+async def _analyze_account(
+    client: anthropic.AsyncAnthropic,
+    account_id: str,
+    campaigns: List[Dict],
+    db: Session,
+    db_lock: asyncio.Lock,
+    user_id: int,
+    custom_prompt: Optional[str],
+    rules_note: Optional[str] = None,
+    on_event: Optional[Callable[[str, Dict], None]] = None,
+    recorder: Optional[RunRecorder] = None,
+    deadline: Optional[Deadline] = None,
+) -> Tuple[str, List[int]]:
+    """Etapa map: loop do agente sobre as campanhas de uma conta."""
+    tools = _build_tools()
+    messages = [_analysis_message(campaigns, custom_prompt, settings.AI_MAP_CONTEXT_TOKEN_BUDGET, rules_note)]
+    approval_ids: List[int] = []
+
+    for iteration in range(1, settings.AI_MAX_AGENT_TURNS + 1):
+        _check(deadline)
+        response = await client.messages.create(
             model="claude-opus-4-6",
-            max_tokens=1024,
-            system=SYSTEM_PROMPT,
+            max_tokens=4096,
+            thinking={"type": "adaptive"},
+            system=_system_blocks(),
             tools=tools,
             messages=messages,
-        ) as stream2:
-            yield "\n\n"
-            for text in stream2.text_stream:
-                yield text
+        )
+        _log_usage(f"map {account_id} iteração {iteration}", response.usage, recorder)
+
+        if response.stop_reason != "tool_use":
+            break
+
+        messages.append({"role": "assistant", "content": response.content})
+        async with db_lock:
+            tool_results, created = await asyncio.to_thread(
+                _run_tool_blocks, response.content, db, user_id, on_event, deadline,
+            )
+        approval_ids.extend(created)
+        if recorder:
+            recorder.tool_calls += len(tool_results)
+        messages.append({"role": "user", "content": tool_results})
+        _move_turn_breakpoint(messages)
+
+    text_blocks = [b.text for b in response.content if b.type == "text"]
+    return ("\n".join(text_blocks) if text_blocks else "Análise concluída."), approval_ids
+
+
+async def _reduce_portfolio(
+    client: anthropic.AsyncAnthropic,
+    sections: str,
+    account_count: int,
+    custom_prompt: Optional[str],
+    recorder: Optional[RunRecorder] = None,
+) -> str:
+    """Etapa reduce: resumo executivo do portfólio a partir das análises por conta."""
+    prompt = f"""Abaixo estão as análises de {account_count} contas de anúncio do mesmo portfólio.
+As sugestões de otimização de cada conta já foram criadas.
+
+{sections}
+
+{f'Instrução adicional: {custom_prompt}' if custom_prompt else ''}
+
+Escreva o resumo executivo do portfólio:
+1. Contas com melhor e pior performance e onde está a maior parte do investimento
+2. Padrões que se repetem entre as contas
+3. Prioridades e próximos passos para o portfólio como um todo"""
+
+    response = await client.messages.create(
+        model="claude-opus-4-6",
+        max_tokens=4096,
+        thinking={"type": "adaptive"},
+        system=_system_blocks(),
+        messages=[{"role": "user", "content": prompt}],
+    )
+    _log_usage("reduce portfólio", response.usage, recorder)
+    return "\n".join(b.text for b in response.content if b.type == "text")
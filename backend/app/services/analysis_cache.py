@@ -0,0 +1,84 @@
+"""
+Cache dos resultados de /api/ai/analyze.
+A chave é um fingerprint dos dados normalizados das campanhas, da instrução
+extra, do período e do modo: clicar em "Analisar" de novo sobre os mesmos
+dados devolve a análise e as aprovações já criadas, sem nova chamada à IA.
+"""
+import hashlib
+import json
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.analysis_result import AnalysisResult
+from app.services.context_encoder import CONTEXT_COLUMNS
+
+
+def fingerprint(campaigns: List[Dict], custom_prompt: Optional[str], date_preset: str, mode: str) -> str:
+    """
+    Hash estável dos dados: só as colunas usadas pela análise, números
+    arredondados e campanhas ordenadas (a ordem do Meta não altera a chave).
+    """
+    rows = sorted(
+        (
+            [round(v, 2) if isinstance(v, float) else v for v in (c.get(key) for key, _ in CONTEXT_COLUMNS)]
+            for c in campaigns
+        ),
+        key=lambda row: json.dumps(row, default=str),
+    )
+    raw = json.dumps(
+        {"rows": rows, "prompt": (custom_prompt or "").strip(), "preset": date_preset, "mode": mode},
+        default=str, ensure_ascii=False,
+    )
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+def get_cached(db: Session, user_id: int, key: str) -> Optional[Dict]:
+    """Resultado ainda válido para o fingerprint, ou None."""
+    result = (
+        db.query(AnalysisResult)
+        .filter(
+            AnalysisResult.user_id == user_id,
+            AnalysisResult.fingerprint == key,
+            AnalysisResult.expires_at > datetime.utcnow(),
+        )
+        .order_by(AnalysisResult.created_at.desc())
+        .first()
+    )
+    if not result:
+        return None
+    return {
+        "analysis": result.analysis,
+        "approval_ids": json.loads(result.approval_ids),
+        "analyzed_at": result.created_at,
+    }
+
+
+def save_result(
+    db: Session,
+    user_id: int,
+    key: str,
+    mode: str,
+    date_preset: str,
+    analysis: str,
+    approval_ids: List[int],
+) -> None:
+    now = datetime.utcnow()
+    db.add(AnalysisResult(
+        user_id=user_id,
+        fingerprint=key,
+        mode=mode,
+        date_preset=date_preset,
+        analysis=analysis,
+        approval_ids=json.dumps(approval_ids),
+        created_at=now,
+        expires_at=now + timedelta(minutes=settings.AI_ANALYSIS_CACHE_TTL_MINUTES),
+    ))
+    # Remove os resultados expirados do usuário
+    db.query(AnalysisResult).filter(
+        AnalysisResult.user_id == user_id,
+        AnalysisResult.expires_at <= now,
+    ).delete(synchronize_session=False)
+    db.commit()
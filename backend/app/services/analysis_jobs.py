@@ -0,0 +1,242 @@
+"""
+Jobs de análise em segundo plano com progresso via SSE.
+O job roda como tarefa asyncio no processo da API; os eventos ficam em memória
+(histórico + filas dos assinantes) e o resultado final fica salvo na tabela
+analysis_jobs. Um assinante em outro processo acompanha o job pelo banco.
+Nenhum job passa de AI_JOB_TIMEOUT_SECONDS: o prazo é verificado pelo próprio
+loop do agente (ai_service.Deadline), que para antes de criar aprovações; depois
+disso, um job ainda queued/running é órfão (processo reiniciado) e é marcado como falho.
+
+A análise usa uma sessão exclusiva; o status do job é gravado por sessões próprias
+(_write_job), nunca pela sessão que a thread da análise pode estar usando.
+"""
+import asyncio
+import json
+import logging
+from datetime import datetime, timedelta
+from typing import AsyncIterator, Dict, List, Optional, Set
+
+from fastapi import HTTPException
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+
+from app.models.analysis_job import AnalysisJob
+from app.models.database import SessionLocal
+from app.models.user import User
+from app.schemas.approval import AIAnalysisRequest
+from app.services.ai_service import Deadline
+from app.services.analysis_service import EventCallback, run_analysis
+
+logger = logging.getLogger(__name__)
+
+TERMINAL_EVENTS = ("result", "error")
+ACTIVE_STATUSES = ("queued", "running")
+ORPHANED_ERROR = "Job interrompido (o servidor foi reiniciado). Solicite a análise novamente."
+# Tempo que o histórico de eventos fica em memória após o fim do job
+EVENT_RETENTION_SECONDS = 300
+# Intervalo de consulta ao banco quando o job não está neste processo
+JOB_POLL_SECONDS = 2
+
+_tasks: Set[asyncio.Task] = set()
+_events: Dict[int, List[Dict]] = {}
+_subscribers: Dict[int, List[asyncio.Queue]] = {}
+
+
+async def submit_job(db: Session, user_id: int, request: AIAnalysisRequest) -> AnalysisJob:
+    """Registra o job e dispara a análise em segundo plano."""
+    job = await asyncio.to_thread(_create_job, db, user_id, request)
+    # Prazo contado da criação, como em _is_orphaned: o job para antes de ser dado como órfão
+    elapsed = (datetime.utcnow() - job.created_at).total_seconds()
+    deadline = Deadline(settings.AI_JOB_TIMEOUT_SECONDS, elapsed)
+    _events[job.id] = []
+    task = asyncio.create_task(_run_job(job.id, user_id, request, deadline))
+    _tasks.add(task)
+    task.add_done_callback(_tasks.discard)
+    return job
+
+
+def get_job(db: Session, user_id: int, job_id: int) -> AnalysisJob:
+    job = db.query(AnalysisJob).filter(AnalysisJob.id == job_id, AnalysisJob.user_id == user_id).first()
+    if not job:
+        raise HTTPException(404, "Job de análise não encontrado")
+    if _is_orphaned(job):
+        _update_job(db, job.id, status="failed", error=ORPHANED_ERROR, finished_at=datetime.utcnow())
+        db.refresh(job)
+    return job
+
+
+def fail_orphaned_jobs() -> int:
+    """
+    Chamado no startup: marca como falhos os jobs queued/running que passaram de
+    AI_JOB_TIMEOUT_SECONDS. Jobs mais novos podem estar rodando em outro worker.
+    """
+    db = SessionLocal()
+    try:
+        count = (
+            db.query(AnalysisJob)
+            .filter(AnalysisJob.status.in_(ACTIVE_STATUSES), AnalysisJob.created_at < _orphan_cutoff())
+            .update(
+                {"status": "failed", "error": ORPHANED_ERROR, "finished_at": datetime.utcnow()},
+                synchronize_session=False,
+            )
+        )
+        db.commit()
+    finally:
+        db.close()
+    if count:
+        logger.warning(f"{count} jobs de análise órfãos marcados como falhos")
+    return count
+
+
+def job_to_dict(job: AnalysisJob) -> Dict:
+    return {
+        "job_id": job.id,
+        "status": job.status,
+        "result": json.loads(job.result) if job.result else None,
+        "error": job.error,
+        "created_at": job.created_at,
+        "started_at": job.started_at,
+        "finished_at": job.finished_at,
+    }
+
+
+async def stream_events(job_id: int) -> AsyncIterator[Dict]:
+    """
+    Eventos do job: primeiro o histórico, depois os novos, até "result" ou "error".
+    Se o job não está na memória deste processo, acompanha o status pelo banco.
+    """
+    if job_id not in _events:
+        async for item in _poll_job(job_id):
+            yield item
+        return
+
+    queue: asyncio.Queue = asyncio.Queue()
+    history = list(_events[job_id])
+    _subscribers.setdefault(job_id, []).append(queue)
+    try:
+        for item in history:
+            yield item
+            if item["event"] in TERMINAL_EVENTS:
+                return
+        while True:
+            item = await queue.get()
+            yield item
+            if item["event"] in TERMINAL_EVENTS:
+                return
+    finally:
+        _subscribers[job_id].remove(queue)
+        if not _subscribers[job_id]:
+            del _subscribers[job_id]
+
+
+def _publish(job_id: int, event: str, data: Dict) -> None:
+    item = {"event": event, "data": jsonable_encoder(data)}
+    _events.setdefault(job_id, []).append(item)
+    for queue in _subscribers.get(job_id, []):
+        queue.put_nowait(item)
+
+
+def _publisher(job_id: int, loop: asyncio.AbstractEventLoop) -> EventCallback:
+    """Callback de progresso seguro para threads (ferramentas rodam no threadpool)."""
+    def publish(event: str, data: Dict) -> None:
+        loop.call_soon_threadsafe(_publish, job_id, event, data)
+    return publish
+
+
+async def _run_job(job_id: int, user_id: int, request: AIAnalysisRequest, deadline: Deadline) -> None:
+    loop = asyncio.get_running_loop()
+    publish = _publisher(job_id, loop)
+    # Sessão exclusiva da análise (usada só pelas threads da análise)
+    db = SessionLocal()
+    release_db = True
+    try:
+        await asyncio.to_thread(_write_job, job_id, status="running", started_at=datetime.utcnow())
+        user = await asyncio.to_thread(db.get, User, user_id)
+        result = jsonable_encoder(await run_analysis(db, user, request, on_event=publish, deadline=deadline))
+        await asyncio.to_thread(
+            _write_job, job_id,
+            status="done", result=json.dumps(result, ensure_ascii=False), finished_at=datetime.utcnow(),
+        )
+        publish("result", result)
+    except asyncio.CancelledError:
+        # Desligamento do processo: a thread da análise ainda pode estar rodando com
+        # a sessão — ela para na próxima verificação do prazo e a sessão não é tocada aqui
+        deadline.cancel()
+        release_db = False
+        await asyncio.to_thread(
+            _write_job, job_id, status="failed", error=ORPHANED_ERROR, finished_at=datetime.utcnow(),
+        )
+        _publish(job_id, "error", {"detail": ORPHANED_ERROR})
+        raise
+    except Exception as e:
+        detail = e.detail if isinstance(e, HTTPException) else str(e)
+        logger.error(f"Job de análise {job_id} falhou: {detail}")
+        await asyncio.to_thread(
+            _write_job, job_id, status="failed", error=detail, finished_at=datetime.utcnow(),
+        )
+        publish("error", {"detail": detail})
+    finally:
+        if release_db:
+            await asyncio.to_thread(db.close)
+        loop.call_later(EVENT_RETENTION_SECONDS, _events.pop, job_id, None)
+
+
+async def _poll_job(job_id: int) -> AsyncIterator[Dict]:
+    """Acompanha pelo banco um job de outro processo, até o resultado ou AI_JOB_TIMEOUT_SECONDS."""
+    while True:
+        job = await asyncio.to_thread(_load_job, job_id)
+        if job is None:
+            return
+        if job.status == "done":
+            yield {"event": "result", "data": json.loads(job.result)}
+            return
+        if job.status == "failed":
+            yield {"event": "error", "data": {"detail": job.error}}
+            return
+        if _is_orphaned(job):
+            await asyncio.to_thread(
+                _write_job, job_id, status="failed", error=ORPHANED_ERROR, finished_at=datetime.utcnow(),
+            )
+            yield {"event": "error", "data": {"detail": ORPHANED_ERROR}}
+            return
+        await asyncio.sleep(JOB_POLL_SECONDS)
+
+
+def _orphan_cutoff() -> datetime:
+    return datetime.utcnow() - timedelta(seconds=settings.AI_JOB_TIMEOUT_SECONDS)
+
+
+def _is_orphaned(job: AnalysisJob) -> bool:
+    return job.status in ACTIVE_STATUSES and job.created_at < _orphan_cutoff()
+
+
+def _write_job(job_id: int, **values) -> None:
+    """Atualiza o job em uma sessão própria."""
+    db = SessionLocal()
+    try:
+        _update_job(db, job_id, **values)
+    finally:
+        db.close()
+
+
+def _create_job(db: Session, user_id: int, request: AIAnalysisRequest) -> AnalysisJob:
+    job = AnalysisJob(user_id=user_id, status="queued", request=request.model_dump_json())
+    db.add(job)
+    db.commit()
+    db.refresh(job)
+    return job
+
+
+def _load_job(job_id: int) -> Optional[AnalysisJob]:
+    db = SessionLocal()
+    try:
+        return db.get(AnalysisJob, job_id)
+    finally:
+        db.close()
+
+
+def _update_job(db: Session, job_id: int, **values) -> None:
+    db.query(AnalysisJob).filter(AnalysisJob.id == job_id).update(values, synchronize_session=False)
+    db.commit()
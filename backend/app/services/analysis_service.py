@@ -0,0 +1,185 @@
+"""
+Pipeline de /api/ai/analyze: busca no Meta, cache por fingerprint, regras
+automáticas e análise pela IA. Usado tanto pelo endpoint síncrono quanto
+pelos jobs em segundo plano (que acompanham o progresso via `on_event`).
+"""
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+from fastapi import HTTPException
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.user import User
+from app.schemas.approval import AIAnalysisRequest
+from app.services.ai_metrics import RunRecorder, save_run
+from app.services.ai_service import Deadline, analyze_campaigns, analyze_campaigns_map_reduce, create_rule_approvals
+from app.services.analysis_cache import fingerprint, get_cached, save_result
+from app.services.meta_service import MetaService
+from app.services.rules_engine import describe_screen, screen_campaigns
+
+# Callback de progresso: on_event(nome_do_evento, dados). Pode ser chamado de threads.
+EventCallback = Callable[[str, Dict], None]
+
+ANALYSIS_MODES = ("single", "map_reduce", "rules")
+
+
+def get_campaigns_data(
+    user: User,
+    account_ids: Optional[List[str]],
+    date_preset: str,
+    max_accounts: Optional[int] = 5,
+) -> List[dict]:
+    """
+    Busca dados de campanhas de todas as contas ou das contas especificadas.
+    As contas são consultadas em paralelo (META_FETCH_CONCURRENCY); `max_accounts`
+    limita quantas contas entram quando nenhuma é especificada (None = todas).
+    """
+    if not user.meta_access_token:
+        raise HTTPException(400, "Conta Meta não conectada.")
+
+    meta = MetaService(access_token=user.meta_access_token)
+
+    account_names = {}
+    if not account_ids:
+        accounts = meta.get_ad_accounts()
+        if max_accounts is not None:
+            accounts = accounts[:max_accounts]
+        account_ids = [a["account_id"] for a in accounts]
+        account_names = {a["account_id"]: a["name"] for a in accounts}
+
+    def fetch(account_id: str) -> List[dict]:
+        try:
+            insights = meta.get_campaign_insights_with_status(account_id=account_id, date_preset=date_preset)
+        except Exception:
+            return []
+
+        for insight in insights:
+            if account_id in account_names:
+                insight["account_name"] = account_names[account_id]
+        return insights
+
+    all_campaigns = []
+    with ThreadPoolExecutor(max_workers=settings.META_FETCH_CONCURRENCY) as pool:
+        for insights in pool.map(fetch, account_ids):
+            all_campaigns.extend(insights)
+
+    return all_campaigns
+
+
+async def run_analysis(
+    db: Session,
+    user: User,
+    request: AIAnalysisRequest,
+    on_event: Optional[EventCallback] = None,
+    deadline: Optional[Deadline] = None,
+) -> Dict:
+    """
+    Executa a análise completa e retorna {analysis, suggestions_created,
+    approval_ids, cached}. Emite os eventos "accounts", "rules", "tool_call"
+    e "approval" ao longo do caminho e grava as métricas da execução
+    (ai_run_metrics) quando há análise nova.
+    `deadline` (jobs em segundo plano) é repassado ao loop do agente, que levanta
+    AnalysisAborted em vez de seguir após o prazo.
+    """
+    emit = on_event or (lambda event, data: None)
+    recorder = RunRecorder(f"analyze_{request.mode}", user.id)
+
+    fetch_started = time.perf_counter()
+    campaigns_data = await run_in_threadpool(
+        get_campaigns_data,
+        user=user,
+        account_ids=request.account_ids,
+        date_preset=request.date_preset,
+        max_accounts=5 if request.mode == "single" else None,
+    )
+    recorder.meta_fetch_ms = int((time.perf_counter() - fetch_started) * 1000)
+    emit("accounts", {
+        "accounts": len({c["account_id"] for c in campaigns_data}),
+        "campaigns": len(campaigns_data),
+    })
+
+    if not campaigns_data:
+        return {
+            "analysis": "Nenhuma campanha encontrada para o período selecionado.",
+            "suggestions_created": 0,
+            "approval_ids": [],
+            "cached": False,
+        }
+
+    cache_key = fingerprint(campaigns_data, request.custom_prompt, request.date_preset, request.mode)
+    if not request.force:
+        cached = await run_in_threadpool(get_cached, db, user.id, cache_key)
+        if cached:
+            return {
+                "analysis": cached["analysis"],
+                "suggestions_created": len(cached["approval_ids"]),
+                "approval_ids": cached["approval_ids"],
+                "cached": True,
+                "analyzed_at": cached["analyzed_at"],
+            }
+
+    if request.mode == "map_reduce":
+        # Regras por conta: a mediana de CPC é o benchmark de cada conta
+        campaigns_by_account = defaultdict(list)
+        account_names = {}
+        for c in campaigns_data:
+            campaigns_by_account[c["account_id"]].append(c)
+            if c.get("account_name"):
+                account_names[c["account_id"]] = c["account_name"]
+        screens = {a: screen_campaigns(cs) for a, cs in campaigns_by_account.items()}
+    else:
+        screens = {None: screen_campaigns(campaigns_data)}
+
+    candidates = [c for screen in screens.values() for c in screen["candidates"]]
+    emit("rules", {
+        "candidates": len(candidates),
+        "review": sum(len(screen["review"]) for screen in screens.values()),
+    })
+    approval_ids = await run_in_threadpool(create_rule_approvals, db, user.id, candidates, on_event, deadline)
+
+    if request.mode == "rules" or not any(screen["review"] for screen in screens.values()):
+        analysis_text = "\n\n".join(describe_screen(screen) for screen in screens.values())
+        ai_approval_ids = []
+    elif request.mode == "map_reduce":
+        analysis_text, ai_approval_ids = await analyze_campaigns_map_reduce(
+            campaigns_by_account={a: s["review"] for a, s in screens.items() if s["review"]},
+            db=db,
+            user_id=user.id,
+            custom_prompt=request.custom_prompt,
+            account_names=account_names,
+            rules_notes={a: describe_screen(s) for a, s in screens.items()},
+            on_event=on_event,
+            recorder=recorder,
+            deadline=deadline,
+        )
+    else:
+        screen = screens[None]
+        analysis_text, ai_approval_ids = await run_in_threadpool(
+            analyze_campaigns,
+            campaigns_data=screen["review"],
+            db=db,
+            user_id=user.id,
+            custom_prompt=request.custom_prompt,
+            rules_note=describe_screen(screen),
+            on_event=on_event,
+            recorder=recorder,
+            deadline=deadline,
+        )
+
+    approval_ids += ai_approval_ids
+    await run_in_threadpool(save_run, recorder)
+    await run_in_threadpool(
+        save_result, db, user.id, cache_key, request.mode, request.date_preset,
+        analysis_text, approval_ids,
+    )
+
+    return {
+        "analysis": analysis_text,
+        "suggestions_created": len(approval_ids),
+        "approval_ids": approval_ids,
+        "cached": False,
+    }
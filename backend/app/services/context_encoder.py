@@ -0,0 +1,151 @@
+"""
+Codifica campanhas como tabela compacta para o contexto da IA.
+Cabeçalho uma única vez, uma linha por campanha, números arredondados e
+limite de tokens: as linhas são priorizadas por gasto e por anomalia, e as
+campanhas que não couberem entram apenas como totais.
+"""
+from statistics import median
+from typing import Dict, List, Optional, Tuple
+
+from app.core.config import settings
+
+# (chave no dict da campanha, nome curto da coluna)
+CONTEXT_COLUMNS: List[Tuple[str, str]] = [
+    ("campaign_id", "id"),
+    ("campaign_name", "nome"),
+    ("account_id", "conta"),
+    ("status", "status"),
+    ("spend", "gasto"),
+    ("impressions", "impr"),
+    ("clicks", "cliques"),
+    ("ctr", "ctr%"),
+    ("cpc", "cpc"),
+    ("cpm", "cpm"),
+    ("conversions", "conv"),
+    ("cost_per_conversion", "cpa"),
+    ("roas", "roas"),
+    ("frequency", "freq"),
+    ("daily_budget", "orc_dia"),
+]
+
+NAME_MAX_LEN = 40
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimativa conservadora (~3 caracteres por token para pt-BR com números)."""
+    return len(text) // 3 + 1
+
+
+def anomaly_score(campaign: Dict, median_cpc: float, median_spend: float) -> float:
+    """
+    Pontua o quanto a campanha merece atenção — mesmos critérios das
+    ferramentas: ROAS muito baixo ou alto, CPC acima de 3x o benchmark e
+    gasto alto sem conversões.
+    """
+    spend = campaign.get("spend", 0) or 0
+    roas = campaign.get("roas", 0) or 0
+    cpc = campaign.get("cpc", 0) or 0
+    score = 0.0
+    if spend > 0 and 0 < roas < 0.5:
+        score += 3
+    if roas > 2:
+        score += 2
+    if median_cpc > 0 and cpc > 3 * median_cpc:
+        score += 2
+    if spend > 0 and spend >= median_spend and not campaign.get("conversions"):
+        score += 3
+    if (campaign.get("frequency", 0) or 0) > 4:
+        score += 1
+    return score
+
+
+def encode_campaigns(campaigns: List[Dict], token_budget: Optional[int] = None) -> str:
+    """Gera a tabela compacta das campanhas dentro do orçamento de tokens."""
+    if not campaigns:
+        return "Nenhuma campanha no período."
+
+    budget = token_budget or settings.AI_CONTEXT_TOKEN_BUDGET
+    ordered = _rank(campaigns)
+
+    header = "|".join(name for _, name in CONTEXT_COLUMNS)
+    lines = [header]
+    used = estimate_tokens(header) + 80  # reserva para o título e a linha de totais
+    included = 0
+    for c in ordered:
+        line = "|".join(_cell(key, c.get(key)) for key, _ in CONTEXT_COLUMNS)
+        cost = estimate_tokens(line)
+        if used + cost > budget and included > 0:
+            break
+        lines.append(line)
+        used += cost
+        included += 1
+
+    title = (
+        f"Campanhas ({included} de {len(campaigns)}, priorizadas por gasto e anomalia). "
+        "Valores em R$; ctr em %; roas em x."
+    )
+    dropped = ordered[included:]
+    if dropped:
+        lines.append(_totals_line(dropped))
+    return "\n".join([title] + lines)
+
+
+def _rank(campaigns: List[Dict]) -> List[Dict]:
+    """Intercala as campanhas de maior gasto com as mais anômalas, sem repetir."""
+    cpcs = [c.get("cpc", 0) for c in campaigns if c.get("cpc")]
+    spends = [c.get("spend", 0) for c in campaigns if c.get("spend")]
+    median_cpc = median(cpcs) if cpcs else 0.0
+    median_spend = median(spends) if spends else 0.0
+
+    scores = {id(c): anomaly_score(c, median_cpc, median_spend) for c in campaigns}
+    by_spend = sorted(campaigns, key=lambda c: c.get("spend", 0) or 0, reverse=True)
+    by_anomaly = sorted(
+        (c for c in campaigns if scores[id(c)] > 0),
+        key=lambda c: (scores[id(c)], c.get("spend", 0) or 0),
+        reverse=True,
+    )
+
+    ordered, seen = [], set()
+    for c in _interleave(by_anomaly, by_spend):
+        if id(c) not in seen:
+            seen.add(id(c))
+            ordered.append(c)
+    return ordered
+
+
+def _interleave(first: List[Dict], second: List[Dict]):
+    for i in range(max(len(first), len(second))):
+        if i < len(first):
+            yield first[i]
+        if i < len(second):
+            yield second[i]
+
+
+def _totals_line(dropped: List[Dict]) -> str:
+    spend = sum(c.get("spend", 0) or 0 for c in dropped)
+    impressions = sum(c.get("impressions", 0) or 0 for c in dropped)
+    clicks = sum(c.get("clicks", 0) or 0 for c in dropped)
+    conversions = sum(c.get("conversions", 0) or 0 for c in dropped)
+    roas_values = [c["roas"] for c in dropped if c.get("roas")]
+    avg_roas = sum(roas_values) / len(roas_values) if roas_values else 0
+    return (
+        f"OUTRAS {len(dropped)} campanhas (omitidas): gasto={_number(spend)} impr={impressions} "
+        f"cliques={clicks} conv={conversions} roas_medio={_number(avg_roas)}"
+    )
+
+
+def _cell(key: str, value) -> str:
+    if value is None:
+        return ""
+    if key == "campaign_name":
+        text = str(value).replace("|", "/").replace("\n", " ")
+        return text if len(text) <= NAME_MAX_LEN else text[:NAME_MAX_LEN - 1] + "…"
+    if isinstance(value, float):
+        return _number(value)
+    return str(value)
+
+
+def _number(value: float) -> str:
+    """Arredonda para 2 casas e remove zeros à direita (12.50 → 12.5, 3.00 → 3)."""
+    text = f"{value:.2f}".rstrip("0").rstrip(".")
+    return text if text not in ("", "-0") else "0"
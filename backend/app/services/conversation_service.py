@@ -0,0 +1,129 @@
+"""
+Persistência das conversas do chat com a IA e compactação por resumo.
+Quando as mensagens ativas passam de AI_CONVERSATION_TOKEN_THRESHOLD tokens,
+as mais antigas são resumidas e deixam de ser enviadas ao modelo, mantendo o
+prompt de tamanho limitado em conversas longas.
+"""
+import asyncio
+import logging
+from datetime import datetime
+from typing import Dict, List, Optional, Set, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.conversation import Conversation, ConversationTurn
+from app.models.database import SessionLocal
+from app.services.context_encoder import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+# Referências às compactações em andamento (evita coleta pelo GC)
+_compaction_tasks: Set[asyncio.Task] = set()
+
+
+def create_conversation(db: Session, user_id: int, context: str, title: str) -> Conversation:
+    conversation = Conversation(user_id=user_id, context=context, title=title[:200])
+    db.add(conversation)
+    db.commit()
+    db.refresh(conversation)
+    return conversation
+
+
+def get_conversation(db: Session, user_id: int, conversation_id: int) -> Conversation:
+    conversation = (
+        db.query(Conversation)
+        .filter(Conversation.id == conversation_id, Conversation.user_id == user_id)
+        .first()
+    )
+    if not conversation:
+        raise HTTPException(404, "Conversa não encontrada")
+    return conversation
+
+
+def prompt_history(db: Session, conversation_id: int) -> Tuple[Optional[str], List[Dict]]:
+    """Retorna (resumo, mensagens ainda não resumidas) no formato da API de mensagens."""
+    conversation = db.get(Conversation, conversation_id)
+    turns = _active_turns(db, conversation_id)
+    return conversation.summary, [{"role": t.role, "content": t.content} for t in turns]
+
+
+def append_turns(db: Session, conversation_id: int, user_text: str, assistant_text: str) -> None:
+    db.add_all([
+        ConversationTurn(
+            conversation_id=conversation_id, role="user",
+            content=user_text, tokens=estimate_tokens(user_text),
+        ),
+        ConversationTurn(
+            conversation_id=conversation_id, role="assistant",
+            content=assistant_text or "(sem resposta em texto)", tokens=estimate_tokens(assistant_text),
+        ),
+    ])
+    db.query(Conversation).filter(Conversation.id == conversation_id).update(
+        {Conversation.updated_at: datetime.utcnow()}, synchronize_session=False
+    )
+    db.commit()
+
+
+def schedule_compaction(conversation_id: int) -> None:
+    """Dispara a compactação em segundo plano, sem atrasar o fim do streaming."""
+    task = asyncio.create_task(compact_conversation(conversation_id))
+    _compaction_tasks.add(task)
+    task.add_done_callback(_compaction_tasks.discard)
+
+
+async def compact_conversation(conversation_id: int) -> None:
+    """
+    Resume as mensagens mais antigas quando a conversa passa do limite de tokens.
+    Mantém as últimas AI_CONVERSATION_KEEP_TURNS mensagens intactas.
+    """
+    from app.services.ai_service import summarize_conversation
+
+    db = SessionLocal()
+    try:
+        turns = await asyncio.to_thread(_active_turns, db, conversation_id)
+        if sum(t.tokens for t in turns) <= settings.AI_CONVERSATION_TOKEN_THRESHOLD:
+            return
+
+        keep = settings.AI_CONVERSATION_KEEP_TURNS
+        # Compacta em pares (usuário + assistente) para o histórico sempre começar pelo usuário
+        cutoff = max(len(turns) - keep, 0)
+        cutoff -= cutoff % 2
+        old_turns = turns[:cutoff]
+        if not old_turns:
+            return
+
+        conversation = await asyncio.to_thread(db.get, Conversation, conversation_id)
+        summary = await summarize_conversation(
+            previous_summary=conversation.summary,
+            turns=[{"role": t.role, "content": t.content} for t in old_turns],
+        )
+        await asyncio.to_thread(_save_summary, db, conversation_id, summary, [t.id for t in old_turns])
+        logger.info(f"Conversa {conversation_id}: {len(old_turns)} mensagens compactadas em resumo")
+    except Exception as e:
+        logger.error(f"Erro ao compactar conversa {conversation_id}: {e}")
+    finally:
+        db.close()
+
+
+def _active_turns(db: Session, conversation_id: int) -> List[ConversationTurn]:
+    return (
+        db.query(ConversationTurn)
+        .filter(
+            ConversationTurn.conversation_id == conversation_id,
+            ConversationTurn.is_summarized == False,
+        )
+        .order_by(ConversationTurn.id)
+        .all()
+    )
+
+
+def _save_summary(db: Session, conversation_id: int, summary: str, turn_ids: List[int]) -> None:
+    db.query(Conversation).filter(Conversation.id == conversation_id).update(
+        {Conversation.summary: summary}, synchronize_session=False
+    )
+    db.query(ConversationTurn).filter(ConversationTurn.id.in_(turn_ids)).update(
+        {ConversationTurn.is_summarized: True}, synchronize_session=False
+    )
+    db.commit()
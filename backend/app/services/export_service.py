@@ -0,0 +1,93 @@
+"""
+Exportação de relatórios em CSV e XLSX via streaming.
+As linhas são consumidas de um iterator e escritas em blocos — o arquivo
+completo nunca fica em memória.
+"""
+import csv
+import io
+import os
+import tempfile
+from typing import Dict, Iterable, Iterator, List, Tuple
+
+import xlsxwriter
+
+# Linhas acumuladas antes de enviar um bloco de CSV ao cliente
+CSV_FLUSH_ROWS = 500
+# Tamanho dos blocos lidos do arquivo XLSX temporário
+XLSX_CHUNK_BYTES = 64 * 1024
+
+_METRIC_COLUMNS = [
+    ("impressions", "Impressões"),
+    ("clicks", "Cliques"),
+    ("spend", "Investimento"),
+    ("reach", "Alcance"),
+    ("cpm", "CPM"),
+    ("cpc", "CPC"),
+    ("ctr", "CTR (%)"),
+    ("conversions", "Conversões"),
+    ("cost_per_conversion", "Custo por Conversão"),
+    ("roas", "ROAS"),
+    ("frequency", "Frequência"),
+]
+
+_CAMPAIGN_COLUMNS = [
+    ("account_id", "Conta ID"),
+    ("account_name", "Conta"),
+    ("campaign_id", "Campanha ID"),
+    ("campaign_name", "Campanha"),
+]
+
+EXPORT_COLUMNS: Dict[str, List[Tuple[str, str]]] = {
+    "campaign": _CAMPAIGN_COLUMNS + [("date_start", "Início"), ("date_stop", "Fim")] + _METRIC_COLUMNS,
+    "adset": _CAMPAIGN_COLUMNS + [("adset_id", "Conjunto ID"), ("adset_name", "Conjunto")] + _METRIC_COLUMNS,
+    "daily": [("date_start", "Data")] + _CAMPAIGN_COLUMNS + _METRIC_COLUMNS,
+}
+
+
+def iter_csv(rows: Iterable[Dict], columns: List[Tuple[str, str]]) -> Iterator[bytes]:
+    """Gera o CSV em blocos de CSV_FLUSH_ROWS linhas (UTF-8 com BOM para o Excel)."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow([label for _, label in columns])
+    pending = 0
+
+    yield b"\xef\xbb\xbf"
+    for row in rows:
+        writer.writerow([row.get(key, "") for key, _ in columns])
+        pending += 1
+        if pending >= CSV_FLUSH_ROWS:
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+            pending = 0
+
+    yield buffer.getvalue().encode("utf-8")
+
+
+def iter_xlsx(rows: Iterable[Dict], columns: List[Tuple[str, str]], sheet_name: str = "Relatório") -> Iterator[bytes]:
+    """
+    Gera o XLSX com o modo constant_memory do xlsxwriter — cada linha é
+    descarregada em disco assim que escrita — e depois envia o arquivo em blocos.
+    """
+    fd, path = tempfile.mkstemp(suffix=".xlsx")
+    os.close(fd)
+    try:
+        workbook = xlsxwriter.Workbook(path, {"constant_memory": True, "in_memory": False})
+        sheet = workbook.add_worksheet(sheet_name[:31])
+        header_format = workbook.add_format({"bold": True, "bg_color": "#1877F2", "font_color": "#FFFFFF"})
+
+        for col, (_, label) in enumerate(columns):
+            sheet.write(0, col, label, header_format)
+
+        for row_idx, row in enumerate(rows, start=1):
+            for col, (key, _) in enumerate(columns):
+                value = row.get(key)
+                if value is not None:
+                    sheet.write(row_idx, col, value)
+        workbook.close()
+
+        with open(path, "rb") as f:
+            while chunk := f.read(XLSX_CHUNK_BYTES):
+                yield chunk
+    finally:
+        os.remove(path)
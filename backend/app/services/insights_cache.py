@@ -0,0 +1,185 @@
+"""
+Cache das métricas do Meta em insight_cache, compartilhado entre os workers.
+
+- O conteúdo é gravado como JSON comprimido (zlib); raw_bytes guarda o tamanho
+  original para as estatísticas de compressão.
+- Cada usuário tem no máximo INSIGHT_CACHE_MAX_ENTRIES_PER_USER entradas: ao
+  gravar além do limite, as de acesso mais antigo são descartadas (LRU).
+- As entradas expiradas são apagadas em lotes pelo loop do lifespan.
+- Acertos, falhas, descartes e expiradas apagadas são contados por processo.
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import zlib
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
+
+from sqlalchemy import delete, func, select, text, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.models.database import AsyncSessionLocal
+from app.models.insight_cache import InsightCache
+
+logger = logging.getLogger(__name__)
+
+_counters: Counter = Counter()
+
+
+def cache_key(**params: Any) -> str:
+    """Chave estável a partir dos parâmetros da consulta ao Meta."""
+    raw = json.dumps(params, sort_keys=True, default=str)
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+async def get_cached(db: AsyncSession, user_id: int, key: str) -> Optional[Any]:
+    """Conteúdo ainda válido para a chave, ou None."""
+    now = datetime.utcnow()
+    row = (await db.execute(
+        select(InsightCache.id, InsightCache.payload, InsightCache.last_accessed_at).where(
+            InsightCache.user_id == user_id,
+            InsightCache.cache_key == key,
+            InsightCache.expires_at > now,
+        )
+    )).first()
+    if row is None:
+        _counters["misses"] += 1
+        return None
+
+    _counters["hits"] += 1
+    # Último acesso gravado no máximo a cada INSIGHT_CACHE_TOUCH_SECONDS (evita uma escrita por leitura)
+    if now - row.last_accessed_at >= timedelta(seconds=settings.INSIGHT_CACHE_TOUCH_SECONDS):
+        await db.execute(
+            update(InsightCache).where(InsightCache.id == row.id).values(last_accessed_at=now)
+        )
+        await db.commit()
+    return json.loads(zlib.decompress(row.payload))
+
+
+async def save_cached(
+    db: AsyncSession,
+    user_id: int,
+    key: str,
+    value: Any,
+    account_id: str,
+    date_preset: str,
+    campaign_id: Optional[str] = None,
+    adset_id: Optional[str] = None,
+) -> None:
+    """Grava (upsert) o conteúdo e descarta as entradas do usuário acima do limite."""
+    raw = json.dumps(value, ensure_ascii=False, default=str).encode()
+    now = datetime.utcnow()
+    stmt = pg_insert(InsightCache).values(
+        user_id=user_id,
+        cache_key=key,
+        account_id=account_id,
+        campaign_id=campaign_id,
+        adset_id=adset_id,
+        date_preset=date_preset,
+        payload=zlib.compress(raw),
+        raw_bytes=len(raw),
+        cached_at=now,
+        last_accessed_at=now,
+        expires_at=now + timedelta(minutes=settings.INSIGHT_CACHE_TTL_MINUTES),
+    )
+    stmt = stmt.on_conflict_do_update(
+        constraint="uq_insight_cache_user_key",
+        set_={
+            column: stmt.excluded[column]
+            for column in ("payload", "raw_bytes", "cached_at", "last_accessed_at", "expires_at")
+        },
+    )
+    try:
+        await db.execute(stmt)
+        evicted = await _evict_over_limit(db, user_id)
+        await db.commit()
+    except Exception as e:
+        await db.rollback()
+        logger.error(f"Erro ao gravar cache de insights do usuário {user_id}: {e}")
+        return
+    _counters["evictions"] += evicted
+
+
+async def _evict_over_limit(db: AsyncSession, user_id: int) -> int:
+    """Apaga as entradas do usuário além das INSIGHT_CACHE_MAX_ENTRIES_PER_USER mais recentes."""
+    over_limit = (
+        select(InsightCache.id)
+        .where(InsightCache.user_id == user_id)
+        .order_by(InsightCache.last_accessed_at.desc(), InsightCache.id.desc())
+        .offset(settings.INSIGHT_CACHE_MAX_ENTRIES_PER_USER)
+    )
+    result = await db.execute(delete(InsightCache).where(InsightCache.id.in_(over_limit)))
+    return result.rowcount
+
+
+async def invalidate_user(db: AsyncSession, user_id: int) -> None:
+    """Descarta o cache do usuário (ex: uma ação alterou as campanhas). Não faz commit."""
+    await db.execute(delete(InsightCache).where(InsightCache.user_id == user_id))
+
+
+async def purge_expired() -> int:
+    """Apaga as entradas expiradas em lotes de INSIGHT_CACHE_PURGE_BATCH. Retorna quantas."""
+    batch = settings.INSIGHT_CACHE_PURGE_BATCH
+    purged = 0
+    try:
+        async with AsyncSessionLocal() as db:
+            while True:
+                expired = (
+                    select(InsightCache.id)
+                    .where(InsightCache.expires_at <= datetime.utcnow())
+                    .limit(batch)
+                )
+                result = await db.execute(delete(InsightCache).where(InsightCache.id.in_(expired)))
+                # Um commit por lote: transações curtas, sem segurar locks de milhares de linhas
+                await db.commit()
+                purged += result.rowcount
+                if result.rowcount < batch:
+                    break
+    except Exception as e:
+        logger.error(f"Erro na limpeza do cache de insights: {e}")
+    _counters["expired_purged"] += purged
+    return purged
+
+
+async def run_cache_cleanup() -> None:
+    """Loop do lifespan da aplicação: apaga as entradas expiradas periodicamente."""
+    while True:
+        await asyncio.sleep(settings.INSIGHT_CACHE_PURGE_INTERVAL_SECONDS)
+        purged = await purge_expired()
+        if purged:
+            logger.info(f"Cache de insights: {purged} entradas expiradas apagadas")
+
+
+async def cache_stats(db: AsyncSession, user_id: int) -> Dict[str, Any]:
+    """Entradas e tamanho do cache do usuário, tamanho da tabela e contadores do processo."""
+    now = datetime.utcnow()
+    row = (await db.execute(
+        select(
+            func.count(),
+            func.count().filter(InsightCache.expires_at <= now),
+            func.coalesce(func.sum(func.length(InsightCache.payload)), 0),
+            func.coalesce(func.sum(InsightCache.raw_bytes), 0),
+        ).where(InsightCache.user_id == user_id)
+    )).one()
+    entries, expired, stored_bytes, raw_bytes = row[0], row[1], int(row[2]), int(row[3])
+
+    table_bytes = None
+    if db.bind.dialect.name == "postgresql":
+        table_bytes = await db.scalar(text("SELECT pg_total_relation_size('insight_cache')"))
+
+    return {
+        "entries": entries,
+        "expired_entries": expired,
+        "max_entries": settings.INSIGHT_CACHE_MAX_ENTRIES_PER_USER,
+        "stored_bytes": stored_bytes,
+        "raw_bytes": raw_bytes,
+        "compression_ratio": round(raw_bytes / stored_bytes, 2) if stored_bytes else None,
+        "table_bytes": table_bytes,
+        "process": {
+            name: _counters[name] for name in ("hits", "misses", "evictions", "expired_purged")
+        },
+    }
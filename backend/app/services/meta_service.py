@@ -4,7 +4,7 @@ Gerencia Business Managers, contas de anúncio, campanhas e insights.
 """
 import json
 from datetime import datetime, timedelta
-from typing import List, Optional, Dict, Any
+from typing import Iterator, List, Optional, Dict, Any
 
 from facebook_business.api import FacebookAdsApi
 from facebook_business.adobjects.user import User as FBUser
@@ -42,6 +42,49 @@ DATE_PRESETS = {
 }
 
 
+def _parse_insight(insight, account_id: str) -> Dict:
+    """Normaliza um insight da Graph API no formato usado pela aplicação."""
+    roas = 0.0
+    if insight.get("purchase_roas"):
+        try:
+            roas = float(insight["purchase_roas"][0].get("value", 0))
+        except (IndexError, TypeError, ValueError):
+            roas = 0.0
+
+    conversions = 0
+    cost_per_conversion = 0.0
+    if insight.get("conversions"):
+        try:
+            conversions = int(float(insight["conversions"][0].get("value", 0)))
+        except (IndexError, TypeError, ValueError):
+            pass
+
+    if insight.get("cost_per_conversion"):
+        try:
+            cost_per_conversion = float(insight["cost_per_conversion"][0].get("value", 0))
+        except (IndexError, TypeError, ValueError):
+            pass
+
+    return {
+        "campaign_id": insight.get("campaign_id", ""),
+        "campaign_name": insight.get("campaign_name", ""),
+        "impressions": int(insight.get("impressions", 0)),
+        "clicks": int(insight.get("clicks", 0)),
+        "spend": float(insight.get("spend", 0)),
+        "reach": int(insight.get("reach", 0)),
+        "cpm": float(insight.get("cpm", 0)),
+        "cpc": float(insight.get("cpc", 0)),
+        "ctr": float(insight.get("ctr", 0)),
+        "conversions": conversions,
+        "cost_per_conversion": cost_per_conversion,
+        "roas": roas,
+        "frequency": float(insight.get("frequency", 0)),
+        "account_id": account_id,
+        "date_start": insight.get("date_start"),
+        "date_stop": insight.get("date_stop"),
+    }
+
+
 class MetaService:
     def __init__(self, access_token: str):
         self.access_token = access_token
@@ -86,6 +129,17 @@ class MetaService:
         except Exception as e:
             raise ValueError(f"Erro ao buscar contas de anúncio: {str(e)}")
 
+    def get_ad_account_names(self, account_ids: List[str]) -> Dict[str, str]:
+        """Retorna {account_id: nome} das contas informadas (usa o ID se falhar)."""
+        names = {}
+        for account_id in account_ids:
+            try:
+                account = AdAccount(f"act_{account_id.replace('act_', '')}").api_get(fields=["name"])
+                names[account_id] = account.get("name") or account_id
+            except Exception:
+                names[account_id] = account_id
+        return names
+
     def get_campaigns(self, account_id: str) -> List[Dict]:
         """Retorna campanhas de uma conta de anúncio."""
         try:
@@ -134,53 +188,65 @@ class MetaService:
 
             fields = INSIGHT_FIELDS + ["campaign_id", "campaign_name"]
             insights = account.get_insights(fields=fields, params=params)
-            results = []
-
-            for insight in insights:
-                roas = 0.0
-                if insight.get("purchase_roas"):
-                    try:
-                        roas = float(insight["purchase_roas"][0].get("value", 0))
-                    except (IndexError, TypeError, ValueError):
-                        roas = 0.0
-
-                conversions = 0
-                cost_per_conversion = 0.0
-                if insight.get("conversions"):
-                    try:
-                        conversions = int(float(insight["conversions"][0].get("value", 0)))
-                    except (IndexError, TypeError, ValueError):
-                        pass
-
-                if insight.get("cost_per_conversion"):
-                    try:
-                        cost_per_conversion = float(insight["cost_per_conversion"][0].get("value", 0))
-                    except (IndexError, TypeError, ValueError):
-                        pass
-
-                results.append({
-                    "campaign_id": insight.get("campaign_id", ""),
-                    "campaign_name": insight.get("campaign_name", ""),
-                    "impressions": int(insight.get("impressions", 0)),
-                    "clicks": int(insight.get("clicks", 0)),
-                    "spend": float(insight.get("spend", 0)),
-                    "reach": int(insight.get("reach", 0)),
-                    "cpm": float(insight.get("cpm", 0)),
-                    "cpc": float(insight.get("cpc", 0)),
-                    "ctr": float(insight.get("ctr", 0)),
-                    "conversions": conversions,
-                    "cost_per_conversion": cost_per_conversion,
-                    "roas": roas,
-                    "frequency": float(insight.get("frequency", 0)),
-                    "account_id": account_id,
-                    "date_start": insight.get("date_start"),
-                    "date_stop": insight.get("date_stop"),
-                })
+            results = [_parse_insight(insight, account_id) for insight in insights]
 
             return results
         except Exception as e:
             raise ValueError(f"Erro ao buscar insights: {str(e)}")
 
+    def get_campaign_insights_with_status(self, account_id: str, date_preset: str = "last_7d") -> List[Dict]:
+        """Insights das campanhas enriquecidos com o status e o orçamento diário atuais."""
+        insights = self.get_campaign_insights(account_id=account_id, date_preset=date_preset)
+        campaigns = {c["campaign_id"]: c for c in self.get_campaigns(account_id=account_id)}
+        for insight in insights:
+            campaign = campaigns.get(insight["campaign_id"], {})
+            insight["status"] = campaign.get("status", "UNKNOWN")
+            insight["daily_budget"] = campaign.get("daily_budget")
+        return insights
+
+    def iter_insights(
+        self,
+        account_id: str,
+        date_preset: str = "last_7d",
+        level: str = "campaign",
+        daily: bool = False,
+        since: Optional[str] = None,
+        until: Optional[str] = None,
+    ) -> Iterator[Dict]:
+        """
+        Itera insights no nível campaign ou adset, opcionalmente dia a dia.
+        Com since/until (YYYY-MM-DD), usa o intervalo no lugar do date_preset.
+        As páginas da Graph API são buscadas sob demanda, sem carregar tudo em memória.
+        """
+        if level not in ("campaign", "adset"):
+            raise ValueError(f"Nível de insights inválido: {level}")
+
+        account = AdAccount(f"act_{account_id.replace('act_', '')}")
+        params = {
+            "date_preset": DATE_PRESETS.get(date_preset, "last_7_d"),
+            "level": level,
+            "limit": 500,
+        }
+        if since and until:
+            del params["date_preset"]
+            params["time_range"] = {"since": since, "until": until}
+        if daily:
+            params["time_increment"] = 1
+
+        fields = INSIGHT_FIELDS + ["campaign_id", "campaign_name"]
+        if level == "adset":
+            fields += ["adset_id", "adset_name"]
+
+        try:
+            for insight in account.get_insights(fields=fields, params=params):
+                row = _parse_insight(insight, account_id)
+                if level == "adset":
+                    row["adset_id"] = insight.get("adset_id", "")
+                    row["adset_name"] = insight.get("adset_name", "")
+                yield row
+        except Exception as e:
+            raise ValueError(f"Erro ao buscar insights: {str(e)}")
+
     def get_adset_insights(self, account_id: str, campaign_id: str, date_preset: str = "last_7d") -> List[Dict]:
         """Retorna insights de conjuntos de anúncios de uma campanha."""
         try:
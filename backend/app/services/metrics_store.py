@@ -0,0 +1,279 @@
+"""
+Histórico de métricas por dia (campaign_daily_metrics) e agregados semanais e
+mensais (campaign_metric_rollups).
+O ingest grava os dias buscados no Meta e, na mesma transação, recalcula os
+agregados dos períodos afetados — as consultas de tendência leem só o banco.
+As partições que faltarem são criadas antes, em uma transação própria.
+"""
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import Date, and_, cast, delete, func, insert, literal, select, text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.campaign_metric import CampaignDailyMetric, CampaignMetricRollup
+from app.models.user import User
+from app.services.meta_service import MetaService
+
+logger = logging.getLogger(__name__)
+
+LEVELS = ("campaign", "adset")
+PERIODS = ("week", "month")
+GRANULARITIES = ("day",) + PERIODS
+UPSERT_CHUNK = 1000
+
+_METRIC_COLUMNS = (
+    "campaign_name", "adset_name", "impressions", "clicks", "spend",
+    "reach", "conversions", "purchase_value", "updated_at",
+)
+
+
+def period_start(period: str, day: date) -> date:
+    """Início da semana (segunda-feira, como o date_trunc do Postgres) ou do mês."""
+    if period == "week":
+        return day - timedelta(days=day.weekday())
+    return day.replace(day=1)
+
+
+def _period_end(period: str, start: date) -> date:
+    """Início do período seguinte (limite exclusivo)."""
+    if period == "week":
+        return start + timedelta(days=7)
+    return (start.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+
+def ensure_partitions(db: Session, start: date, end: date) -> None:
+    """
+    Cria as partições mensais que faltarem para cobrir [start, end] e faz commit.
+    O CREATE TABLE ... PARTITION OF trava a tabela-mãe (ACCESS EXCLUSIVE) até o
+    commit, bloqueando as leituras de /trends: a DDL fica em uma transação curta,
+    separada dos upserts, e só roda para as partições que ainda não existem.
+    """
+    if db.get_bind().dialect.name != "postgresql":
+        return
+    month = period_start("month", start)
+    created = False
+    while month <= end:
+        next_month = _period_end("month", month)
+        name = f"campaign_daily_metrics_{month:%Y_%m}"
+        if db.scalar(text("SELECT to_regclass(:name)"), {"name": name}) is None:
+            db.execute(text(
+                f"CREATE TABLE IF NOT EXISTS {name} "
+                f"PARTITION OF campaign_daily_metrics FOR VALUES FROM ('{month}') TO ('{next_month}')"
+            ))
+            created = True
+        month = next_month
+    db.commit()
+    if created:
+        logger.info(f"Partições de campaign_daily_metrics criadas para {start} a {end}")
+
+
+def upsert_daily(db: Session, user_id: int, level: str, rows: List[Dict]) -> int:
+    """
+    Grava as linhas diárias (insights com time_increment=1) de um nível. Retorna quantas.
+    As partições dos dias gravados devem existir (ensure_partitions).
+    """
+    now = datetime.utcnow()
+    values = [
+        {
+            "user_id": user_id,
+            "level": level,
+            "account_id": row["account_id"],
+            "campaign_id": row["campaign_id"],
+            "adset_id": row.get("adset_id", "") if level == "adset" else "",
+            "date": date.fromisoformat(row["date_start"]),
+            "campaign_name": row.get("campaign_name"),
+            "adset_name": row.get("adset_name"),
+            "impressions": row.get("impressions", 0),
+            "clicks": row.get("clicks", 0),
+            "spend": row.get("spend", 0.0),
+            "reach": row.get("reach", 0),
+            "conversions": row.get("conversions", 0),
+            "purchase_value": round((row.get("roas", 0.0) or 0.0) * (row.get("spend", 0.0) or 0.0), 2),
+            "updated_at": now,
+        }
+        for row in rows
+        if row.get("date_start")
+    ]
+    if not values:
+        return 0
+
+    for i in range(0, len(values), UPSERT_CHUNK):
+        stmt = pg_insert(CampaignDailyMetric).values(values[i:i + UPSERT_CHUNK])
+        stmt = stmt.on_conflict_do_update(
+            constraint="pk_campaign_daily_metrics",
+            set_={column: stmt.excluded[column] for column in _METRIC_COLUMNS},
+        )
+        db.execute(stmt)
+    return len(values)
+
+
+def refresh_rollups(db: Session, user_id: int, start: date, end: date) -> None:
+    """Recalcula os agregados semanais e mensais que contêm os dias de [start, end]."""
+    daily = CampaignDailyMetric
+    now = datetime.utcnow()
+    columns = [
+        "user_id", "period", "level", "account_id", "campaign_id", "adset_id", "period_start",
+        "campaign_name", "adset_name", "impressions", "clicks", "spend", "conversions",
+        "purchase_value", "days", "updated_at",
+    ]
+    sums = [
+        func.sum(daily.impressions), func.sum(daily.clicks), func.sum(daily.spend),
+        func.sum(daily.conversions), func.sum(daily.purchase_value),
+        func.count(func.distinct(daily.date)), literal(now),
+    ]
+
+    for period in PERIODS:
+        first = period_start(period, start)
+        stop = _period_end(period, period_start(period, end))
+        bucket = cast(func.date_trunc(period, daily.date), Date)
+        in_range = and_(daily.user_id == user_id, daily.date >= first, daily.date < stop)
+
+        db.execute(delete(CampaignMetricRollup).where(
+            CampaignMetricRollup.user_id == user_id,
+            CampaignMetricRollup.period == period,
+            CampaignMetricRollup.period_start >= first,
+            CampaignMetricRollup.period_start < stop,
+        ))
+        # Campanhas e conjuntos de anúncios
+        by_entity = (
+            select(
+                literal(user_id), literal(period), daily.level, daily.account_id, daily.campaign_id,
+                daily.adset_id, bucket, func.max(daily.campaign_name), func.max(daily.adset_name), *sums,
+            )
+            .where(in_range)
+            .group_by(daily.level, daily.account_id, daily.campaign_id, daily.adset_id, bucket)
+        )
+        # Contas: soma das campanhas (o nível adset repetiria os mesmos valores)
+        by_account = (
+            select(
+                literal(user_id), literal(period), literal("account"), daily.account_id, literal(""),
+                literal(""), bucket, literal(None), literal(None), *sums,
+            )
+            .where(in_range, daily.level == "campaign")
+            .group_by(daily.account_id, bucket)
+        )
+        db.execute(insert(CampaignMetricRollup).from_select(columns, by_entity))
+        db.execute(insert(CampaignMetricRollup).from_select(columns, by_account))
+
+
+def ingest_user(db: Session, user: User, since: date, until: date) -> Tuple[int, int]:
+    """
+    Busca no Meta as métricas diárias de [since, until] de todas as contas do
+    usuário (campanhas e conjuntos), grava e atualiza os agregados.
+    Retorna (linhas gravadas, buscas que falharam); uma conta/nível que falha
+    não impede a gravação dos demais.
+    """
+    meta = MetaService(access_token=user.meta_access_token)
+    account_ids = [a["account_id"] for a in meta.get_ad_accounts()]
+
+    def fetch(account_id: str) -> Dict[str, Optional[List[Dict]]]:
+        rows = {}
+        for level in LEVELS:
+            try:
+                rows[level] = list(meta.iter_insights(
+                    account_id=account_id, level=level, daily=True,
+                    since=since.isoformat(), until=until.isoformat(),
+                ))
+            except Exception as e:
+                logger.warning(f"Usuário {user.id}, conta {account_id}, nível {level}: {e}")
+                rows[level] = None
+        return rows
+
+    with ThreadPoolExecutor(max_workers=settings.META_FETCH_CONCURRENCY) as pool:
+        fetched = list(pool.map(fetch, account_ids))
+
+    ensure_partitions(db, since, until)
+    written = failed = 0
+    for by_level in fetched:
+        for level, rows in by_level.items():
+            if rows is None:
+                failed += 1
+                continue
+            written += upsert_daily(db, user.id, level, rows)
+    refresh_rollups(db, user.id, since, until)
+    db.commit()
+    return written, failed
+
+
+async def get_trend(
+    db: AsyncSession,
+    user_id: int,
+    granularity: str,
+    date_from: date,
+    date_to: date,
+    account_id: Optional[str] = None,
+    campaign_id: Optional[str] = None,
+    adset_id: Optional[str] = None,
+) -> List[Dict]:
+    """
+    Série histórica somada por dia, semana ou mês. Semana e mês vêm dos agregados
+    (no nível conta, se não houver filtro de campanha/conjunto); dia, da tabela diária.
+    """
+    level = "adset" if adset_id else "campaign" if campaign_id else "account"
+    if granularity == "day":
+        table = CampaignDailyMetric
+        bucket = table.date
+        query = select().where(
+            table.user_id == user_id,
+            # Totais da conta = soma das campanhas
+            table.level == ("campaign" if level == "account" else level),
+            table.date >= date_from,
+            table.date <= date_to,
+        )
+    else:
+        table = CampaignMetricRollup
+        bucket = table.period_start
+        query = select().where(
+            table.user_id == user_id,
+            table.period == granularity,
+            table.level == level,
+            table.period_start >= period_start(granularity, date_from),
+            table.period_start <= date_to,
+        )
+    if account_id:
+        query = query.where(table.account_id == account_id)
+    if campaign_id:
+        query = query.where(table.campaign_id == campaign_id)
+    if adset_id:
+        query = query.where(table.adset_id == adset_id)
+
+    query = (
+        query.add_columns(
+            bucket.label("period_start"),
+            func.sum(table.impressions).label("impressions"),
+            func.sum(table.clicks).label("clicks"),
+            func.sum(table.spend).label("spend"),
+            func.sum(table.conversions).label("conversions"),
+            func.sum(table.purchase_value).label("purchase_value"),
+        )
+        .group_by(bucket)
+        .order_by(bucket)
+    )
+    return [_with_ratios(dict(row._mapping)) for row in await db.execute(query)]
+
+
+def _with_ratios(point: Dict) -> Dict:
+    """Recalcula as métricas derivadas a partir das somas do período."""
+    # SUM de BIGINT volta como Decimal no Postgres
+    impressions, clicks = int(point["impressions"] or 0), int(point["clicks"] or 0)
+    spend, conversions = float(point["spend"] or 0.0), int(point["conversions"] or 0)
+    purchase_value = float(point["purchase_value"] or 0.0)
+    point.update({
+        "impressions": impressions,
+        "clicks": clicks,
+        "spend": round(spend, 2),
+        "conversions": conversions,
+        "purchase_value": round(purchase_value, 2),
+        "ctr": round(clicks / impressions * 100, 2) if impressions else 0.0,
+        "cpc": round(spend / clicks, 2) if clicks else 0.0,
+        "cpm": round(spend / impressions * 1000, 2) if impressions else 0.0,
+        "cost_per_conversion": round(spend / conversions, 2) if conversions else 0.0,
+        "roas": round(purchase_value / spend, 2) if spend else 0.0,
+    })
+    return point
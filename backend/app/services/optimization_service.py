@@ -1,66 +1,76 @@
 """
 Executa ações de otimização aprovadas pelo usuário via Meta API.
 """
-import json
 from datetime import datetime
-from sqlalchemy.orm import Session
+from typing import Union
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import update
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.models.approval import Approval, ApprovalStatus
+from app.models.report_snapshot import ReportSnapshot
 from app.models.user import User
+from app.schemas.approval import ACTION_PAYLOADS, BidPayload, BudgetPayload, CampaignActionPayload
+from app.services.insights_cache import invalidate_user as invalidate_insights_cache
 from app.services.meta_service import MetaService
 
 
-def execute_approved_action(approval: Approval, db: Session) -> dict:
+async def execute_approved_action(approval: Approval, user: User, db: AsyncSession) -> dict:
     """
     Executa uma ação aprovada pelo usuário.
+    A chamada ao Meta (SDK síncrono) roda no threadpool; o banco, no event loop.
     Retorna dict com status e resultado.
     """
-    user: User = approval.user
     if not user.meta_access_token:
         return {"success": False, "error": "Token Meta não encontrado para este usuário"}
-
-    meta = MetaService(access_token=user.meta_access_token)
-    payload = json.loads(approval.payload)
+    payload_model = ACTION_PAYLOADS.get(approval.action_type)
+    if payload_model is None:
+        return {"success": False, "error": f"Tipo de ação desconhecido: {approval.action_type}"}
 
     try:
-        result_msg = ""
+        payload = payload_model.model_validate(approval.payload)
+        result_msg = await run_in_threadpool(_apply_action, user.meta_access_token, approval.action_type, payload)
+    except Exception as e:
+        error_msg = str(e)
+        approval.status = ApprovalStatus.FAILED
+        approval.execution_result = f"ERRO: {error_msg}"
+        await db.commit()
+        return {"success": False, "error": error_msg}
 
-        if approval.action_type == "pause_campaign":
-            meta.pause_campaign(payload["campaign_id"])
-            result_msg = f"Campanha pausada com sucesso em {datetime.utcnow().strftime('%d/%m/%Y %H:%M')} UTC"
+    # Atualiza status no banco
+    approval.status = ApprovalStatus.EXECUTED
+    approval.executed_at = datetime.utcnow()
+    approval.execution_result = result_msg
+    # A ação alterou campanhas — snapshots de relatório e cache de insights do usuário ficam obsoletos
+    await db.execute(
+        update(ReportSnapshot).where(ReportSnapshot.user_id == user.id).values(is_stale=True)
+    )
+    await invalidate_insights_cache(db, user.id)
+    await db.commit()
 
-        elif approval.action_type == "enable_campaign":
-            meta.enable_campaign(payload["campaign_id"])
-            result_msg = f"Campanha ativada com sucesso em {datetime.utcnow().strftime('%d/%m/%Y %H:%M')} UTC"
+    return {"success": True, "message": result_msg}
 
-        elif approval.action_type == "adjust_budget":
-            meta.adjust_campaign_budget(
-                campaign_id=payload["campaign_id"],
-                new_daily_budget=float(payload["new_budget"]),
-            )
-            result_msg = f"Orçamento ajustado para R$ {payload['new_budget']:.2f}/dia com sucesso"
 
-        elif approval.action_type == "adjust_bid":
-            meta.adjust_adset_bid(
-                adset_id=payload["adset_id"],
-                new_bid=float(payload["new_bid"]),
-            )
-            result_msg = f"Lance ajustado para R$ {payload['new_bid']:.2f} com sucesso"
+def _apply_action(
+    access_token: str,
+    action_type: str,
+    payload: Union[CampaignActionPayload, BudgetPayload, BidPayload],
+) -> str:
+    """Aplica a ação no Meta e retorna a mensagem de resultado."""
+    meta = MetaService(access_token=access_token)
 
-        else:
-            return {"success": False, "error": f"Tipo de ação desconhecido: {approval.action_type}"}
+    if action_type == "pause_campaign":
+        meta.pause_campaign(payload.campaign_id)
+        return f"Campanha pausada com sucesso em {datetime.utcnow().strftime('%d/%m/%Y %H:%M')} UTC"
 
-        # Atualiza status no banco
-        approval.status = ApprovalStatus.EXECUTED
-        approval.executed_at = datetime.utcnow()
-        approval.execution_result = result_msg
-        db.commit()
+    if action_type == "enable_campaign":
+        meta.enable_campaign(payload.campaign_id)
+        return f"Campanha ativada com sucesso em {datetime.utcnow().strftime('%d/%m/%Y %H:%M')} UTC"
 
-        return {"success": True, "message": result_msg}
+    if action_type == "adjust_budget":
+        meta.adjust_campaign_budget(campaign_id=payload.campaign_id, new_daily_budget=payload.new_budget)
+        return f"Orçamento ajustado para R$ {payload.new_budget:.2f}/dia com sucesso"
 
-    except Exception as e:
-        error_msg = str(e)
-        approval.status = ApprovalStatus.FAILED
-        approval.execution_result = f"ERRO: {error_msg}"
-        db.commit()
-        return {"success": False, "error": error_msg}
+    meta.adjust_adset_bid(adset_id=payload.adset_id, new_bid=payload.new_bid)
+    return f"Lance ajustado para R$ {payload.new_bid:.2f} com sucesso"
@@ -2,8 +2,10 @@
 Geração de relatórios em PDF usando reportlab.
 """
 import io
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from datetime import datetime
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Iterator, Tuple
 
 from reportlab.lib import colors
 from reportlab.lib.pagesizes import A4, landscape
@@ -15,6 +17,8 @@ from reportlab.platypus import (
 )
 from reportlab.lib.enums import TA_CENTER, TA_LEFT, TA_RIGHT
 
+from app.core.config import settings
+
 # Paleta de cores
 PRIMARY = colors.HexColor("#1877F2")   # Azul Meta
 SECONDARY = colors.HexColor("#0A2540")
@@ -23,6 +27,100 @@ DANGER = colors.HexColor("#E53935")
 LIGHT_GRAY = colors.HexColor("#F5F7FA")
 BORDER = colors.HexColor("#E1E8ED")
 
+# Linhas de campanha por tabela — cabe em uma página A4 paisagem, de modo que
+# o reportlab nunca precisa dividir uma tabela gigante (custo quadrático).
+TABLE_CHUNK_ROWS = 25
+
+# Estilos — construídos uma única vez na importação do módulo
+_STYLES = getSampleStyleSheet()
+NORMAL_STYLE = _STYLES["Normal"]
+TITLE_STYLE = ParagraphStyle(
+    "CustomTitle",
+    parent=_STYLES["Heading1"],
+    fontSize=20,
+    textColor=SECONDARY,
+    spaceAfter=4,
+    fontName="Helvetica-Bold",
+)
+SUBTITLE_STYLE = ParagraphStyle(
+    "CustomSubtitle",
+    parent=NORMAL_STYLE,
+    fontSize=11,
+    textColor=colors.HexColor("#6B7280"),
+    spaceAfter=20,
+)
+LABEL_STYLE = ParagraphStyle(
+    "Label",
+    parent=NORMAL_STYLE,
+    fontSize=8,
+    textColor=colors.HexColor("#9CA3AF"),
+    fontName="Helvetica",
+)
+METRIC_STYLE = ParagraphStyle(
+    "Metric",
+    parent=NORMAL_STYLE,
+    fontSize=16,
+    textColor=SECONDARY,
+    fontName="Helvetica-Bold",
+)
+SECTION_STYLE = ParagraphStyle(
+    "Section",
+    parent=_STYLES["Heading2"],
+    fontSize=13,
+    textColor=SECONDARY,
+    spaceBefore=16,
+    spaceAfter=8,
+    fontName="Helvetica-Bold",
+)
+FOOTER_STYLE = ParagraphStyle(
+    "Footer", parent=NORMAL_STYLE,
+    fontSize=7, textColor=colors.HexColor("#9CA3AF"), alignment=TA_CENTER
+)
+
+SUMMARY_TABLE_STYLE = TableStyle([
+    ("BACKGROUND", (0, 0), (-1, -1), LIGHT_GRAY),
+    ("BOX", (0, 0), (-1, -1), 1, BORDER),
+    ("INNERGRID", (0, 0), (-1, -1), 0.5, BORDER),
+    ("TOPPADDING", (0, 0), (-1, -1), 10),
+    ("BOTTOMPADDING", (0, 0), (-1, -1), 10),
+    ("LEFTPADDING", (0, 0), (-1, -1), 12),
+    ("RIGHTPADDING", (0, 0), (-1, -1), 12),
+    ("VALIGN", (0, 0), (-1, -1), "TOP"),
+])
+
+# Comandos comuns a todos os blocos da tabela de campanhas
+CAMPAIGN_TABLE_COMMANDS = [
+    # Cabeçalho
+    ("BACKGROUND", (0, 0), (-1, 0), PRIMARY),
+    ("TEXTCOLOR", (0, 0), (-1, 0), colors.white),
+    ("FONTNAME", (0, 0), (-1, 0), "Helvetica-Bold"),
+    ("FONTSIZE", (0, 0), (-1, 0), 8),
+    ("ALIGN", (0, 0), (-1, 0), "CENTER"),
+    ("TOPPADDING", (0, 0), (-1, 0), 8),
+    ("BOTTOMPADDING", (0, 0), (-1, 0), 8),
+    # Linhas de dados
+    ("FONTSIZE", (0, 1), (-1, -1), 7.5),
+    ("ALIGN", (2, 1), (-1, -1), "RIGHT"),
+    ("ALIGN", (0, 1), (1, -1), "LEFT"),
+    ("TOPPADDING", (0, 1), (-1, -1), 6),
+    ("BOTTOMPADDING", (0, 1), (-1, -1), 6),
+    ("LEFTPADDING", (0, 0), (-1, -1), 6),
+    ("RIGHTPADDING", (0, 0), (-1, -1), 6),
+    # Zebra
+    ("ROWBACKGROUNDS", (0, 1), (-1, -1), [colors.white, LIGHT_GRAY]),
+    # Bordas
+    ("BOX", (0, 0), (-1, -1), 1, BORDER),
+    ("INNERGRID", (0, 0), (-1, -1), 0.3, BORDER),
+    ("VALIGN", (0, 0), (-1, -1), "MIDDLE"),
+]
+
+CAMPAIGN_HEADERS = [
+    "Campanha", "Status", "Impressões", "Cliques",
+    "Investimento", "CPM", "CPC", "CTR", "Conversões", "ROAS"
+]
+CAMPAIGN_COL_WIDTHS = [6 * cm, 2.2 * cm, 2.5 * cm, 2 * cm, 2.8 * cm, 2.2 * cm, 2.2 * cm, 1.8 * cm, 2.5 * cm, 2 * cm]
+ROAS_COL = 9
+
 
 def generate_campaign_report(
     campaigns: List[Dict],
@@ -45,99 +143,102 @@ def generate_campaign_report(
         title=f"Relatório de Campanhas — {period}",
     )
 
-    styles = getSampleStyleSheet()
-
-    # Estilos customizados
-    title_style = ParagraphStyle(
-        "CustomTitle",
-        parent=styles["Heading1"],
-        fontSize=20,
-        textColor=SECONDARY,
-        spaceAfter=4,
-        fontName="Helvetica-Bold",
-    )
-    subtitle_style = ParagraphStyle(
-        "CustomSubtitle",
-        parent=styles["Normal"],
-        fontSize=11,
-        textColor=colors.HexColor("#6B7280"),
-        spaceAfter=20,
-    )
-    label_style = ParagraphStyle(
-        "Label",
-        parent=styles["Normal"],
-        fontSize=8,
-        textColor=colors.HexColor("#9CA3AF"),
-        fontName="Helvetica",
-    )
-    metric_style = ParagraphStyle(
-        "Metric",
-        parent=styles["Normal"],
-        fontSize=16,
-        textColor=SECONDARY,
-        fontName="Helvetica-Bold",
-    )
-    section_style = ParagraphStyle(
-        "Section",
-        parent=styles["Heading2"],
-        fontSize=13,
-        textColor=SECONDARY,
-        spaceBefore=16,
-        spaceAfter=8,
-        fontName="Helvetica-Bold",
-    )
-
     story = []
 
     # === CABEÇALHO ===
-    story.append(Paragraph("Gestor de Tráfego Pago", title_style))
-    story.append(Paragraph(f"Relatório de Campanhas — {period} | {account_name}", subtitle_style))
-    story.append(Paragraph(f"Gerado em {datetime.now().strftime('%d/%m/%Y às %H:%M')}", label_style))
+    story.append(Paragraph("Gestor de Tráfego Pago", TITLE_STYLE))
+    story.append(Paragraph(f"Relatório de Campanhas — {period} | {account_name}", SUBTITLE_STYLE))
+    story.append(Paragraph(f"Gerado em {datetime.now().strftime('%d/%m/%Y às %H:%M')}", LABEL_STYLE))
     story.append(HRFlowable(width="100%", thickness=2, color=PRIMARY, spaceAfter=16))
 
     # === CARDS DE RESUMO ===
     if summary:
-        story.append(Paragraph("Resumo do Período", section_style))
+        story.append(Paragraph("Resumo do Período", SECTION_STYLE))
         summary_data = [
             [
-                _metric_cell("💰 Investimento Total", f"R$ {summary.get('total_spend', 0):,.2f}", label_style, metric_style),
-                _metric_cell("👁️ Impressões", f"{summary.get('total_impressions', 0):,}", label_style, metric_style),
-                _metric_cell("🖱️ Cliques", f"{summary.get('total_clicks', 0):,}", label_style, metric_style),
-                _metric_cell("🎯 Conversões", f"{summary.get('total_conversions', 0):,}", label_style, metric_style),
-                _metric_cell("📈 ROAS Médio", f"{summary.get('average_roas', 0):.2f}x", label_style, metric_style),
-                _metric_cell("💡 CPC Médio", f"R$ {summary.get('average_cpc', 0):.2f}", label_style, metric_style),
+                _metric_cell("💰 Investimento Total", f"R$ {summary.get('total_spend', 0):,.2f}", LABEL_STYLE, METRIC_STYLE),
+                _metric_cell("👁️ Impressões", f"{summary.get('total_impressions', 0):,}", LABEL_STYLE, METRIC_STYLE),
+                _metric_cell("🖱️ Cliques", f"{summary.get('total_clicks', 0):,}", LABEL_STYLE, METRIC_STYLE),
+                _metric_cell("🎯 Conversões", f"{summary.get('total_conversions', 0):,}", LABEL_STYLE, METRIC_STYLE),
+                _metric_cell("📈 ROAS Médio", f"{summary.get('average_roas', 0):.2f}x", LABEL_STYLE, METRIC_STYLE),
+                _metric_cell("💡 CPC Médio", f"R$ {summary.get('average_cpc', 0):.2f}", LABEL_STYLE, METRIC_STYLE),
             ]
         ]
         summary_table = Table(
             summary_data,
             colWidths=[4.5 * cm] * 6,
         )
-        summary_table.setStyle(TableStyle([
-            ("BACKGROUND", (0, 0), (-1, -1), LIGHT_GRAY),
-            ("BOX", (0, 0), (-1, -1), 1, BORDER),
-            ("INNERGRID", (0, 0), (-1, -1), 0.5, BORDER),
-            ("TOPPADDING", (0, 0), (-1, -1), 10),
-            ("BOTTOMPADDING", (0, 0), (-1, -1), 10),
-            ("LEFTPADDING", (0, 0), (-1, -1), 12),
-            ("RIGHTPADDING", (0, 0), (-1, -1), 12),
-            ("VALIGN", (0, 0), (-1, -1), "TOP"),
-        ]))
+        summary_table.setStyle(SUMMARY_TABLE_STYLE)
         story.append(summary_table)
         story.append(Spacer(1, 16))
 
     # === TABELA DE CAMPANHAS ===
-    story.append(Paragraph("Detalhamento por Campanha", section_style))
+    story.append(Paragraph("Detalhamento por Campanha", SECTION_STYLE))
 
     if not campaigns:
-        story.append(Paragraph("Nenhuma campanha encontrada no período.", styles["Normal"]))
+        story.append(Paragraph("Nenhuma campanha encontrada no período.", NORMAL_STYLE))
     else:
-        headers = [
-            "Campanha", "Status", "Impressões", "Cliques",
-            "Investimento", "CPM", "CPC", "CTR", "Conversões", "ROAS"
-        ]
+        story.extend(_campaign_tables(campaigns))
+
+    # === RODAPÉ ===
+    story.append(Spacer(1, 24))
+    story.append(HRFlowable(width="100%", thickness=1, color=BORDER))
+    story.append(Spacer(1, 6))
+    story.append(Paragraph(
+        "Relatório gerado automaticamente pela Plataforma Gestor de Tráfego Pago | "
+        f"Data: {datetime.now().strftime('%d/%m/%Y %H:%M')}",
+        FOOTER_STYLE,
+    ))
+
+    doc.build(story)
+    buffer.seek(0)
+    return buffer.read()
+
+
+_render_pool = None
+
+
+def _get_render_pool() -> ProcessPoolExecutor:
+    """Pool de processos compartilhado — o reportlab é CPU-bound e segura a GIL."""
+    global _render_pool
+    if _render_pool is None:
+        _render_pool = ProcessPoolExecutor(
+            max_workers=settings.PDF_RENDER_WORKERS,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _render_pool
+
+
+def generate_campaign_reports(reports: Dict[str, Dict]) -> Iterator[Tuple[str, bytes]]:
+    """
+    Renderiza vários relatórios em paralelo.
+    `reports` mapeia uma chave (ex: account_id) para os kwargs de
+    generate_campaign_report. Gera (chave, bytes) à medida que cada PDF fica pronto.
+    """
+    if len(reports) <= 1:
+        for key, kwargs in reports.items():
+            yield key, generate_campaign_report(**kwargs)
+        return
+
+    pool = _get_render_pool()
+    futures = {pool.submit(generate_campaign_report, **kwargs): key for key, kwargs in reports.items()}
+    for future in as_completed(futures):
+        yield futures[future], future.result()
+
+
+def _campaign_tables(campaigns: List[Dict]) -> List[Table]:
+    """
+    Monta a tabela de campanhas em blocos de TABLE_CHUNK_ROWS linhas.
+    Cada bloco repete o cabeçalho e recebe um único TableStyle com todos os
+    comandos (incluindo o destaque de ROAS), mantendo o custo de layout linear.
+    """
+    tables = []
+    for start in range(0, len(campaigns), TABLE_CHUNK_ROWS):
+        chunk = campaigns[start:start + TABLE_CHUNK_ROWS]
+        table_data = [CAMPAIGN_HEADERS]
+        commands = list(CAMPAIGN_TABLE_COMMANDS)
 
-        table_data = [headers]
-        for c in campaigns:
+        for row_idx, c in enumerate(chunk, start=1):
             status_text = "✅ Ativa" if c.get("status") == "ACTIVE" else "⏸️ Pausada"
             table_data.append([
                 _truncate(c.get("campaign_name", ""), 30),
@@ -152,65 +253,20 @@ def generate_campaign_report(
                 f"{c.get('roas', 0):.2f}x",
             ])
 
-        col_widths = [6 * cm, 2.2 * cm, 2.5 * cm, 2 * cm, 2.8 * cm, 2.2 * cm, 2.2 * cm, 1.8 * cm, 2.5 * cm, 2 * cm]
-        camp_table = Table(table_data, colWidths=col_widths, repeatRows=1)
-        camp_table.setStyle(TableStyle([
-            # Cabeçalho
-            ("BACKGROUND", (0, 0), (-1, 0), PRIMARY),
-            ("TEXTCOLOR", (0, 0), (-1, 0), colors.white),
-            ("FONTNAME", (0, 0), (-1, 0), "Helvetica-Bold"),
-            ("FONTSIZE", (0, 0), (-1, 0), 8),
-            ("ALIGN", (0, 0), (-1, 0), "CENTER"),
-            ("TOPPADDING", (0, 0), (-1, 0), 8),
-            ("BOTTOMPADDING", (0, 0), (-1, 0), 8),
-            # Linhas de dados
-            ("FONTSIZE", (0, 1), (-1, -1), 7.5),
-            ("ALIGN", (2, 1), (-1, -1), "RIGHT"),
-            ("ALIGN", (0, 1), (1, -1), "LEFT"),
-            ("TOPPADDING", (0, 1), (-1, -1), 6),
-            ("BOTTOMPADDING", (0, 1), (-1, -1), 6),
-            ("LEFTPADDING", (0, 0), (-1, -1), 6),
-            ("RIGHTPADDING", (0, 0), (-1, -1), 6),
-            # Zebra
-            ("ROWBACKGROUNDS", (0, 1), (-1, -1), [colors.white, LIGHT_GRAY]),
-            # Bordas
-            ("BOX", (0, 0), (-1, -1), 1, BORDER),
-            ("INNERGRID", (0, 0), (-1, -1), 0.3, BORDER),
-            ("VALIGN", (0, 0), (-1, -1), "MIDDLE"),
-        ]))
-
-        # Colorir ROAS alto em verde
-        for row_idx, c in enumerate(campaigns, start=1):
+            # Colorir ROAS alto em verde e baixo em vermelho
             roas = c.get("roas", 0)
+            cell = (ROAS_COL, row_idx)
             if roas >= 2.0:
-                camp_table.setStyle(TableStyle([
-                    ("TEXTCOLOR", (9, row_idx), (9, row_idx), SUCCESS),
-                    ("FONTNAME", (9, row_idx), (9, row_idx), "Helvetica-Bold"),
-                ]))
+                commands.append(("TEXTCOLOR", cell, cell, SUCCESS))
+                commands.append(("FONTNAME", cell, cell, "Helvetica-Bold"))
             elif roas > 0 and roas < 1.0:
-                camp_table.setStyle(TableStyle([
-                    ("TEXTCOLOR", (9, row_idx), (9, row_idx), DANGER),
-                ]))
+                commands.append(("TEXTCOLOR", cell, cell, DANGER))
 
-        story.append(camp_table)
+        table = Table(table_data, colWidths=CAMPAIGN_COL_WIDTHS, repeatRows=1)
+        table.setStyle(TableStyle(commands))
+        tables.append(table)
 
-    # === RODAPÉ ===
-    story.append(Spacer(1, 24))
-    story.append(HRFlowable(width="100%", thickness=1, color=BORDER))
-    story.append(Spacer(1, 6))
-    footer_style = ParagraphStyle(
-        "Footer", parent=styles["Normal"],
-        fontSize=7, textColor=colors.HexColor("#9CA3AF"), alignment=TA_CENTER
-    )
-    story.append(Paragraph(
-        "Relatório gerado automaticamente pela Plataforma Gestor de Tráfego Pago | "
-        f"Data: {datetime.now().strftime('%d/%m/%Y %H:%M')}",
-        footer_style,
-    ))
-
-    doc.build(story)
-    buffer.seek(0)
-    return buffer.read()
+    return tables
 
 
 def _metric_cell(label: str, value: str, label_style, value_style):
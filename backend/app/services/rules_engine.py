@@ -0,0 +1,118 @@
+"""
+Pré-triagem das campanhas por regras determinísticas, antes da IA.
+As regras são as mesmas descritas nas ferramentas do Claude (ROAS < 0.5,
+CPC > 3x o benchmark, gasto alto sem conversões, ROAS > 2 para aumentar o
+orçamento) e são avaliadas de forma vetorizada com pandas. Os casos claros
+viram sugestões prontas; só as campanhas com alerta ou limítrofes seguem
+para o modelo.
+"""
+from typing import Dict, List
+
+import pandas as pd
+
+LOW_ROAS = 0.5
+HIGH_ROAS = 2.0
+HIGH_CPC_MULTIPLIER = 3.0
+BUDGET_INCREASE = 0.2  # +20% no orçamento diário das campanhas com ROAS alto
+
+# Faixas limítrofes: próximas dos limites, decididas pela IA
+BORDERLINE_ROAS = 0.8
+BORDERLINE_CPC_MULTIPLIER = 2.0
+HIGH_FREQUENCY = 4.0
+
+_NUMERIC = ["spend", "cpc", "roas", "conversions", "frequency", "daily_budget"]
+
+
+def screen_campaigns(campaigns: List[Dict]) -> Dict:
+    """
+    Aplica as regras às campanhas. Retorna:
+    - candidates: sugestões prontas no formato {tool_name, tool_input}
+    - review: campanhas com alerta ou limítrofes (para a IA)
+    - healthy_count / healthy_spend: campanhas sem alerta, omitidas da IA
+    """
+    if not campaigns:
+        return {"candidates": [], "review": [], "healthy_count": 0, "healthy_spend": 0.0}
+
+    df = pd.DataFrame(campaigns)
+    for col in _NUMERIC:
+        df[col] = pd.to_numeric(df[col], errors="coerce").fillna(0.0) if col in df else 0.0
+    status = df["status"] if "status" in df else pd.Series("ACTIVE", index=df.index)
+
+    median_cpc = df.loc[df["cpc"] > 0, "cpc"].median()
+    median_spend = df.loc[df["spend"] > 0, "spend"].median()
+    median_cpc = 0.0 if pd.isna(median_cpc) else median_cpc
+    median_spend = 0.0 if pd.isna(median_spend) else median_spend
+
+    active = status == "ACTIVE"
+    low_roas = active & (df["spend"] > 0) & (df["roas"] > 0) & (df["roas"] < LOW_ROAS)
+    high_cpc = active & (median_cpc > 0) & (df["cpc"] > HIGH_CPC_MULTIPLIER * median_cpc)
+    spend_no_conv = active & (df["spend"] > 0) & (df["spend"] >= median_spend) & (df["conversions"] == 0)
+    pause = low_roas | high_cpc | spend_no_conv
+    scale = active & ~pause & (df["roas"] > HIGH_ROAS) & (df["daily_budget"] > 0)
+
+    borderline = (
+        (active & (df["roas"] >= LOW_ROAS) & (df["roas"] < BORDERLINE_ROAS))
+        | (active & (median_cpc > 0) & (df["cpc"] > BORDERLINE_CPC_MULTIPLIER * median_cpc))
+        | (active & (df["roas"] > HIGH_ROAS) & (df["daily_budget"] == 0))
+        | (active & (df["frequency"] > HIGH_FREQUENCY))
+        | (~active & (df["roas"] > HIGH_ROAS))
+    )
+    review = pause | scale | borderline
+
+    candidates = []
+    for i in df.index[pause | scale]:
+        c = campaigns[i]
+        row = df.loc[i]
+        base = {
+            "campaign_id": c.get("campaign_id"),
+            "campaign_name": c.get("campaign_name", ""),
+            "account_id": c.get("account_id"),
+        }
+        if pause[i]:
+            reasons = []
+            if low_roas[i]:
+                reasons.append(f"ROAS {row['roas']:.2f} abaixo de {LOW_ROAS}")
+            if high_cpc[i]:
+                reasons.append(f"CPC R$ {row['cpc']:.2f} acima de {HIGH_CPC_MULTIPLIER:g}x a mediana (R$ {median_cpc:.2f})")
+            if spend_no_conv[i]:
+                reasons.append(f"gasto de R$ {row['spend']:.2f} sem conversões")
+            candidates.append({
+                "tool_name": "pause_campaign",
+                "tool_input": {**base, "reason": "Regra automática: " + "; ".join(reasons) + "."},
+            })
+        else:
+            current = float(row["daily_budget"])
+            new_budget = round(current * (1 + BUDGET_INCREASE), 2)
+            candidates.append({
+                "tool_name": "adjust_budget",
+                "tool_input": {
+                    **base,
+                    "current_budget": current,
+                    "new_budget": new_budget,
+                    "reason": (
+                        f"Regra automática: ROAS {row['roas']:.2f} acima de {HIGH_ROAS:g}; "
+                        f"orçamento diário de R$ {current:.2f} para R$ {new_budget:.2f} (+{BUDGET_INCREASE:.0%})."
+                    ),
+                },
+            })
+
+    return {
+        "candidates": candidates,
+        "review": [campaigns[i] for i in df.index[review]],
+        "healthy_count": int((~review).sum()),
+        "healthy_spend": float(df.loc[~review, "spend"].sum()),
+    }
+
+
+def describe_screen(screen: Dict) -> str:
+    """Resumo em texto da pré-triagem (para a IA e para o modo só regras)."""
+    lines = [
+        f"Regras automáticas: {len(screen['candidates'])} sugestões (pendentes de aprovação), "
+        f"{len(screen['review'])} campanhas com alerta ou limítrofes, "
+        f"{screen['healthy_count']} campanhas sem alertas (gasto R$ {screen['healthy_spend']:.2f})."
+    ]
+    for candidate in screen["candidates"]:
+        tool_input = candidate["tool_input"]
+        action = "Pausar" if candidate["tool_name"] == "pause_campaign" else "Ajustar orçamento de"
+        lines.append(f"- {action} '{tool_input['campaign_name']}' ({tool_input['campaign_id']}): {tool_input['reason']}")
+    return "\n".join(lines)
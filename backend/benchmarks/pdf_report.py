@@ -0,0 +1,79 @@
+"""
+Benchmark de geração de PDF — tempo de renderização e pico de memória.
+
+Uso (a partir de backend/):
+    python -m benchmarks.pdf_report
+    python -m benchmarks.pdf_report --rows 100 1000 10000
+"""
+import argparse
+import random
+import time
+import tracemalloc
+
+from app.services.pdf_service import generate_campaign_report
+
+
+def _fake_campaigns(n: int) -> list:
+    rng = random.Random(42)
+    campaigns = []
+    for i in range(n):
+        impressions = rng.randint(0, 500_000)
+        clicks = rng.randint(0, max(impressions // 50, 1))
+        spend = round(rng.uniform(0, 5_000), 2)
+        campaigns.append({
+            "campaign_id": str(1000 + i),
+            "campaign_name": f"Campanha de teste {i} — conversão",
+            "status": rng.choice(["ACTIVE", "PAUSED"]),
+            "impressions": impressions,
+            "clicks": clicks,
+            "spend": spend,
+            "cpm": spend / impressions * 1000 if impressions else 0.0,
+            "cpc": spend / clicks if clicks else 0.0,
+            "ctr": clicks / impressions * 100 if impressions else 0.0,
+            "conversions": rng.randint(0, 200),
+            "roas": round(rng.uniform(0, 4), 2),
+        })
+    return campaigns
+
+
+def _summary(campaigns: list) -> dict:
+    return {
+        "total_spend": sum(c["spend"] for c in campaigns),
+        "total_impressions": sum(c["impressions"] for c in campaigns),
+        "total_clicks": sum(c["clicks"] for c in campaigns),
+        "total_conversions": sum(c["conversions"] for c in campaigns),
+        "average_roas": 1.5,
+        "average_cpc": 0.8,
+    }
+
+
+def run(rows: int) -> dict:
+    campaigns = _fake_campaigns(rows)
+    summary = _summary(campaigns)
+
+    # Tempo medido sem tracemalloc (que deixa a execução várias vezes mais lenta)
+    started = time.perf_counter()
+    pdf_bytes = generate_campaign_report(campaigns=campaigns, period="Benchmark", summary=summary)
+    elapsed = time.perf_counter() - started
+
+    tracemalloc.start()
+    generate_campaign_report(campaigns=campaigns, period="Benchmark", summary=summary)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {"rows": rows, "seconds": elapsed, "peak_mb": peak / 1024 / 1024, "pdf_kb": len(pdf_bytes) / 1024}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark do pdf_service")
+    parser.add_argument("--rows", type=int, nargs="+", default=[100, 1_000, 10_000])
+    args = parser.parse_args()
+
+    print(f"{'linhas':>8} {'tempo (s)':>10} {'pico (MB)':>10} {'PDF (KB)':>10}")
+    for rows in args.rows:
+        r = run(rows)
+        print(f"{r['rows']:>8} {r['seconds']:>10.2f} {r['peak_mb']:>10.1f} {r['pdf_kb']:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,18 +1,20 @@
+import asyncio
 import logging
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
+from app.core.api_keys import run_usage_flusher
+from app.core.compression import CompressionMiddleware
+from app.services.analysis_jobs import fail_orphaned_jobs
+from app.services.insights_cache import run_cache_cleanup
 from app.core.config import settings
-from app.models.database import create_tables
-from app.models import user, approval, insight_cache  # noqa: importa modelos para criar tabelas
+from app.models import user, approval, insight_cache, report_snapshot, conversation, analysis_result, analysis_job, ai_run_metric, campaign_metric  # noqa: registra os modelos (schema via Alembic)
 from app.api import auth, campaigns, ai, approvals, reports
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Cria tabelas no banco ao iniciar (idempotente)
-create_tables()
-
 # Log de diagnóstico de configuração (sem dados sensíveis)
 logger.info("=== CONFIGURAÇÃO DO BACKEND ===")
 logger.info(f"ENVIRONMENT: {settings.ENVIRONMENT}")
@@ -23,7 +25,26 @@ logger.info(f"FRONTEND_URL: {settings.FRONTEND_URL}")
 logger.info(f"CORS_ORIGINS: {settings.CORS_ORIGINS}")
 logger.info("================================")
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Jobs de análise que ficaram queued/running após um reinício (ver app.services.analysis_jobs)
+    await asyncio.to_thread(fail_orphaned_jobs)
+    # Grava em lote o last_used_at das API Keys (ver app.core.api_keys)
+    flusher = asyncio.create_task(run_usage_flusher())
+    # Apaga em lotes as entradas expiradas do cache de insights (ver app.services.insights_cache)
+    cache_cleanup = asyncio.create_task(run_cache_cleanup())
+    yield
+    for task in (cache_cleanup, flusher):
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+
+
 app = FastAPI(
+    lifespan=lifespan,
     title="Gestor de Tráfego Pago API",
     description="""
 ## Plataforma de Gestão de Tráfego Pago com IA
@@ -36,18 +57,28 @@ app = FastAPI(
 - `GET /api/reports/n8n/campaigns` — Dados JSON de campanhas
 - `GET /api/reports/n8n/summary` — Resumo de métricas
 - `GET /api/reports/n8n/pdf` — PDF do relatório pronto para enviar
+- `GET /api/reports/n8n/pdf/bundle` — Um PDF por conta (ZIP ou manifest com URLs)
     """,
     version="1.0.0",
     docs_url="/docs",
     redoc_url="/redoc",
 )
 
+# Compressão brotli (com fallback gzip). SSE e arquivos já comprimidos (PDF/ZIP, XLSX do /export) ficam de fora.
+app.add_middleware(
+    CompressionMiddleware,
+    minimum_size=settings.COMPRESSION_MIN_SIZE,
+    gzip_fallback=True,
+    excluded_handlers=[r"^/api/ai/", r"/pdf"],
+)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=settings.CORS_ORIGINS,
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
 app.include_router(auth.router, prefix="/api/auth", tags=["🔐 Autenticação"])
@@ -0,0 +1,62 @@
+"""
+Ambiente do Alembic: usa a DATABASE_URL da aplicação e os metadados dos modelos.
+"""
+from logging.config import fileConfig
+
+from alembic import context
+from sqlalchemy import engine_from_config, pool
+
+from app.core.config import settings
+from app.models.database import Base
+from app.models import (  # noqa: registra os modelos nos metadados
+    user, approval, insight_cache, report_snapshot, conversation,
+    analysis_result, analysis_job, ai_run_metric, campaign_metric,
+)
+
+config = context.config
+config.set_main_option("sqlalchemy.url", settings.DATABASE_URL.replace("%", "%%"))
+
+if config.config_file_name is not None:
+    fileConfig(config.config_file_name)
+
+target_metadata = Base.metadata
+
+
+def include_name(name, type_, parent_names) -> bool:
+    """
+    Ignora no autogenerate/check as partições mensais de campaign_daily_metrics:
+    são criadas pelo ingest (metrics_store.ensure_partitions), não pelas migrations.
+    """
+    if type_ == "table":
+        return not (name or "").startswith("campaign_daily_metrics_")
+    return True
+
+
+def run_migrations_offline() -> None:
+    """Gera o SQL sem conectar ao banco (alembic upgrade head --sql)."""
+    context.configure(
+        url=config.get_main_option("sqlalchemy.url"),
+        target_metadata=target_metadata,
+        literal_binds=True,
+        dialect_opts={"paramstyle": "named"},
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_online() -> None:
+    connectable = engine_from_config(
+        config.get_section(config.config_ini_section, {}),
+        prefix="sqlalchemy.",
+        poolclass=pool.NullPool,
+    )
+    with connectable.connect() as connection:
+        context.configure(connection=connection, target_metadata=target_metadata, include_name=include_name)
+        with context.begin_transaction():
+            context.run_migrations()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
@@ -0,0 +1,119 @@
+"""Schema inicial — as tabelas como eram criadas por create_all no startup,
+antes do Alembic (users, business_managers, api_keys, approvals, insight_cache).
+
+Bancos já existentes, criados pelo create_all, são adotados como estão: se a
+tabela users já existe, a revisão não cria nada (equivale a `alembic stamp 0001`).
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-19 02:34:15.050630
+"""
+from alembic import context, op
+import sqlalchemy as sa
+
+
+revision = '0001'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Banco criado pelo create_all anterior ao Alembic: o schema inicial já existe
+    if not context.is_offline_mode() and sa.inspect(op.get_bind()).has_table('users'):
+        return
+    op.create_table('insight_cache',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('account_id', sa.String(length=100), nullable=True),
+    sa.Column('campaign_id', sa.String(length=100), nullable=True),
+    sa.Column('adset_id', sa.String(length=100), nullable=True),
+    sa.Column('date_start', sa.String(length=20), nullable=True),
+    sa.Column('date_stop', sa.String(length=20), nullable=True),
+    sa.Column('data', sa.Text(), nullable=True),
+    sa.Column('cached_at', sa.DateTime(), nullable=True),
+    sa.Column('expires_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_insight_cache_account_id'), 'insight_cache', ['account_id'], unique=False)
+    op.create_index(op.f('ix_insight_cache_adset_id'), 'insight_cache', ['adset_id'], unique=False)
+    op.create_index(op.f('ix_insight_cache_campaign_id'), 'insight_cache', ['campaign_id'], unique=False)
+    op.create_index(op.f('ix_insight_cache_id'), 'insight_cache', ['id'], unique=False)
+    op.create_table('users',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('meta_user_id', sa.String(length=100), nullable=True),
+    sa.Column('name', sa.String(length=200), nullable=True),
+    sa.Column('email', sa.String(length=200), nullable=True),
+    sa.Column('meta_access_token', sa.Text(), nullable=True),
+    sa.Column('meta_token_expires_at', sa.DateTime(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_users_id'), 'users', ['id'], unique=False)
+    op.create_index(op.f('ix_users_meta_user_id'), 'users', ['meta_user_id'], unique=True)
+    op.create_table('business_managers',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('bm_id', sa.String(length=100), nullable=True),
+    sa.Column('name', sa.String(length=200), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_business_managers_bm_id'), 'business_managers', ['bm_id'], unique=False)
+    op.create_index(op.f('ix_business_managers_id'), 'business_managers', ['id'], unique=False)
+    op.create_table('api_keys',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(length=100), nullable=True),
+    sa.Column('key', sa.String(length=64), nullable=True),
+    sa.Column('is_active', sa.Boolean(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('last_used_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_api_keys_id'), 'api_keys', ['id'], unique=False)
+    op.create_index(op.f('ix_api_keys_key'), 'api_keys', ['key'], unique=True)
+    op.create_table('approvals',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('action_type', sa.String(length=50), nullable=False),
+    sa.Column('payload', sa.Text(), nullable=False),
+    sa.Column('account_id', sa.String(length=100), nullable=True),
+    sa.Column('campaign_id', sa.String(length=100), nullable=True),
+    sa.Column('campaign_name', sa.String(length=200), nullable=True),
+    sa.Column('adset_id', sa.String(length=100), nullable=True),
+    sa.Column('ai_reasoning', sa.Text(), nullable=False),
+    sa.Column('status', sa.String(length=20), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('decided_at', sa.DateTime(), nullable=True),
+    sa.Column('executed_at', sa.DateTime(), nullable=True),
+    sa.Column('execution_result', sa.Text(), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_approvals_created_at'), 'approvals', ['created_at'], unique=False)
+    op.create_index(op.f('ix_approvals_id'), 'approvals', ['id'], unique=False)
+    op.create_index(op.f('ix_approvals_status'), 'approvals', ['status'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_approvals_status'), table_name='approvals')
+    op.drop_index(op.f('ix_approvals_id'), table_name='approvals')
+    op.drop_index(op.f('ix_approvals_created_at'), table_name='approvals')
+    op.drop_table('approvals')
+    op.drop_index(op.f('ix_api_keys_key'), table_name='api_keys')
+    op.drop_index(op.f('ix_api_keys_id'), table_name='api_keys')
+    op.drop_table('api_keys')
+    op.drop_index(op.f('ix_business_managers_id'), table_name='business_managers')
+    op.drop_index(op.f('ix_business_managers_bm_id'), table_name='business_managers')
+    op.drop_table('business_managers')
+    op.drop_index(op.f('ix_users_meta_user_id'), table_name='users')
+    op.drop_index(op.f('ix_users_id'), table_name='users')
+    op.drop_table('users')
+    op.drop_index(op.f('ix_insight_cache_id'), table_name='insight_cache')
+    op.drop_index(op.f('ix_insight_cache_campaign_id'), table_name='insight_cache')
+    op.drop_index(op.f('ix_insight_cache_adset_id'), table_name='insight_cache')
+    op.drop_index(op.f('ix_insight_cache_account_id'), table_name='insight_cache')
+    op.drop_table('insight_cache')
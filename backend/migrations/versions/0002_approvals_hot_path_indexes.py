@@ -0,0 +1,56 @@
+"""Índices compostos e parciais de approvals para as consultas mais frequentes.
+
+- list_approvals (com e sem status) e count_pending filtram por user_id + status
+  e ordenam por created_at;
+- a deduplicação das sugestões das regras busca as pendentes por campanha/ação;
+- a versão dos dados dos ETags busca o último executed_at do usuário.
+Os índices de coluna única em status e created_at ficam redundantes.
+
+Os índices são criados com CONCURRENTLY (sem bloquear escritas na tabela).
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-19 02:40:00.000000
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '0002'
+down_revision = '0001'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_approvals_user_status_created', 'approvals', ['user_id', 'status', 'created_at'],
+            postgresql_concurrently=True,
+        )
+        op.create_index(
+            'ix_approvals_user_created', 'approvals', ['user_id', 'created_at', 'id'],
+            postgresql_concurrently=True,
+        )
+        op.create_index(
+            'ix_approvals_pending', 'approvals', ['user_id', 'campaign_id', 'action_type'],
+            postgresql_where=sa.text("status = 'pending'"),
+            postgresql_concurrently=True,
+        )
+        op.create_index(
+            'ix_approvals_user_executed', 'approvals', ['user_id', 'executed_at'],
+            postgresql_where=sa.text("executed_at IS NOT NULL"),
+            postgresql_concurrently=True,
+        )
+        op.drop_index('ix_approvals_status', table_name='approvals', postgresql_concurrently=True)
+        op.drop_index('ix_approvals_created_at', table_name='approvals', postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index('ix_approvals_created_at', 'approvals', ['created_at'], postgresql_concurrently=True)
+        op.create_index('ix_approvals_status', 'approvals', ['status'], postgresql_concurrently=True)
+        op.drop_index('ix_approvals_user_executed', table_name='approvals', postgresql_concurrently=True)
+        op.drop_index('ix_approvals_pending', table_name='approvals', postgresql_concurrently=True)
+        op.drop_index('ix_approvals_user_created', table_name='approvals', postgresql_concurrently=True)
+        op.drop_index('ix_approvals_user_status_created', table_name='approvals', postgresql_concurrently=True)
@@ -0,0 +1,36 @@
+"""Índices para os filtros da listagem paginada de approvals.
+
+Cada filtro (conta, campanha, tipo de ação) tem um índice que termina na chave
+do keyset (created_at, id), então filtro + ordenação + cursor são resolvidos
+por uma única varredura de índice. O filtro por período usa
+ix_approvals_user_created.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-19 03:10:00.000000
+"""
+from alembic import op
+
+
+revision = '0003'
+down_revision = '0002'
+branch_labels = None
+depends_on = None
+
+INDEXES = {
+    'ix_approvals_user_account_created': ['user_id', 'account_id', 'created_at', 'id'],
+    'ix_approvals_user_campaign_created': ['user_id', 'campaign_id', 'created_at', 'id'],
+    'ix_approvals_user_action_created': ['user_id', 'action_type', 'created_at', 'id'],
+}
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, columns in INDEXES.items():
+            op.create_index(name, 'approvals', columns, postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name in INDEXES:
+            op.drop_index(name, table_name='approvals', postgresql_concurrently=True)
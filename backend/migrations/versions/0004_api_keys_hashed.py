@@ -0,0 +1,87 @@
+"""API keys guardadas como hash SHA-256.
+
+As chaves existentes são convertidas (hash + prefixo para o painel) e a coluna
+com o valor em texto puro é removida. O downgrade recria a coluna vazia — as
+chaves não podem ser recuperadas e precisam ser geradas de novo.
+
+No Postgres o hash é calculado no próprio UPDATE (sha256, Postgres 11+), o que
+também funciona no modo offline (--sql). Linhas sem chave (NULL ou vazia) não
+autenticavam nada: ficam inativas, com um marcador único no lugar do hash (não é
+hexadecimal, então nunca coincide com o hash de uma chave enviada).
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-19 03:40:00.000000
+"""
+import hashlib
+
+from alembic import context, op
+import sqlalchemy as sa
+
+
+revision = '0004'
+down_revision = '0003'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('api_keys', sa.Column('key_hash', sa.String(length=64), nullable=True))
+    op.add_column('api_keys', sa.Column('key_prefix', sa.String(length=12), nullable=True))
+
+    api_keys = sa.table(
+        'api_keys',
+        sa.column('id', sa.Integer),
+        sa.column('key', sa.String),
+        sa.column('key_hash', sa.String),
+        sa.column('key_prefix', sa.String),
+        sa.column('is_active', sa.Boolean),
+    )
+    has_key = sa.and_(api_keys.c.key.isnot(None), api_keys.c.key != '')
+
+    if op.get_bind().dialect.name == 'postgresql':
+        op.execute(
+            api_keys.update().where(has_key).values(
+                key_hash=sa.func.encode(sa.func.sha256(sa.func.convert_to(api_keys.c.key, 'UTF8')), 'hex'),
+                key_prefix=sa.func.left(api_keys.c.key, 8),
+            )
+        )
+    elif not context.is_offline_mode():
+        conn = op.get_bind()
+        rows = conn.execute(sa.select(api_keys.c.id, api_keys.c.key).where(has_key)).all()
+        if rows:
+            conn.execute(
+                api_keys.update().where(api_keys.c.id == sa.bindparam('row_id')),
+                [
+                    {
+                        'row_id': row.id,
+                        'key_hash': hashlib.sha256(row.key.encode()).hexdigest(),
+                        'key_prefix': row.key[:8],
+                    }
+                    for row in rows
+                ],
+            )
+
+    op.execute(
+        api_keys.update().where(sa.not_(has_key)).values(
+            key_hash=sa.literal('sem-chave-', sa.String) + sa.cast(api_keys.c.id, sa.String),
+            key_prefix='',
+            is_active=False,
+        )
+    )
+
+    with op.batch_alter_table('api_keys') as batch_op:
+        batch_op.drop_index('ix_api_keys_key')
+        batch_op.drop_column('key')
+        batch_op.alter_column('key_hash', existing_type=sa.String(length=64), nullable=False)
+        batch_op.alter_column('key_prefix', existing_type=sa.String(length=12), nullable=False)
+        batch_op.create_index('ix_api_keys_key_hash', ['key_hash'], unique=True)
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('api_keys') as batch_op:
+        batch_op.drop_index('ix_api_keys_key_hash')
+        batch_op.drop_column('key_prefix')
+        batch_op.drop_column('key_hash')
+        batch_op.add_column(sa.Column('key', sa.String(length=64), nullable=True))
+        batch_op.create_index('ix_api_keys_key', ['key'], unique=True)
@@ -0,0 +1,62 @@
+"""approvals.payload como JSONB, com índices para consultas dentro do payload.
+
+- ix_approvals_payload (GIN, jsonb_path_ops): filtros de contenção (payload @> ...);
+- ix_approvals_user_action_budget: faixa de valor do novo orçamento por tipo de ação
+  (mesma expressão de app.models.approval.NEW_BUDGET_SQL).
+
+Só no Postgres — em SQLite o tipo JSON já é texto e os índices não se aplicam.
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-19 04:10:00.000000
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+revision = '0005'
+down_revision = '0004'
+branch_labels = None
+depends_on = None
+
+NEW_BUDGET_SQL = "CAST(payload ->> 'new_budget' AS NUMERIC)"
+
+
+def upgrade() -> None:
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    op.alter_column(
+        'approvals', 'payload',
+        type_=postgresql.JSONB(),
+        existing_type=sa.Text(),
+        existing_nullable=False,
+        postgresql_using='payload::jsonb',
+    )
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_approvals_payload', 'approvals', ['payload'],
+            postgresql_using='gin',
+            postgresql_ops={'payload': 'jsonb_path_ops'},
+            postgresql_concurrently=True,
+        )
+        op.create_index(
+            'ix_approvals_user_action_budget', 'approvals',
+            ['user_id', 'action_type', sa.text(NEW_BUDGET_SQL)],
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_approvals_user_action_budget', table_name='approvals', postgresql_concurrently=True)
+        op.drop_index('ix_approvals_payload', table_name='approvals', postgresql_concurrently=True)
+    op.alter_column(
+        'approvals', 'payload',
+        type_=sa.Text(),
+        existing_type=postgresql.JSONB(),
+        existing_nullable=False,
+        postgresql_using='payload::text',
+    )
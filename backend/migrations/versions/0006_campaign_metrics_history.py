@@ -0,0 +1,71 @@
+"""Histórico de métricas: tabela diária particionada por mês e agregados semanais/mensais.
+
+campaign_daily_metrics é particionada por RANGE (date) no Postgres, com índice
+BRIN em date. As partições mensais são criadas pelo ingest
+(app.services.metrics_store.ensure_partitions) antes de gravar cada período.
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-19 02:43:53.672830
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '0006'
+down_revision = '0005'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('campaign_daily_metrics',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('level', sa.String(length=10), nullable=False),
+    sa.Column('account_id', sa.String(length=100), nullable=False),
+    sa.Column('campaign_id', sa.String(length=100), nullable=False),
+    sa.Column('adset_id', sa.String(length=100), nullable=False),
+    sa.Column('date', sa.Date(), nullable=False),
+    sa.Column('campaign_name', sa.String(length=200), nullable=True),
+    sa.Column('adset_name', sa.String(length=200), nullable=True),
+    sa.Column('impressions', sa.BigInteger(), nullable=False),
+    sa.Column('clicks', sa.BigInteger(), nullable=False),
+    sa.Column('spend', sa.Float(), nullable=False),
+    sa.Column('reach', sa.BigInteger(), nullable=False),
+    sa.Column('conversions', sa.Integer(), nullable=False),
+    sa.Column('purchase_value', sa.Float(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('user_id', 'level', 'account_id', 'campaign_id', 'adset_id', 'date', name='pk_campaign_daily_metrics'),
+    postgresql_partition_by='RANGE (date)'
+    )
+    op.create_index('ix_campaign_daily_metrics_date', 'campaign_daily_metrics', ['date'], unique=False, postgresql_using='brin')
+    op.create_table('campaign_metric_rollups',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('period', sa.String(length=5), nullable=False),
+    sa.Column('level', sa.String(length=10), nullable=False),
+    sa.Column('account_id', sa.String(length=100), nullable=False),
+    sa.Column('campaign_id', sa.String(length=100), nullable=False),
+    sa.Column('adset_id', sa.String(length=100), nullable=False),
+    sa.Column('period_start', sa.Date(), nullable=False),
+    sa.Column('campaign_name', sa.String(length=200), nullable=True),
+    sa.Column('adset_name', sa.String(length=200), nullable=True),
+    sa.Column('impressions', sa.BigInteger(), nullable=False),
+    sa.Column('clicks', sa.BigInteger(), nullable=False),
+    sa.Column('spend', sa.Float(), nullable=False),
+    sa.Column('conversions', sa.Integer(), nullable=False),
+    sa.Column('purchase_value', sa.Float(), nullable=False),
+    sa.Column('days', sa.Integer(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('user_id', 'period', 'level', 'account_id', 'campaign_id', 'adset_id', 'period_start', name='pk_campaign_metric_rollups')
+    )
+    op.create_index('ix_campaign_metric_rollups_trend', 'campaign_metric_rollups', ['user_id', 'period', 'level', 'period_start'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_campaign_metric_rollups_trend', table_name='campaign_metric_rollups')
+    op.drop_table('campaign_metric_rollups')
+    op.drop_index('ix_campaign_daily_metrics_date', table_name='campaign_daily_metrics', postgresql_using='brin')
+    # Remove também as partições mensais
+    op.drop_table('campaign_daily_metrics')
@@ -0,0 +1,76 @@
+"""insight_cache por usuário, com conteúdo comprimido e índices de manutenção.
+
+A tabela é só cache e é recriada vazia: chave (user_id, cache_key), payload
+comprimido (BYTEA, sem recompressão pelo TOAST), índice em expires_at para a
+limpeza em lotes e (user_id, last_accessed_at) para o descarte LRU.
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-19 04:31:12.208417
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '0007'
+down_revision = '0006'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    _drop_legacy_table()
+    op.create_table('insight_cache',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('cache_key', sa.String(length=64), nullable=False),
+    sa.Column('account_id', sa.String(length=100), nullable=False),
+    sa.Column('campaign_id', sa.String(length=100), nullable=True),
+    sa.Column('adset_id', sa.String(length=100), nullable=True),
+    sa.Column('date_preset', sa.String(length=20), nullable=False),
+    sa.Column('payload', sa.LargeBinary(), nullable=False),
+    sa.Column('raw_bytes', sa.Integer(), nullable=False),
+    sa.Column('cached_at', sa.DateTime(), nullable=False),
+    sa.Column('last_accessed_at', sa.DateTime(), nullable=False),
+    sa.Column('expires_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('user_id', 'cache_key', name='uq_insight_cache_user_key')
+    )
+    op.create_index(op.f('ix_insight_cache_id'), 'insight_cache', ['id'], unique=False)
+    op.create_index('ix_insight_cache_expires_at', 'insight_cache', ['expires_at'], unique=False)
+    op.create_index('ix_insight_cache_user_accessed', 'insight_cache', ['user_id', 'last_accessed_at'], unique=False)
+    if op.get_bind().dialect.name == 'postgresql':
+        # O payload já chega comprimido: o TOAST só o move para fora da linha
+        op.execute('ALTER TABLE insight_cache ALTER COLUMN payload SET STORAGE EXTERNAL')
+
+
+def downgrade() -> None:
+    op.drop_index('ix_insight_cache_user_accessed', table_name='insight_cache')
+    op.drop_index('ix_insight_cache_expires_at', table_name='insight_cache')
+    op.drop_index(op.f('ix_insight_cache_id'), table_name='insight_cache')
+    op.drop_table('insight_cache')
+    op.create_table('insight_cache',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('account_id', sa.String(length=100), nullable=True),
+    sa.Column('campaign_id', sa.String(length=100), nullable=True),
+    sa.Column('adset_id', sa.String(length=100), nullable=True),
+    sa.Column('date_start', sa.String(length=20), nullable=True),
+    sa.Column('date_stop', sa.String(length=20), nullable=True),
+    sa.Column('data', sa.Text(), nullable=True),
+    sa.Column('cached_at', sa.DateTime(), nullable=True),
+    sa.Column('expires_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_insight_cache_account_id'), 'insight_cache', ['account_id'], unique=False)
+    op.create_index(op.f('ix_insight_cache_adset_id'), 'insight_cache', ['adset_id'], unique=False)
+    op.create_index(op.f('ix_insight_cache_campaign_id'), 'insight_cache', ['campaign_id'], unique=False)
+    op.create_index(op.f('ix_insight_cache_id'), 'insight_cache', ['id'], unique=False)
+
+
+def _drop_legacy_table() -> None:
+    op.drop_index(op.f('ix_insight_cache_id'), table_name='insight_cache')
+    op.drop_index(op.f('ix_insight_cache_campaign_id'), table_name='insight_cache')
+    op.drop_index(op.f('ix_insight_cache_adset_id'), table_name='insight_cache')
+    op.drop_index(op.f('ix_insight_cache_account_id'), table_name='insight_cache')
+    op.drop_table('insight_cache')
@@ -0,0 +1,145 @@
+"""Tabelas da API que ficavam fora do schema inicial: snapshots de relatório,
+conversas do chat, resultados e jobs de análise e métricas da IA.
+
+Tabelas que já existam (criadas pelo create_all de versões anteriores da API,
+antes do Alembic) são mantidas como estão.
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-19 06:12:40.512094
+"""
+from alembic import context, op
+import sqlalchemy as sa
+
+
+revision = '0008'
+down_revision = '0007'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Versões intermediárias da API ainda criavam as tabelas no startup (create_all)
+    existing = set() if context.is_offline_mode() else set(sa.inspect(op.get_bind()).get_table_names())
+    if 'ai_run_metrics' not in existing:
+        op.create_table('ai_run_metrics',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=True),
+        sa.Column('kind', sa.String(length=30), nullable=False),
+        sa.Column('model', sa.String(length=50), nullable=False),
+        sa.Column('iterations', sa.Integer(), nullable=False),
+        sa.Column('tool_calls', sa.Integer(), nullable=False),
+        sa.Column('input_tokens', sa.Integer(), nullable=False),
+        sa.Column('output_tokens', sa.Integer(), nullable=False),
+        sa.Column('cache_read_tokens', sa.Integer(), nullable=False),
+        sa.Column('cache_write_tokens', sa.Integer(), nullable=False),
+        sa.Column('cost_usd', sa.Float(), nullable=False),
+        sa.Column('ttft_ms', sa.Integer(), nullable=True),
+        sa.Column('duration_ms', sa.Integer(), nullable=False),
+        sa.Column('meta_fetch_ms', sa.Integer(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+        sa.PrimaryKeyConstraint('id')
+        )
+        op.create_index(op.f('ix_ai_run_metrics_id'), 'ai_run_metrics', ['id'], unique=False)
+        op.create_index('ix_ai_run_metrics_user_created', 'ai_run_metrics', ['user_id', 'created_at'], unique=False)
+    if 'analysis_jobs' not in existing:
+        op.create_table('analysis_jobs',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('status', sa.String(length=20), nullable=False),
+        sa.Column('request', sa.Text(), nullable=False),
+        sa.Column('result', sa.Text(), nullable=True),
+        sa.Column('error', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('started_at', sa.DateTime(), nullable=True),
+        sa.Column('finished_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+        sa.PrimaryKeyConstraint('id')
+        )
+        op.create_index(op.f('ix_analysis_jobs_id'), 'analysis_jobs', ['id'], unique=False)
+        op.create_index(op.f('ix_analysis_jobs_user_id'), 'analysis_jobs', ['user_id'], unique=False)
+    if 'analysis_results' not in existing:
+        op.create_table('analysis_results',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('fingerprint', sa.String(length=64), nullable=False),
+        sa.Column('mode', sa.String(length=20), nullable=False),
+        sa.Column('date_preset', sa.String(length=20), nullable=False),
+        sa.Column('analysis', sa.Text(), nullable=False),
+        sa.Column('approval_ids', sa.Text(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('expires_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+        sa.PrimaryKeyConstraint('id')
+        )
+        op.create_index(op.f('ix_analysis_results_id'), 'analysis_results', ['id'], unique=False)
+        op.create_index('ix_analysis_results_user_fingerprint', 'analysis_results', ['user_id', 'fingerprint'], unique=False)
+    if 'conversations' not in existing:
+        op.create_table('conversations',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('title', sa.String(length=200), nullable=True),
+        sa.Column('context', sa.Text(), nullable=False),
+        sa.Column('summary', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+        sa.PrimaryKeyConstraint('id')
+        )
+        op.create_index(op.f('ix_conversations_id'), 'conversations', ['id'], unique=False)
+        op.create_index(op.f('ix_conversations_user_id'), 'conversations', ['user_id'], unique=False)
+    if 'conversation_turns' not in existing:
+        op.create_table('conversation_turns',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('conversation_id', sa.Integer(), nullable=False),
+        sa.Column('role', sa.String(length=20), nullable=False),
+        sa.Column('content', sa.Text(), nullable=False),
+        sa.Column('tokens', sa.Integer(), nullable=False),
+        sa.Column('is_summarized', sa.Boolean(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['conversation_id'], ['conversations.id'], ),
+        sa.PrimaryKeyConstraint('id')
+        )
+        op.create_index(op.f('ix_conversation_turns_conversation_id'), 'conversation_turns', ['conversation_id'], unique=False)
+        op.create_index(op.f('ix_conversation_turns_id'), 'conversation_turns', ['id'], unique=False)
+    if 'report_snapshots' not in existing:
+        op.create_table('report_snapshots',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('accounts_key', sa.String(length=64), nullable=False),
+        sa.Column('date_preset', sa.String(length=20), nullable=False),
+        sa.Column('data_date', sa.String(length=10), nullable=False),
+        sa.Column('inputs_hash', sa.String(length=64), nullable=False),
+        sa.Column('content_hash', sa.String(length=64), nullable=False),
+        sa.Column('version', sa.Integer(), nullable=False),
+        sa.Column('is_stale', sa.Boolean(), nullable=False),
+        sa.Column('campaigns', sa.Text(), nullable=False),
+        sa.Column('summary', sa.Text(), nullable=False),
+        sa.Column('account_names', sa.Text(), nullable=False),
+        sa.Column('computed_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('user_id', 'accounts_key', 'date_preset', 'data_date', name='uq_report_snapshots_key')
+        )
+        op.create_index(op.f('ix_report_snapshots_id'), 'report_snapshots', ['id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_report_snapshots_id'), table_name='report_snapshots')
+    op.drop_table('report_snapshots')
+    op.drop_index(op.f('ix_conversation_turns_id'), table_name='conversation_turns')
+    op.drop_index(op.f('ix_conversation_turns_conversation_id'), table_name='conversation_turns')
+    op.drop_table('conversation_turns')
+    op.drop_index(op.f('ix_conversations_user_id'), table_name='conversations')
+    op.drop_index(op.f('ix_conversations_id'), table_name='conversations')
+    op.drop_table('conversations')
+    op.drop_index('ix_analysis_results_user_fingerprint', table_name='analysis_results')
+    op.drop_index(op.f('ix_analysis_results_id'), table_name='analysis_results')
+    op.drop_table('analysis_results')
+    op.drop_index(op.f('ix_analysis_jobs_user_id'), table_name='analysis_jobs')
+    op.drop_index(op.f('ix_analysis_jobs_id'), table_name='analysis_jobs')
+    op.drop_table('analysis_jobs')
+    op.drop_index('ix_ai_run_metrics_user_created', table_name='ai_run_metrics')
+    op.drop_index(op.f('ix_ai_run_metrics_id'), table_name='ai_run_metrics')
+    op.drop_table('ai_run_metrics')
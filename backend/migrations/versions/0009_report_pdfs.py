@@ -0,0 +1,33 @@
+"""PDFs do modo manifest (/n8n/pdf/bundle) no banco, compartilhados entre os workers.
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-19 06:48:05.130277
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '0009'
+down_revision = '0008'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('report_pdfs',
+    sa.Column('token', sa.String(length=64), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('filename', sa.String(length=200), nullable=False),
+    sa.Column('content', sa.LargeBinary(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('expires_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('token')
+    )
+    op.create_index(op.f('ix_report_pdfs_expires_at'), 'report_pdfs', ['expires_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_report_pdfs_expires_at'), table_name='report_pdfs')
+    op.drop_table('report_pdfs')
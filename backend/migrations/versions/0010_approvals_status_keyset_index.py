@@ -0,0 +1,40 @@
+"""ix_approvals_user_status_created termina na chave do keyset (created_at, id).
+
+A listagem paginada por status ordena e pagina por (created_at, id); sem o id no
+índice, o desempate do cursor exigia ler as linhas da tabela. No Postgres o
+índice novo é criado com CONCURRENTLY sob um nome temporário, o antigo é
+removido e o novo assume o nome — a tabela nunca fica sem índice por status.
+
+Revision ID: 0010
+Revises: 0009
+Create Date: 2026-10-19 09:12:00.000000
+"""
+from alembic import op
+
+
+revision = '0010'
+down_revision = '0009'
+branch_labels = None
+depends_on = None
+
+INDEX = 'ix_approvals_user_status_created'
+TEMP_INDEX = 'ix_approvals_user_status_created_new'
+
+
+def upgrade() -> None:
+    _replace_index(['user_id', 'status', 'created_at', 'id'])
+
+
+def downgrade() -> None:
+    _replace_index(['user_id', 'status', 'created_at'])
+
+
+def _replace_index(columns) -> None:
+    with op.get_context().autocommit_block():
+        if op.get_bind().dialect.name != 'postgresql':
+            op.drop_index(INDEX, table_name='approvals')
+            op.create_index(INDEX, 'approvals', columns)
+            return
+        op.create_index(TEMP_INDEX, 'approvals', columns, postgresql_concurrently=True)
+        op.drop_index(INDEX, table_name='approvals', postgresql_concurrently=True)
+        op.execute(f'ALTER INDEX {TEMP_INDEX} RENAME TO {INDEX}')
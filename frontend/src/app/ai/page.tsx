@@ -25,6 +25,7 @@ export default function AIPage() {
   const [messages, setMessages] = useState<Message[]>([])
   const [input, setInput] = useState('')
   const [streaming, setStreaming] = useState(false)
+  const [conversationId, setConversationId] = useState<number | null>(null)
   const [analyzing, setAnalyzing] = useState(false)
   const messagesEndRef = useRef<HTMLDivElement>(null)
   const qc = useQueryClient()
@@ -59,14 +60,17 @@ export default function AIPage() {
           'Content-Type': 'application/json',
           Authorization: `Bearer ${token}`,
         },
-        body: JSON.stringify({ message: msg }),
+        body: JSON.stringify({ message: msg, conversation_id: conversationId }),
       })
 
       if (!response.ok) throw new Error('Erro na API')
+      const newConversationId = response.headers.get('X-Conversation-Id')
+      if (newConversationId) setConversationId(Number(newConversationId))
 
       const reader = response.body!.getReader()
       const decoder = new TextDecoder()
       let buffer = ''
+      let eventName = ''
 
       while (true) {
         const { done, value } = await reader.read()
@@ -77,7 +81,17 @@ export default function AIPage() {
         buffer = lines.pop() || ''
 
         for (const line of lines) {
-          if (line.startsWith('data: ')) {
+          if (line.startsWith('event: ')) {
+            eventName = line.slice(7)
+          } else if (line.startsWith('data: ') && eventName === 'tool') {
+            // Progresso das ferramentas: sugestões criadas durante o chat
+            const tool = JSON.parse(line.slice(6))
+            eventName = ''
+            if (tool.status === 'done' && tool.approval_id) {
+              toast.success(tool.message)
+              qc.invalidateQueries({ queryKey: ['pending-count'] })
+            }
+          } else if (line.startsWith('data: ')) {
             const data = line.slice(6)
             if (data === '[DONE]') break
             setMessages((prev) => {
@@ -111,22 +125,63 @@ export default function AIPage() {
 
   const handleFullAnalysis = async () => {
     setAnalyzing(true)
+    setMessages((prev) => [
+      ...prev,
+      { role: 'user', content: '🤖 Análise automática de todas as campanhas (últimos 7 dias)', timestamp: new Date() },
+      { role: 'assistant', content: '⏳ Análise iniciada...', timestamp: new Date() },
+    ])
+    const setProgress = (content: string) =>
+      setMessages((prev) => {
+        const next = [...prev]
+        next[next.length - 1] = { ...next[next.length - 1], content }
+        return next
+      })
+
     try {
-      const res = await aiApi.analyze({ date_preset: 'last_7d' })
-      const { analysis, suggestions_created } = res.data
-
-      setMessages((prev) => [
-        ...prev,
-        { role: 'user', content: '🤖 Análise automática de todas as campanhas (últimos 7 dias)', timestamp: new Date() },
-        { role: 'assistant', content: analysis, timestamp: new Date() },
-      ])
-
-      if (suggestions_created > 0) {
-        toast.success(`${suggestions_created} sugestão(ões) criada(s)! Confira em Aprovações.`)
-        qc.invalidateQueries({ queryKey: ['pending-count'] })
+      // A análise roda em segundo plano; o progresso chega por SSE
+      const { data: job } = await aiApi.analyzeJob({ date_preset: 'last_7d' })
+      const token = localStorage.getItem('token')
+      const response = await fetch(`/api/ai/analyze/jobs/${job.job_id}/events`, {
+        headers: { Authorization: `Bearer ${token}` },
+      })
+      if (!response.ok) throw new Error('Erro na API')
+
+      const reader = response.body!.getReader()
+      const decoder = new TextDecoder()
+      const progress: string[] = []
+      let buffer = ''
+
+      while (true) {
+        const { done, value } = await reader.read()
+        if (done) break
+
+        buffer += decoder.decode(value, { stream: true })
+        const events = buffer.split('\n\n')
+        buffer = events.pop() || ''
+
+        for (const raw of events) {
+          const event = raw.match(/^event: (.*)$/m)?.[1]
+          const data = JSON.parse(raw.match(/^data: (.*)$/m)?.[1] || '{}')
+
+          if (event === 'accounts') progress.push(`📥 ${data.campaigns} campanhas de ${data.accounts} conta(s)`)
+          if (event === 'rules') progress.push(`📐 Regras: ${data.candidates} sugestão(ões), ${data.review} campanha(s) para a IA`)
+          if (event === 'approval') progress.push(`✅ Sugestão #${data.id}: ${data.campaign_name || data.action_type}`)
+          if (event === 'error') throw new Error(data.detail)
+
+          if (event === 'result') {
+            setProgress(data.analysis)
+            if (data.suggestions_created > 0) {
+              toast.success(`${data.suggestions_created} sugestão(ões) criada(s)! Confira em Aprovações.`)
+              qc.invalidateQueries({ queryKey: ['pending-count'] })
+            }
+          } else {
+            setProgress(['⏳ Analisando...', ...progress].join('\n'))
+          }
+        }
       }
     } catch (e: any) {
-      toast.error(e.response?.data?.detail || 'Erro na análise')
+      setProgress('❌ Erro na análise.')
+      toast.error(e.response?.data?.detail || e.message || 'Erro na análise')
     } finally {
       setAnalyzing(false)
     }
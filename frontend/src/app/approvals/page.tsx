@@ -1,6 +1,6 @@
 'use client'
 import { useState } from 'react'
-import { useQuery, useQueryClient } from '@tanstack/react-query'
+import { useInfiniteQuery, useQueryClient } from '@tanstack/react-query'
 import Layout from '@/components/Layout'
 import ApprovalCard from '@/components/ApprovalCard'
 import { approvalsApi } from '@/lib/api'
@@ -20,10 +20,18 @@ export default function ApprovalsPage() {
   const [bulkLoading, setBulkLoading] = useState(false)
   const qc = useQueryClient()
 
-  const { data: approvals = [], isLoading, refetch } = useQuery<Approval[]>({
+  // Paginação por cursor: o backend devolve o cursor da próxima página em X-Next-Cursor
+  const { data, isLoading, hasNextPage, fetchNextPage, isFetchingNextPage } = useInfiniteQuery({
     queryKey: ['approvals', tab],
-    queryFn: () => approvalsApi.list(tab).then((r) => r.data),
+    queryFn: ({ pageParam }) =>
+      approvalsApi.list({ status: tab, cursor: pageParam }).then((r) => ({
+        items: r.data as Approval[],
+        nextCursor: (r.headers['x-next-cursor'] as string | undefined) || undefined,
+      })),
+    initialPageParam: undefined as string | undefined,
+    getNextPageParam: (lastPage) => lastPage.nextCursor,
   })
+  const approvals = data?.pages.flatMap((page) => page.items) ?? []
 
   const onDecision = () => {
     qc.invalidateQueries({ queryKey: ['approvals'] })
@@ -148,6 +156,18 @@ export default function ApprovalsPage() {
           ))}
         </div>
       )}
+
+      {hasNextPage && (
+        <div className="flex justify-center mt-6">
+          <button
+            onClick={() => fetchNextPage()}
+            disabled={isFetchingNextPage}
+            className="btn-secondary text-sm"
+          >
+            {isFetchingNextPage ? 'Carregando...' : 'Carregar mais'}
+          </button>
+        </div>
+      )}
     </Layout>
   )
 }
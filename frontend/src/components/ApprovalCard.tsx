@@ -13,10 +13,7 @@ interface ApprovalCardProps {
 export default function ApprovalCard({ approval, onDecision }: ApprovalCardProps) {
   const [loading, setLoading] = useState<'approve' | 'reject' | null>(null)
 
-  const payload = (() => {
-    try { return JSON.parse(approval.payload) }
-    catch { return {} }
-  })()
+  const payload = approval.payload ?? {}
 
   const handleApprove = async () => {
     setLoading('approve')
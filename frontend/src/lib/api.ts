@@ -48,8 +48,11 @@ export const campaignsApi = {
 }
 
 export const aiApi = {
-  analyze: (data: { account_ids?: string[]; date_preset?: string; custom_prompt?: string }) =>
+  analyze: (data: { account_ids?: string[]; date_preset?: string; custom_prompt?: string; mode?: 'single' | 'map_reduce' | 'rules'; force?: boolean }) =>
     api.post('/ai/analyze', data),
+  analyzeJob: (data: { account_ids?: string[]; date_preset?: string; custom_prompt?: string; mode?: 'single' | 'map_reduce' | 'rules'; force?: boolean }) =>
+    api.post('/ai/analyze/jobs', data),
+  analysisJob: (jobId: number) => api.get(`/ai/analyze/jobs/${jobId}`),
   chat: (message: string, account_ids?: string[]) => ({
     url: '/api/ai/chat',
     body: { message, account_ids },
@@ -57,7 +60,16 @@ export const aiApi = {
 }
 
 export const approvalsApi = {
-  list: (status?: string) => api.get('/approvals/', { params: status ? { status } : {} }),
+  list: (params: {
+    status?: string
+    account_id?: string
+    campaign_id?: string
+    action_type?: string
+    created_from?: string
+    created_to?: string
+    cursor?: string
+    limit?: number
+  } = {}) => api.get('/approvals/', { params }),
   pendingCount: () => api.get('/approvals/pending/count'),
   approve: (id: number, notes?: string) => api.post(`/approvals/${id}/approve`, { notes }),
   reject: (id: number, notes?: string) => api.post(`/approvals/${id}/reject`, { notes }),
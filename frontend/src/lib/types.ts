@@ -44,7 +44,7 @@ export interface BusinessManager {
 export interface Approval {
   id: number
   action_type: string
-  payload: string
+  payload: Record<string, any>
   account_id?: string
   campaign_id?: string
   campaign_name?: string